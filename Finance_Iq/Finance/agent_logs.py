@@ -0,0 +1,284 @@
+import atexit
+import hashlib
+import json
+import logging
+import logging.handlers
+import mmap
+import os
+import shutil
+import struct
+import threading
+from logging.handlers import QueueListener
+from queue import Full, Queue
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev servers only
+    fcntl = None
+
+# Each index entry is the byte offset of one log line, as an unsigned 64-bit int
+OFFSET = struct.Struct(">Q")
+DEFAULT_TAIL = 500
+MAX_TAIL = 10000
+# Upper bound on bytes returned by one request, whatever tail/range asks for
+MAX_READ_BYTES = 1024 * 1024
+
+
+def log_path() -> str:
+    return str(getattr(settings, "AGENT_LOG_FILE", "agent-logs.txt"))
+
+
+def index_dir(path: str) -> str:
+    return path + ".idx"
+
+
+def index_path(path: str, channel_id: str) -> str:
+    """Per-channel offset file; the channel ID is hashed so it is always a safe file name"""
+    digest = hashlib.sha1(channel_id.encode("utf-8")).hexdigest()[:20]
+    return os.path.join(index_dir(path), digest + ".off")
+
+
+def _replace(src: str, dst: str) -> None:
+    """Move a log file or index directory over an older generation, if it exists"""
+    if not os.path.exists(src):
+        return
+    if os.path.isdir(dst):
+        shutil.rmtree(dst)
+    os.replace(src, dst)
+
+
+class JsonLineFormatter(logging.Formatter):
+    """
+    One JSON object per record. The message is only interpolated here, so
+    with the queued handler that work happens on the listener thread.
+    """
+
+    CONTEXT_FIELDS = ("channel_id", "user_id", "expense_id")
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class AgentLogHandler(logging.Handler):
+    """
+    Appends records to the agent log and, for records carrying a
+    `channel_id` extra, appends the line's byte offset to that channel's
+    index file so per-channel reads never scan the log.
+
+    When max_bytes is set the log is rotated by size together with its
+    index directory: agent-logs.txt -> agent-logs.txt.1 and
+    agent-logs.txt.idx -> agent-logs.txt.idx.1, keeping backup_count
+    generations.
+    """
+
+    def __init__(self, filename: Optional[str] = None, max_bytes: int = 0, backup_count: int = 0):
+        super().__init__()
+        self.filename = str(filename) if filename else log_path()
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._write_lock = threading.Lock()
+        self._log = None
+
+    def emit(self, record):
+        try:
+            line = (self.format(record).replace("\n", "\\n") + "\n").encode("utf-8")
+            self.write_line(line, getattr(record, "channel_id", None))
+        except Exception:
+            self.handleError(record)
+
+    def _open_current(self):
+        """Return a handle on the live log, reopening if another process rotated it"""
+        if self._log is not None:
+            try:
+                if os.stat(self.filename).st_ino == os.fstat(self._log.fileno()).st_ino:
+                    return self._log
+            except FileNotFoundError:
+                pass
+            self._log.close()
+        self._log = open(self.filename, "ab")
+        return self._log
+
+    def _rotate(self) -> None:
+        self._log.close()
+        self._log = None
+        bases = (self.filename, index_dir(self.filename))
+        if self.backup_count <= 0:
+            os.remove(self.filename)
+            shutil.rmtree(bases[1], ignore_errors=True)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            for base in bases:
+                _replace(f"{base}.{i}", f"{base}.{i + 1}")
+        for base in bases:
+            _replace(base, f"{base}.1")
+
+    def write_line(self, line: bytes, channel_id: Optional[str]) -> None:
+        with self._write_lock:
+            while True:
+                log = self._open_current()
+                if fcntl:
+                    # Serialise offset lookup + write across worker processes
+                    fcntl.flock(log, fcntl.LOCK_EX)
+                if self._open_current() is log:
+                    break
+            try:
+                offset = log.seek(0, os.SEEK_END)
+                if self.max_bytes and offset and offset + len(line) > self.max_bytes:
+                    self._rotate()
+                    log = self._open_current()
+                    offset = 0
+                log.write(line)
+                log.flush()
+                if channel_id:
+                    os.makedirs(index_dir(self.filename), exist_ok=True)
+                    with open(index_path(self.filename, str(channel_id)), "ab") as index:
+                        index.write(OFFSET.pack(offset))
+            finally:
+                if fcntl and not log.closed:
+                    fcntl.flock(log, fcntl.LOCK_UN)
+
+    def close(self):
+        with self._write_lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+        super().close()
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands the record over untouched. The stock prepare()
+    formats the message on the calling thread; here formatting is left to
+    the listener. Records are dropped (and counted) rather than blocking
+    the request when the queue is full.
+    """
+
+    def __init__(self, queue):
+        super().__init__(queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except Full:
+            self.dropped += 1
+
+
+class QueuedAgentLogHandler(LazyQueueHandler):
+    """
+    Entry point for LOGGING: the calling thread only enqueues, while a
+    QueueListener thread formats records as JSON lines and writes them to
+    the size-rotated, channel-indexed agent log.
+    """
+
+    def __init__(self, filename: Optional[str] = None, max_bytes: int = 0, backup_count: int = 0,
+                 queue_size: int = 10000):
+        super().__init__(Queue(maxsize=queue_size))
+        self.target = AgentLogHandler(filename, max_bytes=max_bytes, backup_count=backup_count)
+        self.target.setFormatter(JsonLineFormatter())
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def flush(self):
+        """Block until every queued record has been written"""
+        if self.listener._thread is not None:
+            self.queue.join()
+
+    def close(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+            self.target.close()
+        super().close()
+
+
+def _line_at(mapped, offset: int) -> bytes:
+    end = mapped.find(b"\n", offset)
+    return mapped[offset:] if end == -1 else mapped[offset:end + 1]
+
+
+def tail_lines(path: str, count: int) -> bytes:
+    """Last `count` lines of the log, found by scanning backwards through an mmap"""
+    with open(path, "rb") as log:
+        size = os.fstat(log.fileno()).st_size
+        if not size or count <= 0:
+            return b""
+        with mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            # Skip the trailing newline so it does not count as an empty line
+            position = size - 1 if mapped[size - 1:size] == b"\n" else size
+            start = position
+            for _ in range(count):
+                start = mapped.rfind(b"\n", 0, position)
+                if start == -1:
+                    start = 0
+                    break
+                start += 1
+                if size - start > MAX_READ_BYTES:
+                    break
+                position = start - 1
+            start = max(start, size - MAX_READ_BYTES)
+            return mapped[start:size]
+
+
+def channel_tail(path: str, channel_id: str, count: int) -> bytes:
+    """Last `count` lines logged for a channel, read through its offset index"""
+    try:
+        index = open(index_path(path, channel_id), "rb")
+    except FileNotFoundError:
+        return b""
+    with index, open(path, "rb") as log:
+        entries = os.fstat(index.fileno()).st_size // OFFSET.size
+        first = max(0, entries - count)
+        index.seek(first * OFFSET.size)
+        offsets = [value for (value,) in OFFSET.iter_unpack(index.read((entries - first) * OFFSET.size))]
+        size = os.fstat(log.fileno()).st_size
+        if not size:
+            return b""
+        lines: List[bytes] = []
+        total = 0
+        with mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in reversed(offsets):
+                if offset >= size:
+                    continue  # the log was truncated after this entry was indexed
+                line = _line_at(mapped, offset)
+                total += len(line)
+                if total > MAX_READ_BYTES:
+                    break
+                lines.append(line)
+        return b"".join(reversed(lines))
+
+
+def read_range(path: str, start: int, end: Optional[int]) -> Tuple[bytes, int, int, int]:
+    """
+    Bytes start..end (inclusive) of the log, clamped to MAX_READ_BYTES.
+    Negative start means a suffix of that many bytes. Returns
+    (data, first_byte, last_byte, file_size).
+    """
+    with open(path, "rb") as log:
+        size = os.fstat(log.fileno()).st_size
+        if start < 0:
+            start = max(0, size + start)
+        end = size - 1 if end is None else min(end, size - 1)
+        end = min(end, start + MAX_READ_BYTES - 1)
+        if start >= size or end < start:
+            return b"", start, end, size
+        log.seek(start)
+        return log.read(end - start + 1), start, end, size
@@ -1,15 +1,83 @@
-from django.db.models import Sum
+from django.db.models import Q, Sum
 from datetime import date, timedelta
-from .models import Expense
+from .cache import summary_cache
+from .models import ExpenseRollup
 
 
-def get_weekly_summary(user_id):
-    start = date.today() - timedelta(days=7)
-    expenses = Expense.objects.filter(user_id=user_id, date_gte=start)
-    total = expenses.aggregate(Sum("amount"))["amount__sum"] or 0
-    by_category = expenses.values("category").annotate(total=Sum("amount")).order_by("-total")
+def _window_summaries_query(user_id, windows):
+    """
+    One GROUP BY category over the widest window, with a conditional
+    SUM(total)/SUM(count) pair per window, e.g. total_7, count_7, total_30.
+    """
+    today = date.today()
+    starts = {days: today - timedelta(days=days) for days in windows}
+    annotations = {}
+    for days, start in starts.items():
+        in_window = Q(date__gte=start)
+        annotations[f"total_{days}"] = Sum("total", filter=in_window)
+        annotations[f"count_{days}"] = Sum("count", filter=in_window)
+    return (
+        ExpenseRollup.objects.filter(user_id=user_id, date__gte=min(starts.values()))
+        .values("category")
+        .annotate(**annotations)
+    )
+
+
+def _split_windows(rows, windows):
+    summaries = {}
+    for days in windows:
+        by_category = [
+            {"category": row["category"], "total": row[f"total_{days}"], "count": row[f"count_{days}"]}
+            for row in rows
+            if row[f"count_{days}"]
+        ]
+        by_category.sort(key=lambda c: c["total"], reverse=True)
+        summaries[days] = by_category
+    return summaries
+
+
+def get_window_summaries(user_id, windows):
+    """
+    Per-category totals and counts for several trailing windows at once.
+
+    Returns {days: [{"category", "total", "count"}, ...]} with categories
+    ordered by total, descending. Every window comes from a single query on
+    the daily rollup table, so the cost is bounded by the widest window x
+    categories rather than by the user's expense history.
+    """
+    windows = sorted(set(windows))
+    return _split_windows(list(_window_summaries_query(user_id, windows)), windows)
+
+
+async def aget_window_summaries(user_id, windows):
+    windows = sorted(set(windows))
+    return _split_windows([row async for row in _window_summaries_query(user_id, windows)], windows)
+
 
+def get_category_totals(user_id, days):
+    """Per-category totals and counts for a user's last `days` days."""
+    return get_window_summaries(user_id, [days])[days]
+
+
+async def aget_category_totals(user_id, days):
+    return (await aget_window_summaries(user_id, [days]))[days]
+
+
+def format_summary(by_category):
+    total = sum(c["total"] for c in by_category)
     summary_lines = [f"💰 Total spent this week: ₦{total:,.2f}"]
     for c in by_category:
         summary_lines.append(f"• {c['category'].capitalize()}: ₦{c['total']:,.2f}")
-    return "\n".join(summary_lines)
\ No newline at end of file
+    return "\n".join(summary_lines)
+
+
+def get_weekly_summary(user_id):
+    return summary_cache.get_or_set(
+        user_id, "weekly", lambda: format_summary(get_category_totals(user_id, 7))
+    )
+
+
+async def aget_weekly_summary(user_id):
+    async def compute():
+        return format_summary(await aget_category_totals(user_id, 7))
+    return await summary_cache.aget_or_set(user_id, "weekly", compute)
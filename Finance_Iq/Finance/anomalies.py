@@ -0,0 +1,101 @@
+import math
+from typing import Iterable, Optional
+
+from django.db import transaction
+
+from .archive import with_archive
+from .models import ArchivedExpense, CategoryStats, Expense
+from .routers import use_primary
+
+# Expenses a (user, category) needs before its amounts are judged
+ANOMALY_MIN_SAMPLES = 5
+# An amount is flagged when it is this many standard deviations above the mean...
+ANOMALY_Z_SCORE = 3.0
+# ...and at least this multiple of the recent (EMA) spend
+ANOMALY_MIN_RATIO = 2.0
+# Weight of the newest amount in the moving average
+EMA_ALPHA = 0.2
+REBUILD_BATCH_SIZE = 1000
+
+
+def observe(stats: CategoryStats, amount: float) -> None:
+    """Fold one amount into the running stats (Welford update plus EMA)"""
+    stats.count += 1
+    delta = amount - stats.mean
+    stats.mean += delta / stats.count
+    stats.m2 += delta * (amount - stats.mean)
+    stats.ema = amount if stats.count == 1 else EMA_ALPHA * amount + (1 - EMA_ALPHA) * stats.ema
+
+
+def anomaly_message(stats: CategoryStats, amount: float) -> Optional[str]:
+    """Warning for an amount that is unusual against the stats before it was added, else None"""
+    if stats.count < ANOMALY_MIN_SAMPLES or stats.ema <= 0:
+        return None
+    ratio = amount / stats.ema
+    std = math.sqrt(stats.m2 / (stats.count - 1))
+    if ratio < ANOMALY_MIN_RATIO or (std and (amount - stats.mean) / std < ANOMALY_Z_SCORE):
+        return None
+    return f"⚠️ That's {ratio:.1f}x your usual {stats.category} spend (₦{stats.ema:,.2f})"
+
+
+def observe_expenses(expenses: Iterable[Expense]) -> None:
+    """
+    Check each new expense against its (user, category) stats, set
+    `expense.anomaly` to the warning or None, then fold it in. Costs one
+    SELECT plus one write per statement type, however many expenses.
+    Call inside the insert transaction.
+    """
+    expenses = list(expenses)
+    if not expenses:
+        return
+    keys = {(expense.user_id, expense.category) for expense in expenses}
+    existing = {
+        (stats.user_id, stats.category): stats
+        for stats in CategoryStats.objects.select_for_update().filter(
+            user_id__in={user_id for user_id, _ in keys}, category__in={category for _, category in keys}
+        )
+    }
+    created = {}
+    for expense in expenses:
+        key = (expense.user_id, expense.category)
+        stats = existing.get(key) or created.get(key)
+        if stats is None:
+            stats = created[key] = CategoryStats(user_id=expense.user_id, category=expense.category)
+        amount = float(expense.amount)
+        expense.anomaly = anomaly_message(stats, amount)
+        observe(stats, amount)
+    touched = [stats for key, stats in existing.items() if key in keys]
+    if touched:
+        CategoryStats.objects.bulk_update(touched, ["count", "mean", "m2", "ema"])
+    if created:
+        # A concurrent first expense for the same key may win the insert;
+        # that one sample is lost until rebuild_category_stats runs
+        CategoryStats.objects.bulk_create(created.values(), ignore_conflicts=True)
+
+
+def rebuild_category_stats(batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """
+    Recompute every CategoryStats row from the full expense history, hot and
+    archived, in insertion order. Returns the number of rows written.
+    """
+    fields = ("user_id", "category", "amount", "created_at", "id")
+    written = 0
+    with use_primary(), transaction.atomic():
+        CategoryStats.objects.all().delete()
+        rows = with_archive(
+            Expense.objects.all(), ArchivedExpense.objects.all(), None, fields,
+            ("user_id", "category", "created_at", "id"),
+        )
+        batch, stats = [], None
+        for row in rows.iterator(chunk_size=batch_size):
+            if stats is None or (stats.user_id, stats.category) != (row["user_id"], row["category"]):
+                stats = CategoryStats(user_id=row["user_id"], category=row["category"])
+                batch.append(stats)
+                if len(batch) > batch_size:
+                    CategoryStats.objects.bulk_create(batch[:-1])
+                    written += len(batch) - 1
+                    batch = batch[-1:]
+            observe(stats, float(row["amount"]))
+        CategoryStats.objects.bulk_create(batch)
+        written += len(batch)
+    return written
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class FinanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Finance'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+        from django.test.signals import setting_changed
+
+        from . import ratelimit, search, signals  # noqa: F401
+        from .metrics import install_query_recorder
+
+        connection_created.connect(install_query_recorder)
+        setting_changed.connect(ratelimit.configure)
+        post_migrate.connect(search.restore_search_triggers, sender=self)
@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import ArchivedExpense, Expense
+from .routers import use_primary
+
+# Expenses moved per transaction
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_FIELDS = ('id', 'user_id', 'channel_id', 'amount', 'category', 'description', 'date', 'created_at')
+
+
+def archive_after_days() -> int:
+    return int(getattr(settings, "ARCHIVE_AFTER_DAYS", 365))
+
+
+def archive_horizon() -> date:
+    """Expenses dated before this day may live in the cold tier"""
+    return date.today() - timedelta(days=archive_after_days())
+
+
+def reaches_archive(start: Optional[date]) -> bool:
+    """Whether a read starting at `start` (None = all history) must include the cold tier"""
+    return start is None or start < archive_horizon()
+
+
+def with_archive(expenses, archived, start: Optional[date], fields, ordering):
+    """
+    values() rows from the hot queryset, UNION ALL the matching cold rows
+    when the read reaches back past the archive horizon, in `ordering`.
+    Both querysets must carry the same filters.
+    """
+    if not reaches_archive(start):
+        return expenses.order_by(*ordering).values(*fields)
+    return (
+        expenses.order_by().values(*fields)
+        .union(archived.order_by().values(*fields), all=True)
+        .order_by(*ordering)
+    )
+
+
+def _delete_hot(ids) -> None:
+    """
+    Delete archived rows from the hot table without firing post_delete, whose
+    receivers would subtract them from the rollups and dashboard counters.
+    """
+    qn = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {qn(Expense._meta.db_table)} WHERE {qn('id')} IN ({placeholders})", ids)
+
+
+def archive_expenses(older_than_days: Optional[int] = None, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Move expenses older than `older_than_days` (default ARCHIVE_AFTER_DAYS)
+    from the hot table into ArchivedExpense, one batch per transaction.
+
+    Rollups and dashboard counters are left as they are: the totals still
+    cover archived expenses. Returns the number of expenses moved.
+    """
+    days = archive_after_days() if older_than_days is None else older_than_days
+    if days < archive_after_days():
+        raise ValueError(
+            f"Cannot archive expenses younger than ARCHIVE_AFTER_DAYS ({archive_after_days()}); "
+            "reads would not look for them in the cold tier"
+        )
+    cutoff = date.today() - timedelta(days=days)
+    moved = 0
+    with use_primary():
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    Expense.objects.filter(date__lt=cutoff).order_by('id').values(*ARCHIVE_FIELDS)[:batch_size]
+                )
+                if not rows:
+                    break
+                ArchivedExpense.objects.bulk_create([ArchivedExpense(**row) for row in rows])
+                _delete_hot([row['id'] for row in rows])
+            moved += len(rows)
+    return moved
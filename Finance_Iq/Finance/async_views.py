@@ -0,0 +1,168 @@
+# Native async twins of the webhook and read API views. Finance/urls.py routes
+# them instead of the sync views when FINANCE_ASYNC_VIEWS is on (the default
+# under Finance_Iq.asgi), so uvicorn/daphne skip the sync-to-async bridge.
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from . import journal
+from .analytics import aget_weekly_summary, aget_window_summaries
+from .cache import summary_cache
+from .export import abuffered, aiter_export_rows, arender_export
+from .idempotency import DUPLICATE_REPLY, DuplicateMessage, message_key, seen_messages
+from .metrics import track_parse
+from .pagination import InvalidCursor, astream_page
+from .parser import parse_line_items
+from .ratelimit import acheck_rate_limit
+from .search import format_search_reply, get_search_results, parse_search_command
+from .versions import conditional_on_data_version
+from .views import (
+    UNPARSEABLE_REPLY,
+    build_items_reply,
+    create_error_response,
+    create_rate_limited_response,
+    create_telegram_response,
+    expense_fields,
+    extract_message,
+    expense_page_query,
+    export_params,
+    export_response,
+    listed_user,
+    parse_window_days,
+    parse_windows,
+    save_line_items,
+    summarized_user,
+    summary_cache_window,
+    summary_payload,
+)
+
+logger = logging.getLogger(__name__)
+
+# Fixed-size pool for CPU-bound parsing and journal writes so they never run on the event loop
+PARSE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=getattr(settings, "PARSE_EXECUTOR_WORKERS", 4),
+    thread_name_prefix="finance-parse",
+)
+
+# Django's async ORM cannot open transactions, so the inserts and their rollup
+# updates run together in one sync_to_async hop.
+asave_line_items = sync_to_async(save_line_items)
+
+
+async def aparse_line_items(text):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(PARSE_EXECUTOR, parse_line_items, text)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def telex_expense_agent(request):
+    """Async version of views.telex_expense_agent"""
+    try:
+        try:
+            payload = json.loads(request.body)
+        except json.JSONDecodeError:
+            return create_error_response("Invalid JSON payload")
+
+        channel_id, user_id, text = extract_message(payload)
+        if not all([channel_id, user_id, text]):
+            return create_error_response("Missing required fields: channelId, from.id, or text")
+
+        logger.debug("Processing expense from user %s: %.50s...", user_id, text,
+                     extra={"channel_id": channel_id, "user_id": user_id})
+
+        retry_after = await acheck_rate_limit(user_id, channel_id)
+        if retry_after:
+            return create_rate_limited_response(channel_id, retry_after)
+
+        search_query = parse_search_command(text)
+        if search_query:
+            results = await sync_to_async(get_search_results)(user_id, search_query)
+            return create_telegram_response(channel_id, format_search_reply(results))
+
+        key = message_key(payload, channel_id, user_id, text)
+        seen_reply = seen_messages.get(key)
+        if seen_reply is not None:
+            logger.info("Duplicate message from user %s", user_id,
+                        extra={"channel_id": channel_id, "user_id": user_id})
+            return create_telegram_response(channel_id, seen_reply)
+
+        with track_parse():
+            items = await aparse_line_items(text)
+        if not items:
+            return create_telegram_response(channel_id, UNPARSEABLE_REPLY)
+
+        fields = [expense_fields(user_id, channel_id, item) for item in items]
+        if settings.INGEST_WRITE_BEHIND:
+            loop = asyncio.get_running_loop()
+            ingest_keys = await loop.run_in_executor(PARSE_EXECUTOR, journal.enqueue_many, fields, key)
+            logger.info("Queued expenses %s for user %s", ", ".join(ingest_keys), user_id,
+                        extra={"channel_id": channel_id, "user_id": user_id})
+            reply_text = build_items_reply(items, None)
+            seen_messages.remember(key, reply_text)
+            return create_telegram_response(channel_id, reply_text)
+
+        try:
+            expenses = await asave_line_items(fields, message_key=key)
+        except DuplicateMessage:
+            logger.info("Duplicate message from user %s", user_id,
+                        extra={"channel_id": channel_id, "user_id": user_id})
+            return create_telegram_response(channel_id, DUPLICATE_REPLY)
+        summary = await aget_weekly_summary(user_id)
+        reply_text = build_items_reply(items, summary, [expense.anomaly for expense in expenses])
+        seen_messages.remember(key, reply_text)
+
+        expense_ids = [expense.id for expense in expenses]
+        logger.info("Successfully created expense %s for user %s", ", ".join(map(str, expense_ids)), user_id,
+                    extra={"channel_id": channel_id, "user_id": user_id,
+                           "expense_id": expense_ids[0] if len(expense_ids) == 1 else expense_ids})
+        return create_telegram_response(channel_id, reply_text)
+
+    except Exception as e:
+        logger.error("Unexpected error in async telex_expense_agent: %s", e, exc_info=True)
+        return create_error_response("Internal server error", status=500)
+
+
+@require_http_methods(["GET"])
+@conditional_on_data_version(listed_user)
+async def list_expenses(request):
+    """Async version of views.list_expenses"""
+    try:
+        rows, limit = expense_page_query(request)
+    except InvalidCursor as e:
+        return create_error_response(str(e))
+    return StreamingHttpResponse(astream_page(rows, limit), content_type="application/json")
+
+
+@require_http_methods(["GET"])
+async def export_expenses(request):
+    """Async version of views.export_expenses; rows are fetched a chunk at a time"""
+    try:
+        filters, fmt = export_params(request)
+    except ValueError as e:
+        return create_error_response(str(e))
+    return export_response(abuffered(arender_export(aiter_export_rows(**filters), fmt)), filters, fmt)
+
+
+@require_http_methods(["GET"])
+@conditional_on_data_version(summarized_user)
+async def get_summary(request, user_id):
+    """Async version of views.get_summary"""
+    days = parse_window_days(request.GET.get('days'), 7)
+    windows = parse_windows(request.GET.get('windows'))
+
+    async def compute():
+        summaries = await aget_window_summaries(user_id, [days, 7, *windows])
+        return summary_payload(user_id, days, windows, summaries)
+
+    payload = await summary_cache.aget_or_set(
+        user_id, summary_cache_window(days, windows, request.data_version), compute
+    )
+    return JsonResponse(payload)
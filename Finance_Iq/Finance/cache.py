@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .routers import use_primary
+
+_MISSING = object()
+
+
+class SummaryCache:
+    """
+    Two-level cache for per-user summaries.
+
+    Entries are keyed by (user_id, window, date, version). The per-user
+    version lives in Django's cache and is bumped whenever the user's
+    expenses change, so old entries simply stop being addressed; the date
+    rolls "last N days" windows forward at midnight. Lookups go to a bounded
+    in-process LRU first, then to Django's cache.
+
+    Misses are computed on the primary: a lagging replica read would be
+    cached under a version that was bumped when the write committed, and
+    served until the user's next write.
+
+    Entries also expire after `ttl` seconds. With a shared backend (Redis,
+    Memcached) the version alone keeps every worker current and the TTL only
+    bounds memory; with the per-process LocMemCache a bump in one worker is
+    invisible to the others, and the TTL is what bounds their staleness.
+    """
+
+    def __init__(self, max_entries: int = 1024, alias: str = "default", prefix: str = "finance:summary",
+                 ttl: float = 60):
+        self.max_entries = max_entries
+        self.alias = alias
+        self.prefix = prefix
+        self.ttl = ttl
+        self._local: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _version_key(self, user_id: str) -> str:
+        return f"{self.prefix}:version:{user_id}"
+
+    def get_version(self, user_id: str) -> int:
+        key = self._version_key(user_id)
+        version = self.backend.get(key)
+        if version is None:
+            # Seed from the clock so an evicted counter never reuses old versions
+            self.backend.add(key, time.time_ns(), timeout=None)
+            version = self.backend.get(key)
+        return version
+
+    def bump_version(self, user_id: str) -> None:
+        key = self._version_key(user_id)
+        try:
+            self.backend.incr(key)
+        except ValueError:
+            self.backend.add(key, time.time_ns(), timeout=None)
+
+    def get_or_set(self, user_id: str, window: str, compute: Callable[[], Any]) -> Any:
+        key = (user_id, window, date.today().isoformat(), self.get_version(user_id))
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+
+        shared_key = self._shared_key(key)
+        value = self.backend.get(shared_key, _MISSING)
+        if value is _MISSING:
+            with use_primary():
+                value = compute()
+            self.backend.set(shared_key, value, timeout=self.ttl)
+            self.misses += 1
+        else:
+            self.shared_hits += 1
+
+        self._remember(key, value)
+        return value
+
+    async def aget_version(self, user_id: str) -> int:
+        key = self._version_key(user_id)
+        version = await self.backend.aget(key)
+        if version is None:
+            await self.backend.aadd(key, time.time_ns(), timeout=None)
+            version = await self.backend.aget(key)
+        return version
+
+    async def aget_or_set(self, user_id: str, window: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Async twin of get_or_set; `compute` is a coroutine function"""
+        key = (user_id, window, date.today().isoformat(), await self.aget_version(user_id))
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+
+        shared_key = self._shared_key(key)
+        value = await self.backend.aget(shared_key, _MISSING)
+        if value is _MISSING:
+            with use_primary():
+                value = await compute()
+            await self.backend.aset(shared_key, value, timeout=self.ttl)
+            self.misses += 1
+        else:
+            self.shared_hits += 1
+
+        self._remember(key, value)
+        return value
+
+    def _shared_key(self, key: tuple) -> str:
+        return f"{self.prefix}:" + ":".join(map(str, key))
+
+    def _lookup(self, key: tuple) -> Any:
+        """The unexpired local entry for `key`, counted as a hit, or _MISSING"""
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._local[key]
+                return _MISSING
+            self._local.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _remember(self, key: tuple, value: Any) -> None:
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+            self.hits = self.shared_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "entries": len(self._local),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+summary_cache = SummaryCache(
+    max_entries=getattr(settings, "SUMMARY_CACHE_MAX_ENTRIES", 1024),
+    ttl=getattr(settings, "SUMMARY_CACHE_TTL", 60),
+)
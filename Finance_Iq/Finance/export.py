@@ -0,0 +1,132 @@
+import csv
+import json
+from datetime import date
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, Optional
+
+from .archive import with_archive
+from .models import ArchivedExpense, Expense
+from .pagination import serialize_row
+
+EXPORT_FIELDS = ('id', 'user_id', 'channel_id', 'amount', 'category', 'description', 'date', 'created_at')
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_ORDERING = ('date', 'created_at', 'id')
+# Rows fetched per database round-trip; memory use is bounded by this, not by history size
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_queryset(user_id: Optional[str] = None, channel_id: Optional[str] = None,
+                    start: Optional[date] = None, end: Optional[date] = None,
+                    category: Optional[str] = None, model=Expense):
+    """Expenses matching the export filters, oldest first, as a values() queryset"""
+    expenses = model.objects.all()
+    if user_id:
+        expenses = expenses.filter(user_id=user_id)
+    if channel_id:
+        expenses = expenses.filter(channel_id=channel_id)
+    if start:
+        expenses = expenses.filter(date__gte=start)
+    if end:
+        expenses = expenses.filter(date__lte=end)
+    if category:
+        expenses = expenses.filter(category=category)
+    return expenses.order_by(*EXPORT_ORDERING).values(*EXPORT_FIELDS)
+
+
+def export_rows(**filters):
+    """Export rows from the hot table and, when the range reaches back far enough, the archive"""
+    return with_archive(
+        export_queryset(**filters), export_queryset(**filters, model=ArchivedExpense),
+        filters.get('start'), EXPORT_FIELDS, EXPORT_ORDERING,
+    )
+
+
+def iter_export_rows(**filters) -> Iterator[dict]:
+    return export_rows(**filters).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def aiter_export_rows(**filters) -> AsyncIterator[dict]:
+    """
+    iter_export_rows for async views. Iterating a queryset with `async for`
+    fetches every row before the first; aiterator() keeps to one chunk.
+    """
+    return export_rows(**filters).aiterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _export_record(row) -> dict:
+    record = serialize_row(row)
+    record['channel_id'] = row['channel_id']
+    return {field: record[field] for field in EXPORT_FIELDS}
+
+
+def _ndjson_line(row) -> str:
+    return json.dumps(_export_record(row)) + "\n"
+
+
+def ndjson_lines(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield _ndjson_line(row)
+
+
+class _Echo:
+    """File-like object whose write() hands the line straight back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_line(writer, row) -> str:
+    record = _export_record(row)
+    return writer.writerow([record[field] for field in EXPORT_FIELDS])
+
+
+def csv_lines(rows: Iterable[dict]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield _csv_line(writer, row)
+
+
+def render_export(rows: Iterable[dict], fmt: str) -> Iterator[str]:
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return csv_lines(rows) if fmt == 'csv' else ndjson_lines(rows)
+
+
+async def arender_export(rows: AsyncIterable[dict], fmt: str) -> AsyncIterator[str]:
+    """render_export over an async row iterator"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        async for row in rows:
+            yield _csv_line(writer, row)
+    else:
+        async for row in rows:
+            yield _ndjson_line(row)
+
+
+def buffered(lines: Iterable[str], size: int = 64 * 1024) -> Iterator[str]:
+    """Join small lines into ~size-character blocks to cut per-chunk overhead when streaming"""
+    block, length = [], 0
+    for line in lines:
+        block.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(block)
+            block, length = [], 0
+    if block:
+        yield "".join(block)
+
+
+async def abuffered(lines: AsyncIterable[str], size: int = 64 * 1024) -> AsyncIterator[str]:
+    """buffered over an async line iterator"""
+    block, length = [], 0
+    async for line in lines:
+        block.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(block)
+            block, length = [], 0
+    if block:
+        yield "".join(block)
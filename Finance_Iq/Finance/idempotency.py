@@ -0,0 +1,178 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Iterable, Optional, Set
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import ProcessedMessage
+from .rollups import UPSERT_VENDORS
+
+# Payload fields that carry the upstream message/update ID, in order of preference
+MESSAGE_ID_FIELDS = ("messageId", "message_id", "updateId", "update_id")
+
+DUPLICATE_REPLY = "✅ Already logged this expense."
+
+# Marks content-hashed keys; the rest of the key is a truncated digest so it
+# still fits ProcessedMessage.key
+CONTENT_KEY_PREFIX = "text:"
+
+
+class DuplicateMessage(Exception):
+    """The webhook message was already processed within the idempotency TTL"""
+
+
+def idempotency_ttl() -> int:
+    return int(getattr(settings, "IDEMPOTENCY_TTL_SECONDS", 600))
+
+
+def key_ttl(key: str) -> int:
+    """
+    Seconds a claim on `key` lasts. Content-hashed keys cannot tell a retry
+    from the same expense genuinely sent again, so they are only held for
+    the short IDEMPOTENCY_CONTENT_TTL_SECONDS retry window.
+    """
+    if key.startswith(CONTENT_KEY_PREFIX):
+        return int(getattr(settings, "IDEMPOTENCY_CONTENT_TTL_SECONDS", 30))
+    return idempotency_ttl()
+
+
+def message_key(payload, channel_id, user_id, text) -> str:
+    """
+    Idempotency key for a webhook message: its upstream ID when the payload
+    has one, otherwise a hash of who sent what, where. Content-hashed keys
+    treat the same text resent within key_ttl as a retry.
+    """
+    for field in MESSAGE_ID_FIELDS:
+        value = payload.get(field)
+        if value is not None:
+            return hashlib.sha256(f"id\0{channel_id}\0{value}".encode()).hexdigest()
+    digest = hashlib.sha256(f"text\0{channel_id}\0{user_id}\0{text}".encode()).hexdigest()
+    return CONTENT_KEY_PREFIX + digest[:64 - len(CONTENT_KEY_PREFIX)]
+
+
+class SeenMessages:
+    """
+    Bounded in-process record of recently processed message keys and the
+    reply each one got, so a retry is answered without parsing or touching
+    the database. Entries expire after `ttl` seconds (by default key_ttl of
+    the key); the least recently seen are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: Optional[int] = None):
+        self.max_entries = max_entries
+        self._ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """The reply recorded for `key`, or None if it is unseen or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, reply = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return reply
+
+    def remember(self, key: str, reply: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            ttl = key_ttl(key) if self._ttl is None else self._ttl
+            self._entries[key] = (now + ttl, reply)
+            self._entries.move_to_end(key)
+            # With two TTLs expired entries are not strictly oldest-first, so
+            # trim from the front until the head is live and the size fits;
+            # get() ignores any expired entry left behind it
+            while self._entries:
+                oldest_key, (expires_at, _) = next(iter(self._entries.items()))
+                if expires_at > now and len(self._entries) <= self.max_entries:
+                    break
+                del self._entries[oldest_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+seen_messages = SeenMessages(max_entries=getattr(settings, "IDEMPOTENCY_MAX_ENTRIES", 10000))
+
+
+def claim_message(key: str) -> None:
+    """
+    Record `key` as processed, raising DuplicateMessage if another request
+    already claimed it within key_ttl. Call inside the insert transaction so
+    a rolled-back insert releases the claim; the unique constraint settles
+    concurrent retries that both missed the in-process store.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=key_ttl(key))
+    try:
+        with transaction.atomic():
+            ProcessedMessage.objects.create(key=key, expires_at=expires_at)
+    except IntegrityError:
+        # An expired claim is taken over rather than purged first
+        if not ProcessedMessage.objects.filter(key=key, expires_at__lte=now).update(expires_at=expires_at):
+            raise DuplicateMessage(key)
+
+
+# Keys per upsert statement; three bound parameters each
+CLAIM_BATCH_SIZE = 300
+
+
+def claim_messages(keys: Iterable[str]) -> Set[str]:
+    """
+    Batched claim_message: claim every key not already claimed within the
+    TTL and return the ones that were (the duplicates). Call inside the
+    insert transaction. On SQLite/Postgres each batch of keys is a single
+    upsert that inserts new keys, takes over expired ones and returns what
+    it claimed; other backends claim key by key.
+    """
+    keys = list(dict.fromkeys(keys))
+    if connection.vendor not in UPSERT_VENDORS:
+        duplicates = set()
+        for key in keys:
+            try:
+                claim_message(key)
+            except DuplicateMessage:
+                duplicates.add(key)
+        return duplicates
+
+    now = timezone.now()
+    adapt = connection.ops.adapt_datetimefield_value
+    stamp = adapt(now)
+    qn = connection.ops.quote_name
+    table = qn(ProcessedMessage._meta.db_table)
+    key_col, created_col, expires_col = qn("key"), qn("created_at"), qn("expires_at")
+    claimed = set()
+    with connection.cursor() as cursor:
+        for i in range(0, len(keys), CLAIM_BATCH_SIZE):
+            batch = keys[i:i + CLAIM_BATCH_SIZE]
+            placeholders = ", ".join(["(%s, %s, %s)"] * len(batch))
+            cursor.execute(
+                f"INSERT INTO {table} ({key_col}, {created_col}, {expires_col}) VALUES {placeholders} "
+                f"ON CONFLICT ({key_col}) DO UPDATE SET {created_col} = excluded.{created_col}, "
+                f"{expires_col} = excluded.{expires_col} WHERE {table}.{expires_col} <= %s "
+                f"RETURNING {key_col}",
+                [value for key in batch
+                 for value in (key, stamp, adapt(now + timedelta(seconds=key_ttl(key))))] + [stamp],
+            )
+            claimed.update(key for key, in cursor.fetchall())
+    return set(keys) - claimed
+
+
+def purge_expired_messages() -> int:
+    """Delete expired ProcessedMessage rows; returns how many were removed"""
+    deleted, _ = ProcessedMessage.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,132 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.db import transaction
+
+from . import journal
+from .anomalies import observe_expenses
+from .idempotency import claim_message, claim_messages
+from .models import Expense
+from .rollups import apply_expenses
+from .routers import use_primary
+from .signals import invalidate_user_summaries
+from .stats import record_expenses
+from .versions import bump_data_versions
+
+# Rows per INSERT statement; keeps SQLite under its bound-parameter limit
+BULK_BATCH_SIZE = 500
+
+
+def create_expense(message_key: Optional[str] = None, **fields) -> Expense:
+    """
+    Insert one expense. The post_save signal updates its rollup row and
+    summary version inside the same transaction. With a `message_key` the
+    webhook message is claimed in that transaction too, and
+    DuplicateMessage is raised if it was already processed.
+    """
+    with transaction.atomic():
+        if message_key:
+            claim_message(message_key)
+        return Expense.objects.create(**fields)
+
+
+def _restore_dates(created: List[Expense], dates: List[date]) -> None:
+    """
+    Put back the dates auto_now_add replaced with today during bulk_create,
+    one UPDATE per distinct date, before anything reads expense.date
+    """
+    moved = defaultdict(list)
+    for expense, day in zip(created, dates):
+        if day and expense.date != day:
+            expense.date = day
+            moved[day].append(expense.pk)
+    for day, ids in moved.items():
+        Expense.objects.filter(pk__in=ids).update(date=day)
+
+
+def create_expenses(expenses: List[Expense], message_key: Optional[str] = None,
+                    keep_dates: bool = False) -> List[Expense]:
+    """
+    Insert many expenses with bulk_create in a single transaction.
+
+    bulk_create skips model signals, so the rollup rows, dashboard counters,
+    category stats, summary versions and data versions the signals would
+    maintain are updated here, inside the same transaction. `message_key`
+    claims the webhook message they came from, as in create_expense. With
+    `keep_dates` each expense keeps the date it was given instead of today.
+    """
+    if not expenses:
+        return []
+    with transaction.atomic():
+        if message_key:
+            claim_message(message_key)
+        dates = [expense.date for expense in expenses] if keep_dates else None
+        created = Expense.objects.bulk_create(expenses, batch_size=BULK_BATCH_SIZE)
+        if keep_dates:
+            _restore_dates(created, dates)
+        apply_expenses(created)
+        record_expenses(created)
+        observe_expenses(created)
+        user_ids = {expense.user_id for expense in created}
+        for user_id in user_ids:
+            invalidate_user_summaries(user_id)
+        bump_data_versions(user_ids)
+    return created
+
+
+def create_message_expenses(
+    messages: Sequence[Tuple[Optional[str], List[Expense]]], keep_dates: bool = False
+) -> Tuple[List[Expense], List[bool]]:
+    """
+    Insert the expenses of many webhook messages, given as (message_key,
+    expenses) pairs, in one transaction and one bulk_create. Messages are
+    claimed as in create_expense; one already processed, or repeated
+    earlier in the batch, is skipped rather than failing the rest. A None
+    key is always stored. `keep_dates` is passed to create_expenses.
+    Returns the created expenses and whether each message was stored.
+    """
+    with transaction.atomic():
+        keys = [key for key, _ in messages if key]
+        claimed = set(keys) - claim_messages(keys)
+        expenses, stored = [], []
+        for key, message_expenses in messages:
+            if key is None:
+                stored.append(True)
+                expenses.extend(message_expenses)
+                continue
+            stored.append(key in claimed)
+            if stored[-1]:
+                claimed.discard(key)
+                expenses.extend(message_expenses)
+        return create_expenses(expenses, keep_dates=keep_dates), stored
+
+
+def drain_journal(batch_size: int = BULK_BATCH_SIZE) -> int:
+    """
+    Move one batch from the write-behind journal into the database.
+
+    Delivery is at-least-once: entries are acknowledged only after the
+    database transaction commits, and rows whose ingest_key is already
+    stored are skipped, so replaying a batch after a crash is harmless.
+    Each message's webhook key is claimed as in create_message_expenses, so
+    a retry journaled by another worker is dropped here. Expenses keep their
+    journaled date, so a backlog drained after midnight or replayed after an
+    outage is booked on the day the user was told.
+    Returns the number of journal entries processed.
+    """
+    entries = journal.peek(batch_size)
+    if not entries:
+        return 0
+    # The replay check must not read a lagging replica
+    with use_primary(), transaction.atomic():
+        keys = [ingest_key for _, ingest_key, _, _ in entries]
+        stored = set(Expense.objects.filter(ingest_key__in=keys).values_list("ingest_key", flat=True))
+        messages: Dict[str, Tuple[Optional[str], List[Expense]]] = {}
+        for _, ingest_key, message_key, fields in entries:
+            if ingest_key not in stored:
+                group = messages.setdefault(journal.message_group(ingest_key), (message_key, []))
+                group[1].append(Expense(ingest_key=ingest_key, **fields))
+        create_message_expenses(list(messages.values()), keep_dates=True)
+    journal.ack(entries[-1][0])
+    return len(entries)
@@ -0,0 +1,122 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+_local = threading.local()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ingest_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    message_key TEXT
+)
+"""
+INSERT_ENTRY = "INSERT OR IGNORE INTO entries (ingest_key, payload, enqueued_at, message_key) VALUES (?, ?, ?, ?)"
+
+
+def journal_path() -> str:
+    return str(getattr(settings, "INGEST_JOURNAL_PATH", "ingest-journal.sqlite3"))
+
+
+def _connection() -> sqlite3.Connection:
+    """
+    One connection per thread to the journal file. WAL with synchronous=FULL
+    means an enqueue is on disk before the webhook replies, without taking
+    the main database's write lock.
+    """
+    path = journal_path()
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "path", None) != path:
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute(SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+        if "message_key" not in columns:
+            # Journals written before entries carried their webhook message key
+            conn.execute("ALTER TABLE entries ADD COLUMN message_key TEXT")
+        _local.conn, _local.path = conn, path
+    return conn
+
+
+def close() -> None:
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+def enqueue(fields: Dict[str, Any], ingest_key: Optional[str] = None, message_key: Optional[str] = None) -> str:
+    """
+    Durably record an expense for the drain worker and return its key.
+
+    `fields` are Expense constructor kwargs; dates are stored as ISO strings.
+    Enqueueing the same key twice is a no-op. `message_key` is the webhook
+    message's idempotency key, claimed when the entry is drained.
+    """
+    ingest_key = ingest_key or uuid.uuid4().hex
+    _connection().execute(INSERT_ENTRY, (ingest_key, _encode(fields), time.time(), message_key))
+    return ingest_key
+
+
+def enqueue_many(fields_list: List[Dict[str, Any]], message_key: Optional[str] = None) -> List[str]:
+    """
+    enqueue for the expenses of one message in one journal transaction, so
+    they cost one fsync. Their ingest keys share a prefix (see message_group),
+    which tells a retry journaled separately apart from the original.
+    """
+    now = time.time()
+    group = uuid.uuid4().hex
+    rows = [(f"{group}-{index}", _encode(fields), now, message_key) for index, fields in enumerate(fields_list)]
+    conn = _connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(INSERT_ENTRY, rows)
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return [ingest_key for ingest_key, _, _, _ in rows]
+
+
+def message_group(ingest_key: str) -> str:
+    """Entries enqueued together by enqueue_many share this"""
+    return ingest_key.partition("-")[0]
+
+
+def _encode(fields: Dict[str, Any]) -> str:
+    return json.dumps({k: v.isoformat() if isinstance(v, date) else v for k, v in fields.items()})
+
+
+def peek(limit: int) -> List[Tuple[int, str, Optional[str], Dict[str, Any]]]:
+    """
+    Oldest `limit` entries as (id, ingest_key, message_key, fields); entries
+    stay queued until ack()
+    """
+    rows = _connection().execute(
+        "SELECT id, ingest_key, message_key, payload FROM entries ORDER BY id LIMIT ?", (limit,)
+    ).fetchall()
+    entries = []
+    for entry_id, ingest_key, message_key, payload in rows:
+        fields = json.loads(payload)
+        if fields.get("date"):
+            fields["date"] = date.fromisoformat(fields["date"])
+        entries.append((entry_id, ingest_key, message_key, fields))
+    return entries
+
+
+def ack(last_id: int) -> None:
+    """Drop every entry up to and including last_id once it is committed to the database"""
+    _connection().execute("DELETE FROM entries WHERE id <= ?", (last_id,))
+
+
+def depth() -> int:
+    return _connection().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
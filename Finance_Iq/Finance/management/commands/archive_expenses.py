@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from Finance.archive import ARCHIVE_BATCH_SIZE, archive_after_days, archive_expenses
+
+
+class Command(BaseCommand):
+    help = "Move expenses older than ARCHIVE_AFTER_DAYS from the hot table into the archive tier"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, default=None,
+                            help=f"Archive age in days (default ARCHIVE_AFTER_DAYS, {archive_after_days()}; "
+                                 "may only be larger)")
+        parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            moved = archive_expenses(options["older_than_days"], options["batch_size"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} expenses"))
@@ -0,0 +1,117 @@
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, connections, reset_queries
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from Finance import views
+from Finance.analytics import get_weekly_summary, get_window_summaries
+from Finance.cache import summary_cache
+from Finance.models import Expense
+from Finance.pagination import KEYSET_ORDERING, encode_cursor
+
+from .generate_expenses import load_expenses
+
+DEFAULT_SCALES = "10000,100000,1000000"
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the analytics and list paths (weekly summary, get_summary, window summaries, "
+        "list_expenses first and deep pages) against synthetic datasets of increasing size. "
+        "Each scale runs on a fresh throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scales", default=DEFAULT_SCALES, help="Comma-separated row counts")
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Also write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        scales = [int(s) for s in options["scales"].split(",") if s.strip()]
+        results = []
+        for rows in scales:
+            self.stdout.write(f"{rows:,} rows")
+            for path, timing in self._run_scale(rows, options).items():
+                self.stdout.write(
+                    f"  {path:<28} median {timing['median_ms']:>9.3f} ms  "
+                    f"p95 {timing['p95_ms']:>9.3f} ms  queries {timing['queries']}"
+                )
+                results.append({"rows": rows, "path": path, **timing})
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+
+    def _run_scale(self, rows, options):
+        # A file database: large datasets do not fit comfortably in memory
+        tmpdir = tempfile.mkdtemp()
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir, "bench.sqlite3")
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            load_expenses(rows, options["users"], options["days"], seed=options["seed"])
+            # synthetic_user_0 is the heaviest user under the Zipf weights
+            heavy = "synthetic_user_0"
+            light = f"synthetic_user_{options['users'] - 1}"
+            deep_cursor = self._deep_cursor(heavy)
+            factory = RequestFactory()
+            paths = {
+                "weekly_summary[heavy]": lambda: get_weekly_summary(heavy),
+                "weekly_summary[light]": lambda: get_weekly_summary(light),
+                "window_summaries[heavy]": lambda: get_window_summaries(heavy, [7, 30, 90, 365]),
+                "get_summary[heavy]": lambda: views.get_summary(
+                    factory.get(f"/api/summary/{heavy}/", {"windows": "7,30"}), heavy
+                ),
+                "list_expenses[heavy]": lambda: b"".join(views.list_expenses(
+                    factory.get("/api/expenses/", {"user_id": heavy, "days": options["days"]})
+                )),
+                "list_expenses[heavy,deep]": lambda: b"".join(views.list_expenses(
+                    factory.get("/api/expenses/", {"user_id": heavy, "days": options["days"],
+                                                   "cursor": deep_cursor})
+                )),
+                "list_expenses[all users]": lambda: b"".join(views.list_expenses(
+                    factory.get("/api/expenses/", {"days": 7})
+                )),
+            }
+            return {name: self._time(run, options["repeat"]) for name, run in paths.items()}
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    @staticmethod
+    def _deep_cursor(user_id):
+        """Cursor for the row halfway through the user's history"""
+        rows = Expense.objects.filter(user_id=user_id).order_by(*KEYSET_ORDERING)
+        middle = rows.count() // 2
+        row = rows.values("date", "created_at", "id")[middle] if middle else None
+        return encode_cursor(row) if row else ""
+
+    @staticmethod
+    def _time(run, repeat):
+        samples = []
+        # The query log is a bounded deque; start empty so the capture can grow
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            for _ in range(repeat):
+                # Measure the uncached path; the summary cache would hide the queries
+                cache.clear()
+                summary_cache.clear()
+                start = time.perf_counter()
+                run()
+                samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        return {
+            "median_ms": statistics.median(samples),
+            "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            "queries": len(captured.captured_queries) // repeat,
+        }
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import AsyncRequestFactory, RequestFactory
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from Finance import async_views, views
+from Finance.cache import summary_cache
+from Finance.idempotency import seen_messages
+from Finance.parser import parse_expense
+from Finance.ratelimit import channel_limiter, user_limiter
+
+from .bench_parser import SAMPLE_MESSAGES
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent-request throughput of the sync views (WSGI-style thread pool) "
+        "against the async views (ASGI-style event loop). Runs against a throwaway test database "
+        "with rate limiting off, so both passes measure the views rather than 429 replies."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        users = [f"user_{i}" for i in range(options["users"])]
+        parseable = [m for m in SAMPLE_MESSAGES if parse_expense(m)]
+        workload = [
+            (rng.choice(["webhook", "summary", "summary", "list"]), rng.choice(users), rng.choice(parseable), index)
+            for index in range(options["requests"])
+        ]
+
+        setup_test_environment()
+        # A file database: SQLite's shared in-memory test database locks whole
+        # tables, which would serialise the thread pool on its own.
+        tmpdir = tempfile.mkdtemp()
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir, "bench.sqlite3")
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            with override_settings(RATE_LIMIT_ENABLED=False):
+                self._reset()
+                wsgi = self._run_wsgi(workload, options["concurrency"])
+                self._reset()
+                asgi = asyncio.run(self._run_asgi(workload, options["concurrency"]))
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        for label, (elapsed, errors) in [("WSGI (sync views)", wsgi), ("ASGI (async views)", asgi)]:
+            rate = len(workload) / elapsed
+            self.stdout.write(f"{label:<20} {rate:>10,.0f} req/s  errors={errors}")
+
+    @staticmethod
+    def _reset():
+        """Start each pass with the in-process state the other pass left behind cleared"""
+        for store in (user_limiter, channel_limiter, seen_messages, summary_cache):
+            store.clear()
+
+    @staticmethod
+    def _request(factory, kind, user_id, text, index, run):
+        if kind == "webhook":
+            # Unique per pass, so neither pass is answered as a retry of the other
+            body = json.dumps({"channelId": "bench", "from": {"id": user_id}, "text": text,
+                               "messageId": f"{run}-{index}"})
+            return factory.post("/a2a/financeiq/", body, content_type="application/json"), ()
+        if kind == "summary":
+            return factory.get(f"/api/summary/{user_id}/"), (user_id,)
+        return factory.get("/api/expenses/", {"user_id": user_id}), ()
+
+    def _run_wsgi(self, workload, concurrency):
+        factory = RequestFactory()
+        handlers = {"webhook": views.telex_expense_agent, "summary": views.get_summary,
+                    "list": views.list_expenses}
+
+        def call(item):
+            request, args = self._request(factory, *item, "wsgi")
+            try:
+                response = handlers[item[0]](request, *args)
+                if response.streaming:
+                    # The list query runs as the body is consumed
+                    b"".join(response.streaming_content)
+                return response.status_code
+            finally:
+                connections.close_all()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            statuses = list(pool.map(call, workload))
+        return time.perf_counter() - start, sum(status >= 500 for status in statuses)
+
+    async def _run_asgi(self, workload, concurrency):
+        factory = AsyncRequestFactory()
+        handlers = {"webhook": async_views.telex_expense_agent, "summary": async_views.get_summary,
+                    "list": async_views.list_expenses}
+        slots = asyncio.Semaphore(concurrency)
+
+        async def call(item):
+            async with slots:
+                request, args = self._request(factory, *item, "asgi")
+                response = await handlers[item[0]](request, *args)
+                if response.streaming:
+                    async for _ in response.streaming_content:
+                        pass
+                return response.status_code
+
+        start = time.perf_counter()
+        statuses = await asyncio.gather(*(call(item) for item in workload))
+        return time.perf_counter() - start, sum(status >= 500 for status in statuses)
@@ -0,0 +1,66 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from Finance.parser import parse_expense
+
+from .bench_parser import SAMPLE_MESSAGES
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare ingest rate of the per-message webhook against the batch webhook. "
+        "Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=2000)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        parseable = [m for m in SAMPLE_MESSAGES if parse_expense(m)]
+        payloads = [
+            {
+                "channelId": f"channel_{rng.randrange(5)}",
+                "from": {"id": f"user_{rng.randrange(options['users'])}"},
+                "text": rng.choice(parseable),
+            }
+            for _ in range(options["messages"])
+        ]
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            client = Client()
+            single = self._time(lambda: [
+                client.post(reverse("telex-expense-agent"), json.dumps(p), content_type="application/json")
+                for p in payloads
+            ])
+            size = options["batch_size"]
+            batch = self._time(lambda: [
+                client.post(reverse("telex-expense-batch"), json.dumps(payloads[i:i + size]),
+                            content_type="application/json")
+                for i in range(0, len(payloads), size)
+            ])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        single_rate, batch_rate = len(payloads) / single, len(payloads) / batch
+        self.stdout.write(f"per-message webhook {single_rate:>10,.0f} msg/s")
+        self.stdout.write(f"batch webhook       {batch_rate:>10,.0f} msg/s  ({batch_rate / single_rate:.1f}x)")
+
+    @staticmethod
+    def _time(run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
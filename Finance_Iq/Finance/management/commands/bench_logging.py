@@ -0,0 +1,59 @@
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from Finance.agent_logs import AgentLogHandler, JsonLineFormatter, QueuedAgentLogHandler
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-call logging latency on the request thread: synchronous file "
+        "handler vs the queued agent log handler"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--records", type=int, default=20000)
+
+    def handle(self, *args, **options):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            sync_handler = AgentLogHandler(os.path.join(tmpdir, "sync.txt"))
+            sync_handler.setFormatter(JsonLineFormatter())
+            queued_handler = QueuedAgentLogHandler(os.path.join(tmpdir, "queued.txt"))
+            for label, handler in [("synchronous file", sync_handler), ("queued (background)", queued_handler)]:
+                latencies = self._measure(handler, options["records"])
+                handler.flush()
+                handler.close()
+                self.stdout.write(
+                    f"{label:<20} p50={self._pct(latencies, 50):6.1f}us  "
+                    f"p99={self._pct(latencies, 99):6.1f}us  mean={statistics.fmean(latencies):6.1f}us"
+                )
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    @staticmethod
+    def _measure(handler, records):
+        logger = logging.getLogger(f"Finance.bench.{id(handler)}")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        latencies = []
+        try:
+            for i in range(records):
+                start = time.perf_counter()
+                logger.info("Successfully created expense %s for user %s", i, "user_1",
+                            extra={"channel_id": f"channel_{i % 8}", "user_id": "user_1"})
+                latencies.append((time.perf_counter() - start) * 1e6)
+        finally:
+            logger.removeHandler(handler)
+        return latencies
+
+    @staticmethod
+    def _pct(values, pct):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
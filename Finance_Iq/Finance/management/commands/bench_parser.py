@@ -0,0 +1,117 @@
+import random
+import re
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from Finance.parser import parse_expense, parse_expenses
+
+
+SAMPLE_MESSAGES = [
+    "I spent ₦5000 on food yesterday",
+    "₦2500 for transport today",
+    "spent 10000 on entertainment",
+    "Paid 1,500 for uber to the office",
+    "4500 naira for lunch with the team",
+    "cost 12000 electricity bill",
+    "₦ 3,200.50 groceries at the mall",
+    "bought new shoes 15000 naira",
+    "paid 800 for bus fare just now",
+    "spent 20000 on rent",
+    "movie tickets ₦6000",
+    "random note without an amount",
+]
+
+
+def _legacy_parse_expense(text):
+    """
+    Frozen copy of the pre-engine parser, kept as the benchmark baseline.
+    Its one change since is the "airtime" bills keyword, added to both
+    parsers with line items, so parse_expense must still match it exactly.
+    """
+    if not text or not isinstance(text, str):
+        return None
+    text_lower = text.lower().strip()
+    amount_patterns = [
+        r'[₦N]\s*(\d+(?:[,]\d{3})*(?:\.\d{2})?)',
+        r'(\d+(?:[,]\d{3})*(?:\.\d{2})?)\s*naira',
+        r'(?:spent|paid|cost)\s+(\d+(?:[,]\d{3})*(?:\.\d{2})?)',
+    ]
+    amount = None
+    for pattern in amount_patterns:
+        match = re.search(pattern, text_lower)
+        if match:
+            amount_str = match.group(1).replace(',', '')
+            try:
+                amount = float(amount_str)
+                break
+            except ValueError:
+                continue
+    if amount is None:
+        return None
+    category_keywords = {
+        "food": ["food", "breakfast", "lunch", "dinner", "meal", "restaurant", "grocery"],
+        "transport": ["transport", "uber", "taxi", "fuel", "gas", "bus", "train"],
+        "entertainment": ["entertainment", "movie", "cinema", "game", "concert", "party"],
+        "shopping": ["shopping", "clothes", "shoes", "shop", "store", "mall"],
+        "bills": ["bills", "electricity", "water", "rent", "internet", "phone", "subscription", "airtime"],
+    }
+    category = "other"
+    for cat, keywords in category_keywords.items():
+        if any(keyword in text_lower for keyword in keywords):
+            category = cat
+            break
+    today = date.today()
+    expense_date = today
+    if "yesterday" in text_lower:
+        expense_date = today - timedelta(days=1)
+    elif "today" in text_lower or "just now" in text_lower:
+        expense_date = today
+    description = text
+    description = re.sub(r'[₦N]\s*\d+(?:[,]\d{3})*(?:\.\d{2})?', '', description)
+    description = re.sub(r'\d+(?:[,]\d{3})*(?:\.\d{2})?\s*naira', '', description)
+    for phrase in ["i spent", "spent", "paid", "on", "for", "yesterday", "today"]:
+        description = description.replace(phrase, "")
+    description = description.strip()
+    return {
+        "amount": amount,
+        "category": category,
+        "date": expense_date,
+        "description": description if description else f"{category.capitalize()} expense"
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark expense parsing throughput (messages/sec) before and after the parser engine"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=50000, help="Messages parsed per run")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation; best is reported")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        corpus = [rng.choice(SAMPLE_MESSAGES) for _ in range(options["messages"])]
+
+        mismatches = sum(1 for text in set(corpus) if _legacy_parse_expense(text) != parse_expense(text))
+        if mismatches:
+            self.stderr.write(self.style.ERROR(f"{mismatches} messages parse differently from the baseline"))
+
+        runs = [
+            ("legacy parse_expense", lambda: [_legacy_parse_expense(t) for t in corpus]),
+            ("parse_expense", lambda: [parse_expense(t) for t in corpus]),
+            ("parse_expenses (batch)", lambda: parse_expenses(corpus)),
+        ]
+        baseline = None
+        for label, run in runs:
+            best = min(self._time(run) for _ in range(options["repeat"]))
+            rate = len(corpus) / best
+            baseline = baseline or rate
+            self.stdout.write(f"{label:<24} {rate:>12,.0f} msg/s  ({rate / baseline:.2f}x)")
+
+    @staticmethod
+    def _time(run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from Finance.ratelimit import TokenBucketLimiter, channel_limiter, check_rate_limit, user_limiter
+
+
+class Command(BaseCommand):
+    help = "Measure the per-check cost of the webhook rate limiter"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checks", type=int, default=1000000)
+        parser.add_argument("--keys", type=int, default=1000, help="Distinct users/channels cycled through")
+
+    def handle(self, *args, **options):
+        checks, keys = options["checks"], [f"user_{i}" for i in range(options["keys"])]
+        sequence = [keys[i % len(keys)] for i in range(checks)]
+
+        limiter = TokenBucketLimiter(capacity=20, rate=1.0)
+        start = time.perf_counter()
+        for key in sequence:
+            limiter.acquire(key)
+        bucket = (time.perf_counter() - start) / checks
+
+        # Limits nobody reaches, so every check charges both buckets
+        unlimited = (checks, checks)
+        with override_settings(RATE_LIMIT_USER=unlimited, RATE_LIMIT_CHANNEL=unlimited, RATE_LIMIT_CACHE=None):
+            accepted = self._time(sequence)
+        with override_settings(RATE_LIMIT_USER=(1, 1e-9), RATE_LIMIT_CACHE=None):
+            rejected = self._time(sequence)
+        user_limiter.clear()
+        channel_limiter.clear()
+
+        self.stdout.write(f"{checks:,} checks over {len(keys):,} keys")
+        self.stdout.write(f"  one bucket                  {bucket * 1e9:>8.0f} ns/check")
+        self.stdout.write(f"  check_rate_limit, accepted  {accepted * 1e9:>8.0f} ns/check (user + channel)")
+        self.stdout.write(f"  check_rate_limit, rejected  {rejected * 1e9:>8.0f} ns/check")
+
+    @staticmethod
+    def _time(sequence):
+        user_limiter.clear()
+        channel_limiter.clear()
+        start = time.perf_counter()
+        for key in sequence:
+            check_rate_limit(key, key)
+        return (time.perf_counter() - start) / len(sequence)
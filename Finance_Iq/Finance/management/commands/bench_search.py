@@ -0,0 +1,72 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.models import Count, Sum
+
+from Finance.models import Expense
+from Finance.search import search_expenses
+
+from .generate_expenses import load_expenses
+
+# Words from generate_expenses.DESCRIPTIONS, from rare to common
+QUERIES = ["concert", "uber", "bill", "lunch"]
+
+
+def _scan_search(user_id, query):
+    """Baseline: icontains over the user's rows, no full-text index, hot tier only"""
+    expenses = Expense.objects.filter(user_id=user_id, description__icontains=query)
+    return list(expenses.values("category").annotate(total=Sum("amount"), count=Count("id")))
+
+
+class Command(BaseCommand):
+    help = (
+        "Time full-text description search against an icontains scan on a synthetic "
+        "dataset. Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--expenses", type=int, default=1000000)
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        tmpdir = tempfile.mkdtemp()
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir, "bench.sqlite3")
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            start = time.perf_counter()
+            load_expenses(options["expenses"], options["users"], options["days"])
+            self.stdout.write(f"Loaded {options['expenses']:,} expenses in {time.perf_counter() - start:.1f}s")
+            # Cost follows the user's matches, not the table size: the Zipf head
+            # user has by far the most history, so the slowest searches
+            ranks = sorted({0, min(30, options["users"] - 1), options["users"] // 2})
+            for user_id in (f"synthetic_user_{rank}" for rank in ranks):
+                rows = Expense.objects.filter(user_id=user_id).count()
+                self.stdout.write(f"{user_id} ({rows:,} expenses)")
+                for query in QUERIES:
+                    indexed = self._time(lambda: search_expenses(user_id, query), options["repeat"])
+                    scan = self._time(lambda: _scan_search(user_id, query), max(1, options["repeat"] // 5))
+                    matches = search_expenses(user_id, query)["count"]
+                    self.stdout.write(
+                        f"  {query:<10} {matches:>8,} matches  full-text {indexed:>8.2f} ms  "
+                        f"icontains {scan:>8.2f} ms"
+                    )
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    @staticmethod
+    def _time(run, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
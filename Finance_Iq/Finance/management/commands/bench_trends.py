@@ -0,0 +1,81 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from Finance.models import Expense
+from Finance.trends import compute_trends
+
+from .generate_expenses import load_expenses
+
+
+def _naive_trends(user_id, days, top):
+    """Baseline: per-row Python loops over the user's raw expenses"""
+    today = date.today()
+    start = today - timedelta(days=days + 29 - 1)
+    daily = defaultdict(float)
+    by_category_day = defaultdict(float)
+    for expense in Expense.objects.filter(user_id=user_id, date__gte=start):
+        daily[expense.date] += float(expense.amount)
+        by_category_day[(expense.category, expense.date)] += float(expense.amount)
+    dates = [start + timedelta(days=i) for i in range(days + 29)]
+    series = []
+    for i in range(29, len(dates)):
+        series.append({
+            "total": daily[dates[i]],
+            "ma_7": sum(daily[d] for d in dates[i - 6:i + 1]) / 7,
+            "ma_30": sum(daily[d] for d in dates[i - 29:i + 1]) / 30,
+        })
+    totals = defaultdict(float)
+    for (category, day), amount in by_category_day.items():
+        if day >= dates[29]:
+            totals[category] += amount
+    return series, sorted(totals.items(), key=lambda item: -item[1])[:top]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the vectorised trends computation against a per-row Python baseline for a "
+        "single user with a large history. Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--expenses", type=int, default=100000, help="Expenses for the benchmarked user")
+        parser.add_argument("--days", type=int, default=90, help="Trend window")
+        parser.add_argument("--history-days", type=int, default=365)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        tmpdir = tempfile.mkdtemp()
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir, "bench.sqlite3")
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            # One user, so every generated row is theirs
+            load_expenses(options["expenses"], users=1, days=options["history_days"])
+            user_id = "synthetic_user_0"
+            days = options["days"]
+            vectorised = self._time(lambda: compute_trends(user_id, days), options["repeat"])
+            naive = self._time(lambda: _naive_trends(user_id, days, 3), max(1, options["repeat"] // 5))
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+        self.stdout.write(f"{options['expenses']:,} expenses, {days}-day window")
+        self.stdout.write(f"  per-row baseline  {naive:>10.2f} ms")
+        self.stdout.write(f"  vectorised        {vectorised:>10.2f} ms  ({naive / vectorised:.0f}x)")
+
+    @staticmethod
+    def _time(run, repeat):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - start) * 1000)
+        return statistics.median(samples)
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from Finance import journal
+from Finance.ingest import BULK_BATCH_SIZE, drain_journal
+
+
+class Command(BaseCommand):
+    help = "Drain the write-behind ingest journal into the database in bulk_create batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+        parser.add_argument("--interval", type=float, default=0.5,
+                            help="Seconds to sleep when the journal is empty")
+        parser.add_argument("--once", action="store_true", help="Exit once the journal is empty")
+
+    def handle(self, *args, **options):
+        drained = 0
+        try:
+            while True:
+                processed = drain_journal(options["batch_size"])
+                drained += processed
+                if processed:
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            journal.close()
+        self.stdout.write(self.style.SUCCESS(f"Drained {drained} journal entries"))
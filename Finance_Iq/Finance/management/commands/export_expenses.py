@@ -0,0 +1,35 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Finance.export import EXPORT_FORMATS, buffered, iter_export_rows, render_export
+
+
+class Command(BaseCommand):
+    help = "Stream a user's or channel's expense history to a file (or stdout) as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", dest="user_id")
+        parser.add_argument("--channel", dest="channel_id")
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+        parser.add_argument("--start", type=date.fromisoformat, help="First date to include (YYYY-MM-DD)")
+        parser.add_argument("--end", type=date.fromisoformat, help="Last date to include (YYYY-MM-DD)")
+        parser.add_argument("--category")
+        parser.add_argument("--output", "-o", help="Output path; defaults to stdout")
+
+    def handle(self, *args, **options):
+        if not (options["user_id"] or options["channel_id"]):
+            raise CommandError("Provide --user or --channel")
+
+        rows = iter_export_rows(
+            user_id=options["user_id"], channel_id=options["channel_id"],
+            start=options["start"], end=options["end"], category=options["category"],
+        )
+        blocks = buffered(render_export(rows, options["format"]))
+        if not options["output"]:
+            for block in blocks:
+                self.stdout.write(block, ending="")
+            return
+        with open(options["output"], "w", encoding="utf-8", newline="") as out:
+            for block in blocks:
+                out.write(block)
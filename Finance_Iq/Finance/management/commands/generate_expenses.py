@@ -0,0 +1,147 @@
+import random
+import time
+from datetime import datetime, time as dt_time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from Finance.anomalies import rebuild_category_stats
+from Finance.cache import summary_cache
+from Finance.models import Expense
+from Finance.rollups import rebuild_rollups
+from Finance.stats import reconcile_stats
+
+# Rows per executemany; one transaction per batch keeps memory flat at 10M rows
+INSERT_BATCH_SIZE = 10000
+
+# Share of expenses and median amount (naira) per category
+CATEGORY_MIX = {
+    "food": (0.34, 3500),
+    "transport": (0.24, 1500),
+    "bills": (0.12, 15000),
+    "shopping": (0.12, 9000),
+    "entertainment": (0.08, 6000),
+    "other": (0.10, 2500),
+}
+DESCRIPTIONS = {
+    "food": ["lunch", "groceries", "dinner with friends", "breakfast"],
+    "transport": ["uber to work", "bus fare", "fuel", "taxi home"],
+    "bills": ["electricity bill", "internet subscription", "rent", "phone airtime"],
+    "shopping": ["new shoes", "clothes at the mall", "store run"],
+    "entertainment": ["movie tickets", "concert", "party"],
+    "other": ["misc", "gift", "donation"],
+}
+
+
+def user_weights(users: int, skew: float):
+    """Zipf weights: user i gets 1 / (i + 1) ** skew, so a few users dominate"""
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(users)))
+
+
+def generate_rows(count: int, users: int, days: int, skew: float = 1.1, seed: int = 42):
+    """
+    Yield (user_id, channel_id, amount, category, description, date, created_at)
+    tuples. Users follow a Zipf distribution, categories CATEGORY_MIX, amounts
+    a log-normal around each category's median, and dates lean towards the
+    recent end of the `days` span.
+    """
+    rng = random.Random(seed)
+    cum_users = user_weights(users, skew)
+    categories = list(CATEGORY_MIX)
+    cum_categories = list(accumulate(share for share, _ in CATEGORY_MIX.values()))
+    today = timezone.localdate()
+    tz = timezone.get_current_timezone()
+    for _ in range(count):
+        user = rng.choices(range(users), cum_weights=cum_users)[0]
+        category = rng.choices(categories, cum_weights=cum_categories)[0]
+        median = CATEGORY_MIX[category][1]
+        amount = Decimal(max(50, round(rng.lognormvariate(0, 0.6) * median, -1))).quantize(Decimal("0.01"))
+        day = today - timedelta(days=int(days * rng.random() ** 1.5))
+        created_at = datetime.combine(day, dt_time(rng.randrange(24), rng.randrange(60), rng.randrange(60)), tz)
+        yield (
+            f"synthetic_user_{user}", f"synthetic_channel_{user % 97}", amount, category,
+            rng.choice(DESCRIPTIONS[category]), day, created_at,
+        )
+
+
+def load_expenses(count: int, users: int, days: int, skew: float = 1.1, seed: int = 42,
+                  batch_size: int = INSERT_BATCH_SIZE, progress=None) -> int:
+    """
+    Bulk-load synthetic expenses, then rebuild rollups (which bumps the
+    loaded users' data versions), dashboard counters and category stats.
+
+    Rows are inserted with executemany rather than bulk_create because
+    Expense.date is auto_now_add and would otherwise be forced to today.
+    """
+    qn = connection.ops.quote_name
+    columns = ("user_id", "channel_id", "amount", "category", "description", "date", "created_at")
+    sql = (
+        f"INSERT INTO {qn(Expense._meta.db_table)} ({', '.join(qn(c) for c in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+    ops = connection.ops
+    inserted = 0
+    batch = []
+
+    def flush():
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+
+    for user_id, channel_id, amount, category, description, day, created_at in generate_rows(
+        count, users, days, skew, seed
+    ):
+        batch.append((
+            user_id, channel_id, ops.adapt_decimalfield_value(amount, 12, 2), category, description,
+            ops.adapt_datefield_value(day), ops.adapt_datetimefield_value(created_at),
+        ))
+        if len(batch) >= batch_size:
+            flush()
+            inserted += len(batch)
+            batch = []
+            if progress:
+                progress(inserted)
+    if batch:
+        flush()
+        inserted += len(batch)
+
+    rebuild_rollups()
+    reconcile_stats()
+    rebuild_category_stats()
+    cache.clear()
+    summary_cache.clear()
+    return inserted
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load synthetic expenses with realistic skew (a few heavy users, a category "
+        "mix, recent-leaning dates), then rebuild rollups, dashboard counters and category stats."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--days", type=int, default=365, help="Spread dates over this many past days")
+        parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for expenses per user")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=INSERT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+
+        def progress(inserted):
+            if inserted % (options["batch_size"] * 10) == 0:
+                self.stdout.write(f"  {inserted:,} rows")
+
+        inserted = load_expenses(
+            options["rows"], options["users"], options["days"], options["skew"], options["seed"],
+            options["batch_size"], progress,
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {inserted:,} expenses in {elapsed:.1f}s ({inserted / elapsed:,.0f} rows/s)"
+        ))
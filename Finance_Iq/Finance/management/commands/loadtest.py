@@ -0,0 +1,204 @@
+import json
+import math
+import os
+import random
+import re
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection, connections
+from django.test import override_settings
+
+from Finance.parser import CATEGORY_KEYWORDS
+
+WEBHOOK_PATH = "/a2a/financeiq/"
+# Query count reported by RequestMetricsMiddleware in the Server-Timing header
+SERVER_TIMING_QUERIES = re.compile(r'\bdb;[^,]*desc="(\d+) queries"')
+
+# Message shapes parse_expense understands; {amount} and {keyword} are filled per request
+MESSAGE_TEMPLATES = [
+    "I spent ₦{amount} on {keyword} yesterday",
+    "₦{amount} for {keyword} today",
+    "spent {amount} on {keyword}",
+    "paid {amount} for {keyword}",
+    "{amount} naira for {keyword}",
+    "cost {amount} {keyword}",
+    "₦ {amount} {keyword} last week",
+]
+# A few messages with no amount, as real users send
+UNPARSEABLE_MESSAGES = ["hello", "what did I spend?", "thanks!"]
+UNPARSEABLE_RATE = 0.05
+
+
+def synthetic_message(rng: random.Random) -> str:
+    if rng.random() < UNPARSEABLE_RATE:
+        return rng.choice(UNPARSEABLE_MESSAGES)
+    keywords = rng.choice(list(CATEGORY_KEYWORDS.values()))
+    amount = rng.choice([rng.randint(1, 99) * 100, rng.randint(100, 50000)])
+    amount = f"{amount:,}" if rng.random() < 0.5 else str(amount)
+    return rng.choice(MESSAGE_TEMPLATES).format(amount=amount, keyword=rng.choice(keywords))
+
+
+def percentile(sorted_values, pct: float):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the webhook with synthetic expense messages from N users at a fixed "
+        "concurrency. Without --url a local server is started on a throwaway test database. "
+        "Reports throughput, latency percentiles, error rate and SQL queries per request, "
+        "and writes them to a JSON file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", help="Base URL of a running server, e.g. http://127.0.0.1:8000")
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Results file (default loadtest-<timestamp>.json)")
+        parser.add_argument("--no-rate-limit", action="store_true",
+                            help="Disable webhook rate limiting on the local server")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        users = [f"load_user_{i}" for i in range(options["users"])]
+        payloads = [
+            json.dumps({
+                # Unique IDs so repeated synthetic texts are not de-duplicated as retries
+                "messageId": f"load_{index}",
+                "channelId": f"load_channel_{user_id}",
+                "from": {"id": user_id},
+                "text": synthetic_message(rng),
+            }).encode("utf-8")
+            for index, user_id in enumerate(rng.choice(users) for _ in range(options["requests"]))
+        ]
+
+        started_at = datetime.now(timezone.utc)
+        if options["url"]:
+            results, elapsed = self._fire(options["url"].rstrip("/"), payloads, options)
+        else:
+            limits = override_settings(RATE_LIMIT_ENABLED=False) if options["no_rate_limit"] else nullcontext()
+            with limits:
+                results, elapsed = self._run_local(payloads, options)
+
+        report = self._report(results, elapsed, options, started_at)
+        output = options["output"] or f"loadtest-{started_at:%Y%m%dT%H%M%SZ}.json"
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+        latency = report["latency_ms"]
+        queries = report["queries_per_request"]
+        self.stdout.write(
+            f"{report['requests']} requests in {report['elapsed_s']:.2f}s "
+            f"({report['throughput_rps']:,.0f} req/s), errors {report['error_rate']:.2%}"
+        )
+        self.stdout.write(
+            f"latency ms  p50={latency['p50']:.2f}  p95={latency['p95']:.2f}  p99={latency['p99']:.2f}"
+        )
+        if queries:
+            self.stdout.write(f"SQL queries/request  mean={queries['mean']:.2f}  max={queries['max']}")
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    def _run_local(self, payloads, options):
+        # A file database: SQLite's shared in-memory test database locks whole
+        # tables, which would serialise the server threads on its own.
+        tmpdir = tempfile.mkdtemp()
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir, "loadtest.sqlite3")
+        old_name = connection.creation.create_test_db(verbosity=0)
+        server = ThreadedWSGIServer(("127.0.0.1", 0), _QuietHandler, allow_reuse_address=False)
+        server.set_app(WSGIHandler())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            host, port = server.server_address
+            return self._fire(f"http://{host}:{port}", payloads, options)
+        finally:
+            server.shutdown()
+            server.server_close()
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def _fire(self, base_url, payloads, options):
+        url = base_url + WEBHOOK_PATH
+
+        def send(body):
+            request = urllib.request.Request(
+                url, data=body, method="POST", headers={"Content-Type": "application/json"}
+            )
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=options["timeout"]) as response:
+                    response.read()
+                    status, headers = response.status, response.headers
+            except urllib.error.HTTPError as e:
+                status, headers = e.code, e.headers
+            except OSError as e:
+                return time.perf_counter() - start, type(e).__name__, None
+            queries = SERVER_TIMING_QUERIES.search(headers.get("Server-Timing", ""))
+            return time.perf_counter() - start, status, int(queries.group(1)) if queries else None
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(send, payloads))
+        return results, time.perf_counter() - start
+
+    @staticmethod
+    def _report(results, elapsed, options, started_at):
+        latencies = sorted(latency * 1000 for latency, _, _ in results)
+        statuses = Counter(str(status) for _, status, _ in results)
+        errors = sum(count for status, count in statuses.items() if not status.startswith("2"))
+        queries = [count for _, _, count in results if count is not None]
+        return {
+            "started_at": started_at.isoformat(),
+            "target": options["url"] or "local",
+            "requests": len(results),
+            "users": options["users"],
+            "concurrency": options["concurrency"],
+            "seed": options["seed"],
+            "async_views": settings.FINANCE_ASYNC_VIEWS,
+            "write_behind": settings.INGEST_WRITE_BEHIND,
+            "rate_limit": None if options["url"] else settings.RATE_LIMIT_ENABLED and not options["no_rate_limit"],
+            "elapsed_s": elapsed,
+            "throughput_rps": len(results) / elapsed if elapsed else 0.0,
+            "latency_ms": {
+                "mean": statistics.fmean(latencies) if latencies else None,
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": latencies[-1] if latencies else None,
+            },
+            "errors": errors,
+            "error_rate": errors / len(results) if results else 0.0,
+            "status_counts": dict(statuses),
+            "rate_limited": statuses.get("429", 0),
+            "queries_per_request": {
+                "mean": statistics.fmean(queries),
+                "max": max(queries),
+            } if queries else None,
+        }
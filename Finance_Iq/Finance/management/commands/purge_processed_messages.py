@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from Finance.idempotency import purge_expired_messages
+
+
+class Command(BaseCommand):
+    help = "Delete webhook idempotency records whose TTL has passed"
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_messages()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} expired message keys"))
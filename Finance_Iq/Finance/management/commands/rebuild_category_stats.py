@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from Finance.anomalies import REBUILD_BATCH_SIZE, rebuild_category_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user, per-category running stats used for anomaly alerts from expense history"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        written = rebuild_category_stats(options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} category stats rows"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from Finance.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user daily expense rollup table from raw expenses"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", dest="user_id", help="Only rebuild rollups for this user ID")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild_rollups(user_id=options["user_id"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} rollup rows"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from Finance.search import drop_search_index, install_search_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Recreate the description full-text indexes and refill them from the expense tables. "
+        "`migrate` already restores SQLite sync triggers dropped by a table rebuild."
+    )
+
+    def handle(self, *args, **options):
+        with connection.schema_editor() as schema_editor:
+            drop_search_index(schema_editor)
+            install_search_index(schema_editor)
+        self.stdout.write(self.style.SUCCESS("Search index rebuilt"))
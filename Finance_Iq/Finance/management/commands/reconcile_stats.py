@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from Finance.stats import reconcile_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard counters (total expenses, distinct users) from raw expenses"
+
+    def handle(self, *args, **options):
+        values = reconcile_stats()
+        self.stdout.write(self.style.SUCCESS(
+            ", ".join(f"{name}={value}" for name, value in values.items())
+        ))
@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Finance.routers import measure_replica_lag, replica_aliases
+
+
+class Command(BaseCommand):
+    help = "Measure how long a write on the primary takes to become visible on each read replica"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--timeout", type=float, default=10.0)
+        parser.add_argument("--poll-interval", type=float, default=0.05)
+        parser.add_argument("--json", action="store_true", help="Print the raw results as JSON")
+
+    def handle(self, *args, **options):
+        if not replica_aliases():
+            raise CommandError("No read replicas configured (set READ_REPLICA_ALIASES or FINANCE_READ_REPLICAS)")
+        results = measure_replica_lag(options["timeout"], options["poll_interval"])
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for alias, result in results.items():
+            if result["visible_after"] is not None:
+                self.stdout.write(f"{alias}: heartbeat visible after {result['visible_after'] * 1000:.1f} ms")
+            elif result["lag"] is not None:
+                self.stdout.write(self.style.WARNING(
+                    f"{alias}: not caught up after {options['timeout']}s, {result['lag']:.1f}s behind"
+                ))
+            else:
+                self.stdout.write(self.style.WARNING(f"{alias}: has never seen a heartbeat"))
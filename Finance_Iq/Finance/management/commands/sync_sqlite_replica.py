@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from Finance.routers import replica_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database onto each SQLite read replica. "
+        "Stands in for streaming replication when testing the router locally; "
+        "--interval sets the simulated replication delay."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=0,
+                            help="Keep syncing every N seconds instead of once")
+
+    def handle(self, *args, **options):
+        databases = settings.DATABASES
+        engines = {databases[alias]["ENGINE"] for alias in [DEFAULT_DB_ALIAS, *replica_aliases()]}
+        if engines != {"django.db.backends.sqlite3"}:
+            raise CommandError("sync_sqlite_replica only works when the primary and all replicas are SQLite")
+        if not replica_aliases():
+            raise CommandError("No read replicas configured (set FINANCE_READ_REPLICAS)")
+        try:
+            while True:
+                with sqlite3.connect(databases[DEFAULT_DB_ALIAS]["NAME"]) as source:
+                    for alias in replica_aliases():
+                        with sqlite3.connect(databases[alias]["NAME"]) as target:
+                            source.backup(target)
+                        target.close()
+                source.close()
+                self.stdout.write(f"Synced {', '.join(replica_aliases())}")
+                if not options["interval"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,168 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+# Seconds; covers a cached summary read up to a slow bulk insert
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+
+METRICS = {
+    "finance_request_duration_seconds": ("Wall time spent in the view, by view", DURATION_BUCKETS),
+    "finance_sql_duration_seconds": ("Time spent executing SQL per request, by view", DURATION_BUCKETS),
+    "finance_sql_queries": ("SQL statements executed per request, by view", QUERY_BUCKETS),
+    "finance_parse_duration_seconds": ("Time spent parsing expense messages per request, by view", DURATION_BUCKETS),
+}
+
+
+class RequestTiming:
+    """Mutable per-request tally, shared with sync_to_async threads through a ContextVar"""
+
+    __slots__ = ("queries", "sql_seconds", "parse_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.parse_seconds: Optional[float] = None
+
+
+_current: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+
+def start_timing() -> Tuple[RequestTiming, object]:
+    timing = RequestTiming()
+    return timing, _current.set(timing)
+
+
+def stop_timing(token) -> None:
+    _current.reset(token)
+
+
+def clear_timing() -> None:
+    """End timing from a context other than the one that started it, e.g. a response closer"""
+    _current.set(None)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every database connection. Outside a
+    timed request it costs one ContextVar lookup.
+    """
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.sql_seconds += time.perf_counter() - start
+        timing.queries += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver; wrappers persist across reconnects, so add it once"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def track_parse():
+    """Add the block's wall time to the current request's parse time"""
+    timing = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timing is not None:
+            timing.parse_seconds = (timing.parse_seconds or 0.0) + time.perf_counter() - start
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class MetricsRegistry:
+    """Histograms keyed by (metric, view); views are URL names, so label cardinality stays bounded"""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, view: str) -> Histogram:
+        key = (name, view)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(METRICS[name][1]))
+        return histogram
+
+    def observe_request(self, view: str, timing: RequestTiming, total_seconds: float) -> None:
+        self.histogram("finance_request_duration_seconds", view).observe(total_seconds)
+        self.histogram("finance_sql_duration_seconds", view).observe(timing.sql_seconds)
+        self.histogram("finance_sql_queries", view).observe(timing.queries)
+        if timing.parse_seconds is not None:
+            self.histogram("finance_parse_duration_seconds", view).observe(timing.parse_seconds)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format, version 0.0.4"""
+        with self._lock:
+            items = sorted(self._histograms.items())
+        lines = []
+        for name, (help_text, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, view), histogram in items:
+                if metric != name:
+                    continue
+                counts, total, count = histogram.snapshot()
+                label = f'view="{_escape(view)}"'
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{label},le="+Inf"}} {count}')
+                lines.append(f"{name}_sum{{{label}}} {total}")
+                lines.append(f"{name}_count{{{label}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def server_timing(timing: RequestTiming, total_seconds: float) -> str:
+    """Server-Timing header value; durations in milliseconds"""
+    parts = [f'db;dur={timing.sql_seconds * 1000:.2f};desc="{timing.queries} queries"']
+    if timing.parse_seconds is not None:
+        parts.append(f"parse;dur={timing.parse_seconds * 1000:.2f}")
+    parts.append(f"total;dur={total_seconds * 1000:.2f}")
+    return ", ".join(parts)
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,80 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import metrics
+from .routers import request_scope
+
+
+class ReadYourWritesMiddleware:
+    """
+    Scopes the router's primary pin to a single request, so a write pins
+    only the rest of that request's reads and never leaks into the next
+    request served by the same thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_scope():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with request_scope():
+            return await self.get_response(request)
+
+
+class RequestMetricsMiddleware:
+    """
+    Times each request and counts its SQL statements, then adds a
+    Server-Timing header and feeds the per-view histograms behind
+    /api/metrics/. For streaming responses the header covers the work done
+    before the first byte; the histograms are updated when the stream
+    closes, so they include the queries run while streaming.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing, token = metrics.start_timing()
+        start = time.perf_counter()
+        response = self.get_response(request)
+        return self._finish(request, response, timing, token, start)
+
+    async def __acall__(self, request):
+        timing, token = metrics.start_timing()
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self._finish(request, response, timing, token, start)
+
+    @staticmethod
+    def _finish(request, response, timing, token, start):
+        match = getattr(request, "resolver_match", None)
+        view = (match.url_name or match.view_name) if match else "unmatched"
+        response["Server-Timing"] = metrics.server_timing(timing, time.perf_counter() - start)
+        if response.streaming:
+            # Keep counting while the body streams; record once it is closed
+            def record():
+                metrics.registry.observe_request(view, timing, time.perf_counter() - start)
+                metrics.clear_timing()
+            response._resource_closers.append(record)
+        else:
+            metrics.registry.observe_request(view, timing, time.perf_counter() - start)
+            metrics.stop_timing(token)
+        return response
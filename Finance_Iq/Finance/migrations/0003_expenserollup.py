@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:26
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def seed_rollups(apps, schema_editor):
+    """Summaries read only rollups, so existing expenses are rolled up here"""
+    Expense = apps.get_model('Finance', 'Expense')
+    ExpenseRollup = apps.get_model('Finance', 'ExpenseRollup')
+    db_alias = schema_editor.connection.alias
+    totals = (
+        Expense.objects.using(db_alias).order_by()
+        .values('user_id', 'date', 'category')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    batch = []
+    for row in totals.iterator(chunk_size=1000):
+        batch.append(ExpenseRollup(**row))
+        if len(batch) >= 1000:
+            ExpenseRollup.objects.using(db_alias).bulk_create(batch)
+            batch = []
+    ExpenseRollup.objects.using(db_alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Finance', '0002_alter_expense_options_alter_expense_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(help_text='Telegram user ID', max_length=255)),
+                ('date', models.DateField()),
+                ('category', models.CharField(choices=[('food', 'Food'), ('transport', 'Transport'), ('entertainment', 'Entertainment'), ('shopping', 'Shopping'), ('bills', 'Bills'), ('other', 'Other')], max_length=50)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Expense rollups',
+                'constraints': [models.UniqueConstraint(fields=('user_id', 'date', 'category'), name='unique_rollup_user_date_category')],
+            },
+        ),
+        migrations.RunPython(seed_rollups, migrations.RunPython.noop),
+    ]
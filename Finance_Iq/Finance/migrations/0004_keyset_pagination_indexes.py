@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Finance', '0003_expenserollup'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='expense',
+            name='Finance_exp_user_id_880156_idx',
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['user_id', 'date', 'created_at', 'id'], name='Finance_exp_user_id_086c6d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['date', 'created_at', 'id'], name='Finance_exp_date_50c4be_idx'),
+        ),
+    ]
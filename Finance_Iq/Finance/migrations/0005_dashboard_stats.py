@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:33
+
+from django.db import migrations, models
+
+
+def seed_stats(apps, schema_editor):
+    Expense = apps.get_model('Finance', 'Expense')
+    StatCounter = apps.get_model('Finance', 'StatCounter')
+    KnownUser = apps.get_model('Finance', 'KnownUser')
+    db_alias = schema_editor.connection.alias
+    user_ids = Expense.objects.using(db_alias).order_by().values_list('user_id', flat=True).distinct()
+    KnownUser.objects.using(db_alias).bulk_create(
+        [KnownUser(user_id=user_id) for user_id in user_ids.iterator()], batch_size=500
+    )
+    StatCounter.objects.using(db_alias).create(name='total_expenses', value=Expense.objects.using(db_alias).count())
+    StatCounter.objects.using(db_alias).create(name='distinct_users', value=KnownUser.objects.using(db_alias).count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Finance', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KnownUser',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(help_text='Telegram user ID', max_length=255, unique=True)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StatCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Finance', '0005_dashboard_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='ingest_key',
+            field=models.CharField(blank=True, editable=False, help_text='Write-behind journal key; makes replays idempotent', max_length=64, null=True, unique=True),
+        ),
+    ]
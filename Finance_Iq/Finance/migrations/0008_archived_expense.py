@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Finance', '0007_replica_heartbeat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedExpense',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('user_id', models.CharField(help_text='Telegram user ID', max_length=255)),
+                ('channel_id', models.CharField(help_text='Telegram channel ID', max_length=255)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('category', models.CharField(choices=[('food', 'Food'), ('transport', 'Transport'), ('entertainment', 'Entertainment'), ('shopping', 'Shopping'), ('bills', 'Bills'), ('other', 'Other')], max_length=50)),
+                ('description', models.TextField(blank=True)),
+                ('date', models.DateField()),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Archived expenses',
+                'indexes': [models.Index(fields=['user_id', 'date', 'created_at', 'id'], name='Finance_arc_user_id_e8b586_idx'), models.Index(fields=['date', 'created_at', 'id'], name='Finance_arc_date_b4b3d4_idx'), models.Index(fields=['channel_id', 'date'], name='Finance_arc_channel_cec65a_idx')],
+            },
+        ),
+    ]
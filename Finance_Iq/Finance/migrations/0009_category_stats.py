@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Finance', '0008_archived_expense'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(help_text='Telegram user ID', max_length=255)),
+                ('category', models.CharField(choices=[('food', 'Food'), ('transport', 'Transport'), ('entertainment', 'Entertainment'), ('shopping', 'Shopping'), ('bills', 'Bills'), ('other', 'Other')], max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(default=0.0)),
+                ('m2', models.FloatField(default=0.0, help_text='Sum of squared deviations from the mean')),
+                ('ema', models.FloatField(default=0.0)),
+            ],
+            options={
+                'verbose_name_plural': 'Category stats',
+                'constraints': [models.UniqueConstraint(fields=('user_id', 'category'), name='unique_stats_user_category')],
+            },
+        ),
+    ]
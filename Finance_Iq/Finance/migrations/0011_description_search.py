@@ -0,0 +1,67 @@
+from django.db import migrations
+
+# The SQL is frozen here rather than built from Finance.search, so later
+# changes to the app code cannot change what this migration did.
+# Finance.search builds the same objects for `manage.py rebuild_search_index`
+# and re-creates dropped SQLite triggers after every migrate.
+
+SEARCH_TABLES = ("Finance_expense", "Finance_archivedexpense")
+
+
+def _sqlite_sql(table):
+    fts = f"{table}_fts"
+    delete = (f'INSERT INTO "{fts}"("{fts}", rowid, user_id, description) '
+              "VALUES ('delete', old.id, old.user_id, old.description);")
+    insert = f'INSERT INTO "{fts}"(rowid, user_id, description) VALUES (new.id, new.user_id, new.description);'
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS "{fts}" USING fts5('
+        f"user_id, description, content='{table}', content_rowid='id', tokenize=\"unicode61 tokenchars '_'\")",
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_ai" AFTER INSERT ON "{table}" BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_ad" AFTER DELETE ON "{table}" BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS "{fts}_au" AFTER UPDATE OF user_id, description ON "{table}" '
+        f"BEGIN {delete} {insert} END",
+        f"INSERT INTO \"{fts}\"(\"{fts}\") VALUES ('rebuild')",
+    ]
+
+
+def _postgres_sql(table):
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f'CREATE INDEX IF NOT EXISTS "{table}_description_fts" '
+        f"ON \"{table}\" USING GIN (to_tsvector('simple', description))",
+        f'CREATE INDEX IF NOT EXISTS "{table}_description_trgm" '
+        f'ON "{table}" USING GIN (description gin_trgm_ops)',
+    ]
+
+
+def create_search_index(apps, schema_editor):
+    build = {"sqlite": _sqlite_sql, "postgresql": _postgres_sql}.get(schema_editor.connection.vendor)
+    if build is None:
+        return
+    for table in SEARCH_TABLES:
+        for sql in build(table):
+            schema_editor.execute(sql)
+
+
+def remove_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in SEARCH_TABLES:
+        if vendor == "sqlite":
+            fts = f"{table}_fts"
+            for suffix in ("_ai", "_ad", "_au"):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS "{fts}{suffix}"')
+            schema_editor.execute(f'DROP TABLE IF EXISTS "{fts}"')
+        elif vendor == "postgresql":
+            for suffix in ("_description_fts", "_description_trgm"):
+                schema_editor.execute(f'DROP INDEX IF EXISTS "{table}{suffix}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Finance', '0010_processed_message'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, remove_search_index),
+    ]
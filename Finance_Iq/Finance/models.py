@@ -23,14 +23,147 @@ class Expense(models.Model):
     description = models.TextField(blank=True)
     date = models.DateField(auto_now_add=True, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    ingest_key = models.CharField(max_length=64, null=True, blank=True, unique=True, editable=False,
+                                  help_text="Write-behind journal key; makes replays idempotent")
 
     class Meta:
         verbose_name_plural = "Expenses"
         ordering = ['-date', '-created_at']
         indexes = [
-            models.Index(fields=['user_id', 'date']),
+            # Keyset pagination order (see Finance/pagination.py), with and without a user filter
+            models.Index(fields=['user_id', 'date', 'created_at', 'id']),
+            models.Index(fields=['date', 'created_at', 'id']),
             models.Index(fields=['user_id', 'category']),
         ]
 
     def __str__(self):
-        return f"{self.user_id}: ₦{self.amount} ({self.category})"
\ No newline at end of file
+        return f"{self.user_id}: ₦{self.amount} ({self.category})"
+
+class ExpenseRollup(models.Model):
+    """Per-user daily totals by category, maintained alongside Expense inserts"""
+
+    user_id = models.CharField(max_length=255, help_text="Telegram user ID")
+    date = models.DateField()
+    category = models.CharField(max_length=50, choices=Expense.CATEGORY_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Expense rollups"
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'date', 'category'], name='unique_rollup_user_date_category'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.date} {self.category}: ₦{self.total} ({self.count})"
+
+
+class StatCounter(models.Model):
+    """Named counter for dashboard stats, maintained on insert and reconciled periodically"""
+
+    TOTAL_EXPENSES = "total_expenses"
+    DISTINCT_USERS = "distinct_users"
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+
+class KnownUser(models.Model):
+    """Every user ID that has logged an expense; a new row means a new distinct user"""
+
+    user_id = models.CharField(max_length=255, unique=True, help_text="Telegram user ID")
+    first_seen = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.user_id
+
+
+class UserDataVersion(models.Model):
+    """Per-user counter bumped in every transaction that changes the user's expenses; drives API ETags"""
+
+    user_id = models.CharField(max_length=255, unique=True, help_text="Telegram user ID")
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.user_id} v{self.version}"
+
+
+class ReplicaHeartbeat(models.Model):
+    """Single row written on the primary; its age on a replica is that replica's lag"""
+
+    beat_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.beat_at.isoformat()
+
+
+class ArchivedExpense(models.Model):
+    """
+    Cold-tier copy of an Expense older than ARCHIVE_AFTER_DAYS. Ids are kept,
+    so keyset cursors and exports span both tiers; only the indexes the
+    historical reads need are built.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    user_id = models.CharField(max_length=255, help_text="Telegram user ID")
+    channel_id = models.CharField(max_length=255, help_text="Telegram channel ID")
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    category = models.CharField(max_length=50, choices=Expense.CATEGORY_CHOICES)
+    description = models.TextField(blank=True)
+    date = models.DateField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = "Archived expenses"
+        indexes = [
+            models.Index(fields=['user_id', 'date', 'created_at', 'id']),
+            models.Index(fields=['date', 'created_at', 'id']),
+            models.Index(fields=['channel_id', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: ₦{self.amount} ({self.category}, archived)"
+
+
+class CategoryStats(models.Model):
+    """
+    Running amount statistics per user and category: Welford count/mean/M2
+    for the variance and an exponential moving average of recent spend.
+    Updated in O(1) per expense; see Finance/anomalies.py.
+    """
+
+    user_id = models.CharField(max_length=255, help_text="Telegram user ID")
+    category = models.CharField(max_length=50, choices=Expense.CATEGORY_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(default=0.0)
+    m2 = models.FloatField(default=0.0, help_text="Sum of squared deviations from the mean")
+    ema = models.FloatField(default=0.0)
+
+    class Meta:
+        verbose_name_plural = "Category stats"
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'category'], name='unique_stats_user_category'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.category}: n={self.count} mean={self.mean:.2f} ema={self.ema:.2f}"
+
+
+class ProcessedMessage(models.Model):
+    """
+    Webhook messages already turned into expenses, keyed by upstream message
+    ID or content hash (see Finance/idempotency.py). Rows past expires_at
+    are taken over by the next claim or removed by `purge_processed_messages`.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key[:12]} (expires {self.expires_at:%Y-%m-%d %H:%M})"
@@ -0,0 +1,107 @@
+import base64
+import json
+from datetime import date, datetime
+
+from django.db.models import Q
+
+# Keyset order for expense listings; id breaks ties between equal timestamps
+KEYSET_ORDERING = ('-date', '-created_at', '-id')
+LIST_FIELDS = ('id', 'user_id', 'amount', 'category', 'description', 'date', 'created_at')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row) -> str:
+    """Opaque cursor pointing just past `row` (a values() dict)"""
+    raw = json.dumps([row['date'].isoformat(), row['created_at'].isoformat(), row['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Q:
+    """Filter selecting rows that sort after the cursor in KEYSET_ORDERING"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        day, created_at, pk = json.loads(base64.urlsafe_b64decode(padded))
+        day = date.fromisoformat(day)
+        created_at = datetime.fromisoformat(created_at)
+        pk = int(pk)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    return (
+        Q(date__lt=day)
+        | Q(date=day, created_at__lt=created_at)
+        | Q(date=day, created_at=created_at, id__lt=pk)
+    )
+
+
+def parse_limit(value) -> int:
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def serialize_row(row) -> dict:
+    """JSON-ready dict for an expense values() row"""
+    return {
+        'id': row['id'],
+        'user_id': row['user_id'],
+        'amount': float(row['amount']),
+        'category': row['category'],
+        'description': row['description'],
+        'date': row['date'].isoformat(),
+        'created_at': row['created_at'].isoformat(),
+    }
+
+
+class PageWriter:
+    """
+    Incrementally renders a page of rows as a JSON object so the response
+    can be streamed without holding the whole payload in memory.
+
+    The page query fetches limit + 1 rows; the extra row only signals that
+    there is a next page and is never emitted.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.count = 0
+        self.last = None
+        self.has_more = False
+
+    def start(self) -> str:
+        return '{"expenses": ['
+
+    def row(self, row) -> str:
+        if self.count >= self.limit:
+            self.has_more = True
+            return ''
+        chunk = (',' if self.count else '') + json.dumps(serialize_row(row))
+        self.count += 1
+        self.last = row
+        return chunk
+
+    def end(self) -> str:
+        next_cursor = encode_cursor(self.last) if self.has_more else None
+        return '], ' + json.dumps({'count': self.count, 'next_cursor': next_cursor})[1:]
+
+
+def stream_page(rows, limit: int):
+    writer = PageWriter(limit)
+    yield writer.start()
+    for row in rows:
+        yield writer.row(row)
+    yield writer.end()
+
+
+async def astream_page(rows, limit: int):
+    writer = PageWriter(limit)
+    yield writer.start()
+    async for row in rows:
+        yield writer.row(row)
+    yield writer.end()
@@ -1,85 +1,256 @@
 import re
 from datetime import datetime, timedelta, date
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List
 
 
-def parse_expense(text: str) -> Optional[Dict[str, Any]]:
+# Everything below is built once at import so a parse call only runs
+# precompiled patterns against the message.
+_NUMBER = r'\d+(?:[,]\d{3})*(?:\.\d{2})?'
+
+# Amount patterns in priority order, each paired with a literal the text must
+# contain for the pattern to match, so hopeless patterns are never run.
+AMOUNT_PATTERNS = [
+    (re.compile(r'[₦N]\s*(' + _NUMBER + r')'), '₦'),  # ₦5,000 or N5000
+    (re.compile(r'(' + _NUMBER + r')\s*naira'), 'naira'),  # 5000 naira
+    (re.compile(r'(?:spent|paid|cost)\s+(' + _NUMBER + r')'), ''),  # spent 5000
+]
+
+# Category keywords; dict order is the tie-break priority when a message
+# mentions more than one category.
+CATEGORY_KEYWORDS = {
+    "food": ["food", "breakfast", "lunch", "dinner", "meal", "restaurant", "grocery"],
+    "transport": ["transport", "uber", "taxi", "fuel", "gas", "bus", "train"],
+    "entertainment": ["entertainment", "movie", "cinema", "game", "concert", "party"],
+    "shopping": ["shopping", "clothes", "shoes", "shop", "store", "mall"],
+    "bills": ["bills", "electricity", "water", "rent", "internet", "phone", "subscription", "airtime"],
+}
+
+DESCRIPTION_AMOUNT_PATTERNS = [
+    re.compile(r'[₦N]\s*' + _NUMBER),
+    re.compile(_NUMBER + r'\s*naira'),
+]
+DESCRIPTION_PHRASES = ["i spent", "spent", "paid", "on", "for", "yesterday", "today"]
+
+# Line items in one message are separated by ';', newlines, 'and', or a comma
+# that is not a thousands separator (a digit before and three digits after).
+_ITEM_SEPARATOR = re.compile(r'\s*(?:[;\n]|\band\b|(?<!\d),|,(?!\d{3}(?!\d)))\s*', re.IGNORECASE)
+_SEPARATOR_LITERALS = (",", ";", "\n")
+# A number without ₦ leading or ending a line item: "2000 transport",
+# "airtime 1500", "2k data", "ngn 1500 airtime"
+_BARE_AMOUNT = re.compile(
+    r'^(?:ngn\s*)?(?P<lead>' + _NUMBER + r')(?P<lead_k>k)?(?![\w.])'
+    r'|(?<![\w.])(?P<tail>' + _NUMBER + r')(?P<tail_k>k)?(?:\s*ngn)?$'
+)
+# Smaller bare numbers are counts ("3 pairs"), not naira amounts
+MIN_BARE_AMOUNT = 10
+
+
+def _bare_amount(segment_lower: str):
     """
-    Parse natural language expense text.
-    
-    Example inputs:
-        "I spent ₦5000 on food yesterday"
-        "₦2500 for transport today"
-        "spent 10000 on entertainment"
-    
-    Returns:
-        Dict with keys: amount, category, date, description
-        None if parsing fails
+    The match and naira value of a line item's bare amount, or None. The
+    number only counts as an amount when it is marked (NGN, a k suffix) or
+    the segment names a category: "20 litres", "45 minutes" and "table 14"
+    are details of the item before them, not expenses.
     """
-    if not text or not isinstance(text, str):
+    match = _BARE_AMOUNT.search(segment_lower)
+    if not match:
         return None
-    
-    text_lower = text.lower().strip()
-    
-    # Extract amount - handles ₦, N prefix or just numbers
-    amount_patterns = [
-        r'[₦N]\s*(\d+(?:[,]\d{3})*(?:\.\d{2})?)',  # ₦5,000 or N5000
-        r'(\d+(?:[,]\d{3})*(?:\.\d{2})?)\s*naira',  # 5000 naira
-        r'(?:spent|paid|cost)\s+(\d+(?:[,]\d{3})*(?:\.\d{2})?)',  # spent 5000
-    ]
-    
-    amount = None
-    for pattern in amount_patterns:
-        match = re.search(pattern, text_lower)
+    if match.group("lead"):
+        number, thousands = match.group("lead"), match.group("lead_k")
+    else:
+        number, thousands = match.group("tail"), match.group("tail_k")
+    value = float(number.replace(',', '')) * (1000 if thousands else 1)
+    marked = bool(thousands) or "ngn" in match.group(0)
+    if value < MIN_BARE_AMOUNT or not (marked or _match_category(segment_lower) != "other"):
+        return None
+    return match, value
+
+
+def _build_trie_pattern(words: Iterable[str]) -> str:
+    """
+    Compile a set of words into a trie-shaped regex, e.g.
+    ["bus", "bills"] -> "b(?:ills|us)". The engine walks the trie once per
+    text position instead of testing every keyword separately.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def emit(node: Dict[str, Any]) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            # Prefer the longest keyword; shorter ones are resolved via _KEYWORD_RANK
+            return "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+
+_CATEGORY_ORDER = list(CATEGORY_KEYWORDS)
+_KEYWORD_CATEGORY = {
+    keyword: rank
+    for rank, cat in enumerate(_CATEGORY_ORDER)
+    for keyword in CATEGORY_KEYWORDS[cat]
+}
+# A match is the longest keyword starting at a position, so its rank is the
+# best rank of every keyword that is a prefix of it (e.g. "shop"/"shopping").
+_KEYWORD_RANK = {
+    keyword: min(rank for other, rank in _KEYWORD_CATEGORY.items() if keyword.startswith(other))
+    for keyword in _KEYWORD_CATEGORY
+}
+# Zero-width lookahead so overlapping keywords are all seen in one scan.
+_KEYWORD_RE = re.compile("(?=(" + _build_trie_pattern(_KEYWORD_CATEGORY) + "))")
+
+
+def _match_category(text_lower: str) -> str:
+    """Return the highest priority category mentioned in the text, or 'other'."""
+    best = min(map(_KEYWORD_RANK.__getitem__, _KEYWORD_RE.findall(text_lower)), default=None)
+    return "other" if best is None else _CATEGORY_ORDER[best]
+
+
+def _find_amount(text_lower: str) -> Optional[float]:
+    """First amount in the text by AMOUNT_PATTERNS priority - handles ₦, N prefix or just numbers"""
+    for pattern, guard in AMOUNT_PATTERNS:
+        if guard not in text_lower:
+            continue
+        match = pattern.search(text_lower)
         if match:
-            amount_str = match.group(1).replace(',', '')
             try:
-                amount = float(amount_str)
-                break
+                return float(match.group(1).replace(',', ''))
             except ValueError:
                 continue
-    
+    return None
+
+
+def _describe(text: str, category: str, strip_chars: Optional[str] = None) -> str:
+    """Description - the text without its amount and common phrases"""
+    description = text
+    for pattern in DESCRIPTION_AMOUNT_PATTERNS:
+        description = pattern.sub('', description)
+    for phrase in DESCRIPTION_PHRASES:
+        description = description.replace(phrase, "")
+    description = description.strip(strip_chars)
+    return description if description else f"{category.capitalize()} expense"
+
+
+def _parse(text: str, today: date) -> Optional[Dict[str, Any]]:
+    if not text or not isinstance(text, str):
+        return None
+
+    text_lower = text.lower().strip()
+
+    amount = _find_amount(text_lower)
     if amount is None:
         return None
-    
-    # Extract category - check for keywords
-    category_keywords = {
-        "food": ["food", "breakfast", "lunch", "dinner", "meal", "restaurant", "grocery"],
-        "transport": ["transport", "uber", "taxi", "fuel", "gas", "bus", "train"],
-        "entertainment": ["entertainment", "movie", "cinema", "game", "concert", "party"],
-        "shopping": ["shopping", "clothes", "shoes", "shop", "store", "mall"],
-        "bills": ["bills", "electricity", "water", "rent", "internet", "phone", "subscription"],
-    }
-    
-    category = "other"
-    for cat, keywords in category_keywords.items():
-        if any(keyword in text_lower for keyword in keywords):
-            category = cat
-            break
-    
+
+    category = _match_category(text_lower)
+
     # Extract date - handle relative dates
-    today = date.today()
     expense_date = today
-    
     if "yesterday" in text_lower:
         expense_date = today - timedelta(days=1)
-    elif "today" in text_lower or "just now" in text_lower:
-        expense_date = today
     # Add more date parsing as needed (e.g., "last week", specific dates)
-    
-    # Extract description - remove amount and common phrases
-    description = text
-    # Remove amount mentions
-    description = re.sub(r'[₦N]\s*\d+(?:[,]\d{3})*(?:\.\d{2})?', '', description)
-    description = re.sub(r'\d+(?:[,]\d{3})*(?:\.\d{2})?\s*naira', '', description)
-    # Remove common phrases
-    for phrase in ["i spent", "spent", "paid", "on", "for", "yesterday", "today"]:
-        description = description.replace(phrase, "")
-    description = description.strip()
-    
+
     return {
         "amount": amount,
         "category": category,
         "date": expense_date,
-        "description": description if description else f"{category.capitalize()} expense"
-    }
\ No newline at end of file
+        "description": _describe(text, category),
+    }
+
+
+def _parse_items(text: str, today: date) -> List[Dict[str, Any]]:
+    """
+    Split a message into line items: a segment with an amount starts an
+    item, segments without one are folded into the item before them. After
+    the first item, a bare number of at least MIN_BARE_AMOUNT leading or
+    ending a segment counts as its amount ("₦5000 food, 2000 transport")
+    when the segment marks it or names a category (see _bare_amount).
+    Fewer than two items means the message is a single expense, parsed
+    exactly as parse_expense would.
+    """
+    whole = _parse(text, today)
+    if whole is None:
+        return []
+    # Most messages have no separator at all; skip the split for them
+    if not any(separator in text for separator in _SEPARATOR_LITERALS) and " and " not in text.lower():
+        return [whole]
+    segments = [segment for segment in _ITEM_SEPARATOR.split(text.strip()) if segment]
+    if len(segments) < 2:
+        return [whole]
+
+    items, pending = [], []
+    for segment in segments:
+        segment_lower = segment.lower()
+        amount = _find_amount(segment_lower)
+        if amount is None and items:
+            bare = _bare_amount(segment_lower)
+            if bare:
+                match, amount = bare
+                segment = (segment[:match.start()] + segment[match.end():]).strip()
+        if amount is None:
+            (items[-1][1] if items else pending).append(segment)
+            continue
+        items.append((amount, pending + [segment]))
+        pending = []
+    if len(items) < 2:
+        return [whole]
+
+    parsed = []
+    for amount, parts in items:
+        item_text = ", ".join(parts)
+        category = _match_category(item_text.lower())
+        parsed.append({
+            "amount": amount,
+            "category": category,
+            "date": whole["date"],
+            # Also trim the separators a removed amount or phrase leaves behind
+            "description": _describe(item_text, category, " \t\r\n,;"),
+        })
+    return parsed
+
+
+def parse_expense(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse natural language expense text.
+
+    Example inputs:
+        "I spent ₦5000 on food yesterday"
+        "₦2500 for transport today"
+        "spent 10000 on entertainment"
+
+    Returns:
+        Dict with keys: amount, category, date, description
+        None if parsing fails
+    """
+    return _parse(text, date.today())
+
+
+def parse_line_items(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse a message that may hold several expenses, e.g.
+    "₦5000 food, 2000 transport, 1500 airtime".
+
+    Returns one parse_expense-style dict per line item, sharing the
+    message's date; a single-expense message gives a one-item list and an
+    unparseable one an empty list.
+    """
+    return _parse_items(text, date.today())
+
+
+def parse_expenses(texts: Iterable[str]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Parse many expense texts in one call.
+
+    Returns a list aligned with the input, holding the parsed dict or None
+    for each text, exactly as parse_expense would.
+    """
+    today = date.today()
+    return [_parse(text, today) for text in texts]
@@ -0,0 +1,140 @@
+import time
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+_monotonic = time.monotonic
+
+
+class TokenBucketLimiter:
+    """
+    In-process token buckets keyed by an arbitrary string. Each key holds up
+    to `capacity` tokens and regains `rate` tokens per second; a request
+    takes one. A bucket is only touched when its key is checked, so a check
+    is a dict lookup and a few float operations.
+
+    There is deliberately no lock (it would triple the cost of a check):
+    two threads racing on one bucket can each spend the same token, which
+    only ever admits a request or two more than the limit.
+
+    At most `max_keys` buckets are kept: when full, buckets that have
+    refilled completely (indistinguishable from new ones) are dropped, and
+    if none have, every bucket is reset rather than growing without bound.
+    """
+
+    def __init__(self, capacity: float, rate: float, max_keys: int = 100000):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.max_keys = max_keys
+        self._buckets = {}
+
+    def acquire(self, key: str) -> float:
+        """Take a token for `key`: 0.0 if allowed, else seconds until one is available"""
+        now = _monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = [self.capacity - 1, now]
+            return 0.0
+        tokens = bucket[0] + (now - bucket[1]) * self.rate
+        if tokens > self.capacity:
+            tokens = self.capacity
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+        bucket[0] = tokens
+        return (1 - tokens) / self.rate
+
+    def _prune(self, now: float) -> None:
+        capacity, rate = self.capacity, self.rate
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * rate < capacity
+        }
+        if len(self._buckets) >= self.max_keys:
+            self._buckets = {}
+
+    def clear(self) -> None:
+        self._buckets = {}
+
+
+def shared_acquire(alias: str, key: str, capacity: float, rate: float) -> float:
+    """
+    The same budget enforced across processes through Django's cache, as a
+    fixed-window counter (the cache API has incr but no compare-and-set).
+    Returns 0.0 if allowed, else seconds until the window rolls over. A
+    counter evicted between add() and incr() lets the request through.
+    """
+    window = max(1, round(capacity / rate))
+    now = time.time()
+    slot = int(now // window)
+    backend = caches[alias]
+    cache_key = f"finance:ratelimit:{key}:{slot}"
+    backend.add(cache_key, 0, timeout=window * 2)
+    try:
+        count = backend.incr(cache_key)
+    except ValueError:
+        return 0.0
+    return 0.0 if count <= capacity else (slot + 1) * window - now
+
+
+user_limiter = TokenBucketLimiter(20, 1.0)
+channel_limiter = TokenBucketLimiter(120, 10.0)
+
+# Settings are copied into module globals: reading them through the lazy
+# settings object would cost more than the check itself
+_enabled = True
+_shared_alias: Optional[str] = None
+
+
+def configure(**kwargs) -> None:
+    """Load the RATE_LIMIT_* settings; connected to setting_changed so override_settings applies"""
+    global _enabled, _shared_alias
+    _enabled = getattr(settings, "RATE_LIMIT_ENABLED", True)
+    _shared_alias = getattr(settings, "RATE_LIMIT_CACHE", None)
+    user_limiter.capacity, user_limiter.rate = map(float, getattr(settings, "RATE_LIMIT_USER", (20, 1.0)))
+    channel_limiter.capacity, channel_limiter.rate = map(float, getattr(settings, "RATE_LIMIT_CHANNEL", (120, 10.0)))
+
+
+configure()
+
+
+def check_rate_limit(user_id: str, channel_id: str) -> float:
+    """
+    Charge one webhook message to its user's and channel's buckets. Returns
+    0.0 if it may proceed, else the seconds the sender should wait.
+
+    The in-process buckets answer first, so a flood is rejected without
+    leaving the process; with RATE_LIMIT_CACHE set, messages they accept
+    are also counted in that shared cache so the limit holds across workers.
+    """
+    if not _enabled:
+        return 0.0
+    wait = user_limiter.acquire(user_id) or channel_limiter.acquire(channel_id)
+    if wait or _shared_alias is None:
+        return wait
+    return _shared_check(user_id, channel_id)
+
+
+async def acheck_rate_limit(user_id: str, channel_id: str) -> float:
+    """
+    check_rate_limit for async views: the in-process buckets are checked on
+    the event loop, the shared cache's blocking round trips in a thread.
+    """
+    if not _enabled:
+        return 0.0
+    wait = user_limiter.acquire(user_id) or channel_limiter.acquire(channel_id)
+    if wait or _shared_alias is None:
+        return wait
+    return await sync_to_async(_shared_check)(user_id, channel_id)
+
+
+def _shared_check(user_id: str, channel_id: str) -> float:
+    return (
+        shared_acquire(_shared_alias, f"user:{user_id}", user_limiter.capacity, user_limiter.rate)
+        or shared_acquire(_shared_alias, f"channel:{channel_id}", channel_limiter.capacity, channel_limiter.rate)
+    )
@@ -0,0 +1,141 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+
+from .models import ArchivedExpense, Expense, ExpenseRollup
+
+
+# Backends that support INSERT ... ON CONFLICT DO UPDATE with increments
+UPSERT_VENDORS = ("sqlite", "postgresql")
+
+
+def _to_decimal(amount) -> Decimal:
+    """Expense amounts may still be floats on freshly created instances"""
+    if isinstance(amount, Decimal):
+        return amount
+    return Decimal(str(amount)).quantize(Decimal('0.01'))
+
+
+def apply_expenses(expenses: Iterable[Expense], sign: int = 1) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) expenses from the daily rollup table.
+
+    Expenses are grouped by (user_id, date, category) first. Inserts on
+    SQLite/Postgres become a single upsert round-trip; other backends and
+    deletes cost one UPDATE per touched rollup row. Call inside the
+    transaction that inserted or deleted the expenses.
+    """
+    deltas = defaultdict(lambda: [Decimal('0.00'), 0])
+    for expense in expenses:
+        delta = deltas[(expense.user_id, expense.date, expense.category)]
+        delta[0] += _to_decimal(expense.amount)
+        delta[1] += 1
+
+    _apply_rows([(user_id, day, category, total * sign, count * sign)
+                 for (user_id, day, category), (total, count) in deltas.items()], sign)
+
+
+def _apply_rows(rows, sign: int = 1) -> None:
+    """Add (user_id, date, category, total, count) deltas, already signed, to their rollup rows"""
+    if sign > 0 and connection.vendor in UPSERT_VENDORS:
+        _upsert(rows)
+        return
+
+    for user_id, day, category, total, count in rows:
+        key = {"user_id": user_id, "date": day, "category": category}
+        updated = ExpenseRollup.objects.filter(**key).update(
+            total=F("total") + total, count=F("count") + count
+        )
+        if updated or sign < 0:
+            continue
+        try:
+            with transaction.atomic():
+                ExpenseRollup.objects.create(total=total, count=count, **key)
+        except IntegrityError:
+            # A concurrent writer created the row first
+            ExpenseRollup.objects.filter(**key).update(
+                total=F("total") + total, count=F("count") + count
+            )
+
+
+def _upsert(rows) -> None:
+    """Increment-or-insert every rollup row in one executemany round-trip"""
+    qn = connection.ops.quote_name
+    table = qn(ExpenseRollup._meta.db_table)
+    total, count = qn("total"), qn("count")
+    sql = (
+        f"INSERT INTO {table} ({qn('user_id')}, {qn('date')}, {qn('category')}, {total}, {count}) "
+        f"VALUES (%s, %s, %s, %s, %s) "
+        f"ON CONFLICT ({qn('user_id')}, {qn('date')}, {qn('category')}) DO UPDATE SET "
+        f"{total} = {table}.{total} + excluded.{total}, {count} = {table}.{count} + excluded.{count}"
+    )
+    params = [
+        (user_id, connection.ops.adapt_datefield_value(day), category,
+         connection.ops.adapt_decimalfield_value(total, 14, 2), count)
+        for user_id, day, category, total, count in rows
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _grouped_totals(queryset):
+    return (
+        queryset.order_by()
+        .values("user_id", "date", "category")
+        .annotate(total=Sum("amount"), count=Count("id"))
+    )
+
+
+def rebuild_rollups(user_id: Optional[str] = None, batch_size: int = 1000) -> int:
+    """
+    Recompute rollup rows from raw expenses, hot and archived, for one user
+    or everyone. The summary and data versions of every user whose rollups
+    were replaced or written are bumped in the same transaction.
+
+    Returns the number of rollup rows written.
+    """
+    # Both modules import this one
+    from .signals import invalidate_user_summaries
+    from .versions import bump_data_versions
+
+    expenses = Expense.objects.all()
+    archived = ArchivedExpense.objects.all()
+    rollups = ExpenseRollup.objects.all()
+    if user_id:
+        expenses = expenses.filter(user_id=user_id)
+        archived = archived.filter(user_id=user_id)
+        rollups = rollups.filter(user_id=user_id)
+
+    written = 0
+    with transaction.atomic():
+        user_ids = set(rollups.values_list("user_id", flat=True).distinct())
+        rollups.delete()
+        batch = []
+        for row in _grouped_totals(expenses).iterator(chunk_size=batch_size):
+            user_ids.add(row["user_id"])
+            batch.append(ExpenseRollup(**row))
+            if len(batch) >= batch_size:
+                ExpenseRollup.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        ExpenseRollup.objects.bulk_create(batch)
+        written += len(batch)
+        # Archived days normally have no hot rows, but add rather than insert
+        # in case a key spans both tiers
+        batch = []
+        for row in _grouped_totals(archived).iterator(chunk_size=batch_size):
+            user_ids.add(row["user_id"])
+            batch.append((row["user_id"], row["date"], row["category"], row["total"], row["count"]))
+            if len(batch) >= batch_size:
+                _apply_rows(batch)
+                written += len(batch)
+                batch = []
+        _apply_rows(batch)
+        written += len(batch)
+        for user_id in user_ids:
+            invalidate_user_summaries(user_id)
+        bump_data_versions(user_ids)
+    return written
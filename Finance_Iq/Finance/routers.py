@@ -0,0 +1,111 @@
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+# True once the current request (or context) has written; its reads then stay
+# on the primary so they see their own writes despite replica lag.
+_pinned_to_primary: ContextVar[bool] = ContextVar("pinned_to_primary", default=False)
+
+
+def replica_aliases():
+    return list(getattr(settings, "READ_REPLICA_ALIASES", []))
+
+
+def pin_to_primary() -> None:
+    _pinned_to_primary.set(True)
+
+
+@contextmanager
+def use_primary():
+    """Route every read inside the block to the primary"""
+    token = _pinned_to_primary.set(True)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+@contextmanager
+def request_scope():
+    """Start a request unpinned and drop any pin when it finishes"""
+    token = _pinned_to_primary.set(False)
+    try:
+        yield
+    finally:
+        _pinned_to_primary.reset(token)
+
+
+class ReadReplicaRouter:
+    """
+    Sends reads to the READ_REPLICA_ALIASES databases in round-robin and
+    every write to the primary. The first write in a request pins the rest
+    of that request's reads to the primary (read-your-writes); use
+    use_primary() to force it explicitly. Replicas are never migrated;
+    they receive schema changes through replication.
+    """
+
+    def __init__(self):
+        self._cycle = None
+        self._aliases = None
+
+    def _next_replica(self):
+        aliases = replica_aliases()
+        if aliases != self._aliases:
+            self._aliases = aliases
+            self._cycle = itertools.cycle(aliases) if aliases else None
+        return next(self._cycle) if self._cycle else None
+
+    def db_for_read(self, model, **hints):
+        if _pinned_to_primary.get():
+            return DEFAULT_DB_ALIAS
+        return self._next_replica()
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def measure_replica_lag(timeout: float = 10.0, poll_interval: float = 0.05):
+    """
+    Write a heartbeat on the primary and poll each replica until it shows up.
+
+    Returns {alias: {"visible_after": seconds or None, "lag": seconds or None}}.
+    visible_after is how long the new heartbeat took to reach the replica
+    (None on timeout); lag is how far behind the replica's heartbeat was when
+    polling stopped (None if it has never seen one).
+    """
+    from .models import ReplicaHeartbeat
+
+    beat_at = timezone.now()
+    ReplicaHeartbeat.objects.using(DEFAULT_DB_ALIAS).update_or_create(pk=1, defaults={"beat_at": beat_at})
+    started = time.perf_counter()
+    results = {}
+    for alias in replica_aliases():
+        seen = None
+        while True:
+            seen = ReplicaHeartbeat.objects.using(alias).filter(pk=1).values_list("beat_at", flat=True).first()
+            if seen is not None and seen >= beat_at:
+                results[alias] = {"visible_after": time.perf_counter() - started, "lag": 0.0}
+                break
+            if time.perf_counter() - started >= timeout:
+                lag = (timezone.now() - seen).total_seconds() if seen is not None else None
+                results[alias] = {"visible_after": None, "lag": lag}
+                break
+            time.sleep(poll_interval)
+    return results
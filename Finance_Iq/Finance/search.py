@@ -0,0 +1,231 @@
+import logging
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from django.db import connection, connections
+from django.db.models import BooleanField, Count, Sum
+from django.db.models.expressions import RawSQL
+
+from .archive import reaches_archive, with_archive
+from .cache import summary_cache
+from .models import ArchivedExpense, Expense
+from .pagination import LIST_FIELDS, serialize_row
+
+logger = logging.getLogger(__name__)
+
+# Both tiers are indexed so searches over all history see archived expenses
+SEARCHABLE_MODELS = (Expense, ArchivedExpense)
+SEARCH_TERM = re.compile(r"\w+")
+MAX_SEARCH_TERMS = 8
+DEFAULT_SEARCH_RESULTS = 10
+MAX_SEARCH_RESULTS = 100
+MAX_SEARCH_DAYS = 3650
+SEARCH_ORDERING = ('-date', '-created_at', '-id')
+
+# "search uber", "/search uber" or "how much did I spend on uber?"
+SEARCH_COMMANDS = (
+    re.compile(r"^/?search\s+(?P<query>.+)$", re.IGNORECASE),
+    re.compile(r"^how much (?:did|have) i (?:spend|spent|pay|paid) (?:on|for)\s+(?P<query>.+?)\??$", re.IGNORECASE),
+)
+
+
+def fts_table(model) -> str:
+    return f"{model._meta.db_table}_fts"
+
+
+def _sqlite_index_sql(model, qn) -> List[str]:
+    """
+    An external-content FTS5 table over (user_id, description), kept in sync
+    by triggers, so bulk_create, raw inserts and raw deletes are all covered.
+    user_id is indexed too: matching it inside the FTS query intersects the
+    user's postings with the terms' instead of scanning every user's matches.
+    Underscores are word characters (as in \\w), so an ID like "team_42"
+    is one rare token rather than two common ones.
+    """
+    table, fts = model._meta.db_table, fts_table(model)
+    delete = (f"INSERT INTO {qn(fts)}({qn(fts)}, rowid, user_id, description) "
+              "VALUES ('delete', old.id, old.user_id, old.description);")
+    insert = f"INSERT INTO {qn(fts)}(rowid, user_id, description) VALUES (new.id, new.user_id, new.description);"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {qn(fts)} USING fts5("
+        f"user_id, description, content='{table}', content_rowid='id', tokenize=\"unicode61 tokenchars '_'\")",
+        f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_ai')} AFTER INSERT ON {qn(table)} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_ad')} AFTER DELETE ON {qn(table)} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {qn(fts + '_au')} AFTER UPDATE OF user_id, description ON {qn(table)} "
+        f"BEGIN {delete} {insert} END",
+        f"INSERT INTO {qn(fts)}({qn(fts)}) VALUES ('rebuild')",
+    ]
+
+
+def _postgres_index_sql(model, qn) -> List[str]:
+    """A GIN index for word searches and a trigram one for substring (icontains) matches"""
+    table = model._meta.db_table
+    return [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        f"CREATE INDEX IF NOT EXISTS {qn(table + '_description_fts')} "
+        f"ON {qn(table)} USING GIN (to_tsvector('simple', description))",
+        f"CREATE INDEX IF NOT EXISTS {qn(table + '_description_trgm')} "
+        f"ON {qn(table)} USING GIN (description gin_trgm_ops)",
+    ]
+
+
+def install_search_index(schema_editor) -> None:
+    """
+    Create the description search indexes, filling them from existing rows.
+    Idempotent. On SQLite, a migration that rebuilds an expense table (most
+    AlterField/RemoveField operations do) drops its sync triggers;
+    restore_search_triggers puts them back after every migrate.
+    """
+    builders = {"sqlite": _sqlite_index_sql, "postgresql": _postgres_index_sql}
+    build = builders.get(schema_editor.connection.vendor)
+    if build is None:
+        return
+    for model in SEARCHABLE_MODELS:
+        for sql in build(model, schema_editor.quote_name):
+            schema_editor.execute(sql)
+
+
+def restore_search_triggers(using="default", **kwargs) -> None:
+    """
+    post_migrate handler: on SQLite, re-create the FTS sync triggers (and
+    refill the index) for any expense table whose triggers a table-rebuild
+    migration dropped. Without this, searches would silently miss every
+    expense written after such a migration.
+    """
+    conn = connections[using]
+    if conn.vendor != "sqlite":
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {name for name, in cursor.fetchall()}
+    damaged = [
+        model for model in SEARCHABLE_MODELS
+        if fts_table(model) in existing
+        and not {fts_table(model) + suffix for suffix in ("_ai", "_ad", "_au")} <= existing
+    ]
+    if not damaged:
+        return
+    logger.warning("Restoring full-text search triggers on %s", ", ".join(m._meta.db_table for m in damaged))
+    with conn.cursor() as cursor:
+        for model in damaged:
+            for sql in _sqlite_index_sql(model, conn.ops.quote_name):
+                cursor.execute(sql)
+
+
+def drop_search_index(schema_editor) -> None:
+    qn = schema_editor.quote_name
+    for model in SEARCHABLE_MODELS:
+        table = model._meta.db_table
+        if schema_editor.connection.vendor == "sqlite":
+            fts = fts_table(model)
+            for suffix in ("_ai", "_ad", "_au"):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {qn(fts + suffix)}")
+            schema_editor.execute(f"DROP TABLE IF EXISTS {qn(fts)}")
+        elif schema_editor.connection.vendor == "postgresql":
+            for suffix in ("_description_fts", "_description_trgm"):
+                schema_editor.execute(f"DROP INDEX IF EXISTS {qn(table + suffix)}")
+
+
+def search_terms(query: str) -> List[str]:
+    """Lowercased words of a search query; punctuation and FTS operators are dropped"""
+    return [term.lower() for term in SEARCH_TERM.findall(query or "")][:MAX_SEARCH_TERMS]
+
+
+def parse_search_command(text: str) -> Optional[str]:
+    """The query of a bot search message, or None if the text is not one"""
+    text = text.strip()
+    for pattern in SEARCH_COMMANDS:
+        match = pattern.match(text)
+        if match and search_terms(match.group("query")):
+            return match.group("query")
+    return None
+
+
+def _fts_phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def matching(model, user_id: str, terms: List[str]):
+    """
+    The user's expenses in `model` whose description contains every term as
+    a whole word. Prefix matching is left out: on FTS5 it merges the doclist
+    of every word sharing the prefix and is ~40x slower than a word lookup.
+    """
+    expenses = model.objects.filter(user_id=user_id)
+    if connection.vendor == "sqlite":
+        fts = connection.ops.quote_name(fts_table(model))
+        match = " AND ".join(f"description : {_fts_phrase(term)}" for term in terms)
+        if SEARCH_TERM.search(user_id):
+            match = f"user_id : {_fts_phrase(user_id)} AND {match}"
+        return expenses.filter(id__in=RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [match]))
+    if connection.vendor == "postgresql":
+        return expenses.filter(RawSQL(
+            "to_tsvector('simple', description) @@ to_tsquery('simple', %s)",
+            [" & ".join(terms)], output_field=BooleanField(),
+        ))
+    # No full-text index on other backends
+    for term in terms:
+        expenses = expenses.filter(description__icontains=term)
+    return expenses
+
+
+def search_expenses(user_id: str, query: str, days: Optional[int] = None,
+                    limit: int = DEFAULT_SEARCH_RESULTS) -> Dict[str, Any]:
+    """
+    Expenses whose description contains every word of `query`, over the last
+    `days` days (all history if None): totals per category plus the most
+    recent `limit` matches. Raises ValueError for a query with no words.
+    """
+    terms = search_terms(query)
+    if not terms:
+        raise ValueError("Search query must contain at least one word")
+    start = date.today() - timedelta(days=days) if days else None
+    expenses, archived = matching(Expense, user_id, terms), matching(ArchivedExpense, user_id, terms)
+    if start:
+        expenses, archived = expenses.filter(date__gte=start), archived.filter(date__gte=start)
+
+    # Per-category totals of each tier in one UNION ALL round-trip, merged here
+    grouped = [
+        tier.order_by().values('category').annotate(total=Sum('amount'), count=Count('id'))
+        for tier in ([expenses, archived] if reaches_archive(start) else [expenses])
+    ]
+    by_category = {}
+    for row in grouped[0].union(*grouped[1:], all=True):
+        totals = by_category.setdefault(row['category'], [0.0, 0])
+        totals[0] += float(row['total'])
+        totals[1] += row['count']
+    categories = sorted(
+        ({"category": category, "total": round(total, 2), "count": count}
+         for category, (total, count) in by_category.items()),
+        key=lambda c: c["total"], reverse=True,
+    )
+    recent = with_archive(expenses, archived, start, LIST_FIELDS, SEARCH_ORDERING)[:limit]
+
+    return {
+        "user_id": user_id,
+        "query": " ".join(terms),
+        "days": days,
+        "total": round(sum(c["total"] for c in categories), 2),
+        "count": sum(c["count"] for c in categories),
+        "by_category": categories,
+        "expenses": [serialize_row(row) for row in recent],
+    }
+
+
+def get_search_results(user_id: str, query: str, days: Optional[int] = None,
+                       limit: int = DEFAULT_SEARCH_RESULTS) -> Dict[str, Any]:
+    """search_expenses, cached per user until their next expense"""
+    window = f"search:{days}:{limit}:{'+'.join(search_terms(query))}"
+    return summary_cache.get_or_set(user_id, window, lambda: search_expenses(user_id, query, days, limit))
+
+
+def format_search_reply(results: Dict[str, Any]) -> str:
+    """Bot reply for a search: the total, then a line per category"""
+    if not results["count"]:
+        return f"🔎 No expenses match \"{results['query']}\"."
+    plural = "" if results["count"] == 1 else "s"
+    lines = [f"🔎 \"{results['query']}\": ₦{results['total']:,.2f} across {results['count']} expense{plural}"]
+    for category in results["by_category"]:
+        lines.append(f"• {category['category'].capitalize()}: ₦{category['total']:,.2f} ({category['count']})")
+    return "\n".join(lines)
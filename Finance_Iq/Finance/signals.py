@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .anomalies import observe_expenses
+from .cache import summary_cache
+from .models import Expense
+from .rollups import apply_expenses
+from .stats import record_deletions, record_expenses
+from .versions import bump_data_versions
+
+
+@receiver(post_save, sender=Expense)
+def add_expense_to_rollup(sender, instance, created, **kwargs):
+    """
+    Fold newly created expenses into the daily rollup, dashboard counters
+    and category stats (bulk inserts go through ingest.create_expenses
+    instead). Sets instance.anomaly for the webhook reply.
+    """
+    if created and not kwargs.get("raw"):
+        apply_expenses([instance])
+        record_expenses([instance])
+        observe_expenses([instance])
+
+
+@receiver(post_delete, sender=Expense)
+def remove_expense_from_rollup(sender, instance, **kwargs):
+    apply_expenses([instance], sign=-1)
+    record_deletions(1)
+
+
+def invalidate_user_summaries(user_id):
+    """
+    Bump the user's summary version now and again once the transaction
+    commits, so a summary computed from pre-commit data is never cached
+    under the version readers will use afterwards.
+    """
+    summary_cache.bump_version(user_id)
+    transaction.on_commit(lambda: summary_cache.bump_version(user_id))
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def invalidate_summaries_on_change(sender, instance, **kwargs):
+    invalidate_user_summaries(instance.user_id)
+    bump_data_versions([instance.user_id])
@@ -0,0 +1,129 @@
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import IntegrityError, connection, connections, router, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from .models import ArchivedExpense, Expense, KnownUser, StatCounter
+from .rollups import UPSERT_VENDORS
+
+COUNTERS = (StatCounter.TOTAL_EXPENSES, StatCounter.DISTINCT_USERS)
+# Users per multi-row INSERT; two bound parameters each
+USER_INSERT_BATCH = 500
+
+
+def _insert_new_users(user_ids) -> int:
+    """Insert user IDs not seen before and return how many were new"""
+    if connection.vendor in UPSERT_VENDORS:
+        qn = connection.ops.quote_name
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        added = 0
+        with connection.cursor() as cursor:
+            for i in range(0, len(user_ids), USER_INSERT_BATCH):
+                batch = user_ids[i:i + USER_INSERT_BATCH]
+                placeholders = ", ".join(["(%s, %s)"] * len(batch))
+                cursor.execute(
+                    f"INSERT INTO {qn(KnownUser._meta.db_table)} ({qn('user_id')}, {qn('first_seen')}) "
+                    f"VALUES {placeholders} ON CONFLICT ({qn('user_id')}) DO NOTHING RETURNING {qn('user_id')}",
+                    [value for user_id in batch for value in (user_id, now)],
+                )
+                added += len(cursor.fetchall())
+        return added
+
+    known = set(KnownUser.objects.filter(user_id__in=user_ids).values_list("user_id", flat=True))
+    added = 0
+    for user_id in set(user_ids) - known:
+        try:
+            with transaction.atomic():
+                KnownUser.objects.create(user_id=user_id)
+            added += 1
+        except IntegrityError:
+            pass
+    return added
+
+
+def record_expenses(expenses: Iterable[Expense]) -> None:
+    """
+    Count newly inserted expenses and first-time users. Call inside the
+    insert transaction; costs one user upsert and one counter UPDATE.
+    """
+    user_ids = []
+    inserted = 0
+    for expense in expenses:
+        user_ids.append(expense.user_id)
+        inserted += 1
+    if not inserted:
+        return
+    new_users = _insert_new_users(sorted(set(user_ids)))
+    StatCounter.objects.filter(name__in=COUNTERS).update(
+        value=F("value") + Case(
+            When(name=StatCounter.TOTAL_EXPENSES, then=Value(inserted)),
+            default=Value(new_users),
+        ),
+        # update() skips auto_now; the dashboard's Last-Modified reads it
+        updated_at=Now(),
+    )
+
+
+def record_deletions(count: int) -> None:
+    StatCounter.objects.filter(name=StatCounter.TOTAL_EXPENSES).update(value=F("value") - count, updated_at=Now())
+
+
+def get_dashboard_snapshot() -> Tuple[Dict[str, int], Optional[datetime]]:
+    """
+    Counter values (missing counters read as 0) and when any of them last
+    changed, for the dashboard and its validators. Hand-written SQL:
+    compiling the equivalent ORM query costs several times more than
+    running it, and this runs on every poll.
+    """
+    db = connections[router.db_for_read(StatCounter)]
+    qn = db.ops.quote_name
+    updated_at = StatCounter._meta.get_field("updated_at").get_col(StatCounter._meta.db_table)
+    converters = db.ops.get_db_converters(updated_at)
+    with db.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {qn('name')}, {qn('value')}, {qn('updated_at')} FROM {qn(StatCounter._meta.db_table)} "
+            f"WHERE {qn('name')} IN (%s, %s)",
+            COUNTERS,
+        )
+        rows = cursor.fetchall()
+    values, last_modified = {}, None
+    for name, value, changed in rows:
+        for converter in converters:
+            changed = converter(changed, updated_at, db)
+        values[name] = value
+        if last_modified is None or changed > last_modified:
+            last_modified = changed
+    return {name: values.get(name, 0) for name in COUNTERS}, last_modified
+
+
+def reconcile_stats() -> Dict[str, int]:
+    """
+    Recompute counters from the hot and archived expense tables and resync
+    KnownUser.
+
+    This is the only place the full scans run; schedule it periodically.
+    Returns the corrected counter values.
+    """
+    with transaction.atomic():
+        KnownUser.objects.exclude(user_id__in=Expense.objects.values("user_id")).exclude(
+            user_id__in=ArchivedExpense.objects.values("user_id")
+        ).delete()
+        missing = set()
+        for model in (Expense, ArchivedExpense):
+            missing.update(
+                model.objects.exclude(user_id__in=KnownUser.objects.values("user_id"))
+                .order_by().values_list("user_id", flat=True).distinct().iterator()
+            )
+        KnownUser.objects.bulk_create(
+            [KnownUser(user_id=user_id) for user_id in sorted(missing)], batch_size=500
+        )
+        values = {
+            StatCounter.TOTAL_EXPENSES: Expense.objects.count() + ArchivedExpense.objects.count(),
+            StatCounter.DISTINCT_USERS: KnownUser.objects.count(),
+        }
+        for name, value in values.items():
+            StatCounter.objects.update_or_create(name=name, defaults={"value": value})
+    return values
@@ -1,3 +1,1010 @@
-from django.test import TestCase
+import io
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .management.commands.bench_parser import SAMPLE_MESSAGES, _legacy_parse_expense
+from .management.commands.generate_expenses import generate_rows, load_expenses
+from .management.commands.loadtest import UNPARSEABLE_MESSAGES, percentile, synthetic_message
+from . import agent_logs, async_views, journal, views
+from .cache import SummaryCache, summary_cache
+from .idempotency import DUPLICATE_REPLY, SeenMessages, claim_messages, message_key, seen_messages
+from .metrics import registry
+from .ratelimit import TokenBucketLimiter, channel_limiter, shared_acquire, user_limiter
+from .ingest import create_expenses, drain_journal
+from .anomalies import rebuild_category_stats
+from .archive import archive_expenses
+from .models import ArchivedExpense, CategoryStats, Expense, ExpenseRollup, ProcessedMessage, StatCounter
+from .routers import ReadReplicaRouter, request_scope, use_primary
+from .rollups import rebuild_rollups
+from .search import parse_search_command, restore_search_triggers, search_expenses
+from .stats import get_dashboard_snapshot, reconcile_stats
+from .trends import compute_trends, get_trends
+from .versions import bump_data_versions, get_data_version, validators
+from .parser import parse_expense, parse_expenses, parse_line_items
+
+
+def post_message(client, text, user_id="u1", channel_id="c1", **extra):
+    payload = {"channelId": channel_id, "from": {"id": user_id}, "text": text, **extra}
+    return client.post(reverse("telex-expense-agent"), json.dumps(payload), content_type="application/json")
+
+
+class ParserTests(SimpleTestCase):
+    def test_parses_amount_category_and_date(self):
+        parsed = parse_expense("I spent ₦5,000 on food yesterday")
+        self.assertEqual(parsed["amount"], 5000.0)
+        self.assertEqual(parsed["category"], "food")
+        self.assertEqual(parsed["date"], date.today() - timedelta(days=1))
+
+    def test_first_category_in_priority_order_wins(self):
+        self.assertEqual(parse_expense("spent 300 on bus to the restaurant")["category"], "food")
+        self.assertEqual(parse_expense("spent 300 at the shop")["category"], "shopping")
+        self.assertEqual(parse_expense("spent 300 on nothing much")["category"], "other")
+
+    def test_unparseable_text_returns_none(self):
+        self.assertIsNone(parse_expense("hello there"))
+        self.assertIsNone(parse_expense(""))
+        self.assertIsNone(parse_expense(None))
+
+    def test_matches_legacy_parser(self):
+        extra = ["5₦100 naira", "Paid 2,500.00 for the shopping mall", "N300 water", "fonor spent 9 naira",
+                 "spent 500 on food;", "₦300 airtime, ", "paid 2,500 for shoes, 3 pairs"]
+        for text in SAMPLE_MESSAGES + extra:
+            self.assertEqual(parse_expense(text), _legacy_parse_expense(text), text)
+
+    def test_line_items_split_on_separators_with_bare_amounts(self):
+        items = parse_line_items("₦5000 food, 2000 transport; airtime 1,500 and rice and beans")
+        self.assertEqual([(i["amount"], i["category"]) for i in items],
+                         [(5000.0, "food"), (2000.0, "transport"), (1500.0, "bills")])
+        self.assertEqual(items[2]["description"], "airtime, rice, beans")
+
+    def test_marked_bare_amounts_start_items(self):
+        items = parse_line_items("₦5000 food, 2k data, ngn 1500 airtime")
+        self.assertEqual([(i["amount"], i["description"]) for i in items],
+                         [(5000.0, "food"), (2000.0, "data"), (1500.0, "airtime")])
+
+    def test_unmarked_numbers_are_not_phantom_items(self):
+        for text in ["₦5000 for fuel, 20 litres", "spent 3000 on uber and 45 minutes waiting",
+                     "₦12000 dinner for 2, table 14"]:
+            self.assertEqual(parse_line_items(text), [parse_expense(text)], text)
+
+    def test_single_expense_messages_stay_whole(self):
+        for text in ["I spent ₦5,000 on food yesterday", "paid 2,500 for shoes, 3 pairs", "bread and butter ₦500"]:
+            self.assertEqual(parse_line_items(text), [parse_expense(text)], text)
+        self.assertEqual(parse_line_items("no amount, here"), [])
+
+    def test_batch_parse_is_aligned_with_input(self):
+        texts = ["₦100 lunch", "no amount", "spent 50 on taxi"]
+        self.assertEqual(parse_expenses(texts), [parse_expense(t) for t in texts])
+
+
+def streamed_json(response):
+    return json.loads(b"".join(response))
+
+
+class FinanceTestCase(TestCase):
+    """Clears process-wide caches that outlive the per-test database rollback"""
+
+    def setUp(self):
+        cache.clear()
+        summary_cache.clear()
+        seen_messages.clear()
+        user_limiter.clear()
+        channel_limiter.clear()
+
+
+class RollupTests(FinanceTestCase):
+    def test_webhook_updates_rollup_and_summary(self):
+        post_message(self.client, "spent 100 on lunch")
+        response = post_message(self.client, "₦250.50 for dinner")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Food: ₦350.50", response.json()["text"])
+
+        rollup = ExpenseRollup.objects.get(user_id="u1", category="food")
+        self.assertEqual((rollup.total, rollup.count), (Decimal("350.50"), 2))
+
+        summary = self.client.get(reverse("get-summary", args=["u1"])).json()
+        self.assertEqual(summary["total"], 350.5)
+        self.assertEqual(summary["expense_count"], 2)
+
+    def test_delete_and_rebuild_keep_rollup_in_sync(self):
+        for text in ["spent 100 on lunch", "spent 40 on taxi", "spent 60 on uber"]:
+            post_message(self.client, text)
+        Expense.objects.filter(category="food").delete()
+        self.assertEqual(ExpenseRollup.objects.get(category="food").count, 0)
+
+        expected = list(ExpenseRollup.objects.filter(count__gt=0).values_list("category", "total", "count"))
+        call_command("rebuild_rollups", stdout=io.StringIO())
+        self.assertEqual(list(ExpenseRollup.objects.values_list("category", "total", "count")), expected)
+
+
+class SummaryCacheTests(FinanceTestCase):
+    def test_repeated_summary_is_served_from_cache(self):
+        post_message(self.client, "spent 100 on lunch")
+        url = reverse("get-summary", args=["u1"])
+        first = self.client.get(url).json()
+        # Only the data-version lookup; the payload comes from the cache
+        with self.assertNumQueries(1):
+            second = self.client.get(url).json()
+        self.assertEqual(first, second)
+        self.assertGreaterEqual(summary_cache.stats()["hits"], 1)
+
+    def test_new_expense_invalidates_cached_summary(self):
+        post_message(self.client, "spent 100 on lunch")
+        url = reverse("get-summary", args=["u1"])
+        self.assertEqual(self.client.get(url).json()["total"], 100.0)
+        post_message(self.client, "spent 50 on taxi")
+        self.assertEqual(self.client.get(url).json()["total"], 150.0)
+        Expense.objects.filter(category="food").delete()
+        self.assertEqual(self.client.get(url).json()["total"], 50.0)
+
+    def test_cached_windows_roll_forward_with_the_date(self):
+        post_message(self.client, "spent 100 on lunch")
+        url = reverse("get-summary", args=["u1"])
+        self.assertEqual(self.client.get(url).json()["total"], 100.0)
+        # A month passes without writes: no version bump, only the date moves
+        month_ago = date.today() - timedelta(days=30)
+        Expense.objects.update(date=month_ago)
+        ExpenseRollup.objects.update(date=month_ago)
+        self.assertEqual(self.client.get(url).json()["total"], 100.0)
+        tomorrow = date.today() + timedelta(days=1)
+        with mock.patch("Finance.cache.date", wraps=date) as fake_date:
+            fake_date.today.return_value = tomorrow
+            self.assertEqual(summary_cache.get_or_set("u1", "weekly", lambda: "recomputed"), "recomputed")
+
+    @override_settings(READ_REPLICA_ALIASES=["replica1"])
+    def test_misses_are_computed_on_the_primary(self):
+        routed = SummaryCache(prefix="test:primary").get_or_set(
+            "u1", "weekly", lambda: ReadReplicaRouter().db_for_read(Expense)
+        )
+        self.assertEqual(routed, "default")
+
+    def test_entries_expire_after_ttl(self):
+        expiring = SummaryCache(prefix="test:ttl", ttl=0)
+        expiring.get_or_set("u1", "weekly", lambda: "first")
+        self.assertEqual(expiring.get_or_set("u1", "weekly", lambda: "second"), "second")
+
+    def test_lru_is_bounded(self):
+        small = SummaryCache(max_entries=2, prefix="test:lru")
+        for user_id in ["a", "b", "c"]:
+            small.get_or_set(user_id, "weekly", lambda: user_id)
+        self.assertEqual(small.stats()["entries"], 2)
+
+
+class BatchWebhookTests(FinanceTestCase):
+    def test_batch_inserts_valid_items_and_reports_failures(self):
+        payloads = [
+            {"channelId": "c1", "from": {"id": "u1"}, "text": "spent 100 on lunch"},
+            {"channelId": "c1", "from": {"id": "u1"}, "text": "hello"},
+            {"channelId": "c1", "text": "spent 5 on taxi"},
+            {"channelId": "c2", "from": {"id": "u2"}, "text": "₦40 uber"},
+        ]
+        url = reverse("telex-expense-batch")
+        # savepoint, message claim upsert, savepoint, bulk insert, rollup
+        # upsert, user upsert, counter update, category stats select + insert,
+        # data version upsert, release x2
+        with self.assertNumQueries(12):
+            response = self.client.post(url, json.dumps(payloads), content_type="application/json")
+        body = response.json()
+        self.assertEqual((body["created"], body["failed"]), (2, 2))
+        self.assertEqual([r["status"] for r in body["results"]], ["created", "error", "error", "created"])
+        self.assertEqual(Expense.objects.count(), 2)
+        self.assertEqual(ExpenseRollup.objects.get(user_id="u2").total, Decimal("40.00"))
+
+    def test_batch_stores_every_line_item(self):
+        payloads = [{"channelId": "c1", "from": {"id": "u1"}, "text": "₦5000 food, 2000 transport, 1500 airtime"}]
+        body = self.client.post(reverse("telex-expense-batch"), json.dumps(payloads),
+                                content_type="application/json").json()
+        self.assertEqual((body["created"], body["failed"]), (3, 0))
+        self.assertEqual([(i["amount"], i["category"]) for i in body["results"][0]["items"]],
+                         [(5000.0, "food"), (2000.0, "transport"), (1500.0, "bills")])
+        self.assertEqual(Expense.objects.count(), 3)
+
+    def test_batch_rejects_non_array(self):
+        response = self.client.post(reverse("telex-expense-batch"), "{}", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncViewTests(FinanceTestCase):
+    async def test_async_webhook_and_reads_match_sync_views(self):
+        factory = AsyncRequestFactory()
+        body = json.dumps({"channelId": "c1", "from": {"id": "u1"}, "text": "spent 100 on lunch"})
+        response = await async_views.telex_expense_agent(
+            factory.post("/a2a/financeiq/", body, content_type="application/json")
+        )
+        self.assertIn("Food: ₦100.00", json.loads(response.content)["text"])
+
+        response = await async_views.list_expenses(factory.get("/api/expenses/"))
+        listed = json.loads(b"".join([chunk async for chunk in response.streaming_content]))
+        self.assertEqual(listed["count"], 1)
+
+        summary = json.loads((await async_views.get_summary(factory.get("/api/summary/u1/"), "u1")).content)
+        self.assertEqual(summary["total"], 100.0)
+        self.assertEqual(summary, await sync_to_async(views.build_summary_payload)("u1", 7))
+
+
+class ListExpensesTests(FinanceTestCase):
+    def test_cursor_walks_every_row_once_in_order(self):
+        for i in range(7):
+            Expense.objects.create(user_id="u1", channel_id="c1", amount=i + 1, category="food")
+        Expense.objects.create(user_id="u2", channel_id="c1", amount=99, category="food")
+
+        seen, cursor = [], None
+        while True:
+            params = {"user_id": "u1", "limit": 3, **({"cursor": cursor} if cursor else {})}
+            page = streamed_json(self.client.get(reverse("list-expenses"), params))
+            seen += [row["amount"] for row in page["expenses"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(seen, [7.0, 6.0, 5.0, 4.0, 3.0, 2.0, 1.0])
+        self.assertEqual(page["count"], 1)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse("list-expenses"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportTests(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        Expense.objects.create(user_id="u1", channel_id="c1", amount=10, category="food", description="rice")
+        Expense.objects.create(user_id="u1", channel_id="c2", amount=20, category="bills", description="water")
+        Expense.objects.create(user_id="u2", channel_id="c1", amount=30, category="food", description="beans")
+
+    def test_ndjson_export_filters_by_user_and_category(self):
+        response = self.client.get(reverse("export-expenses"), {"user_id": "u1", "category": "food"})
+        lines = b"".join(response).decode().splitlines()
+        self.assertEqual([json.loads(line)["description"] for line in lines], ["rice"])
+
+    def test_csv_export_by_channel(self):
+        response = self.client.get(reverse("export-expenses"), {"channel_id": "c1", "format": "csv"})
+        rows = b"".join(response).decode().splitlines()
+        self.assertEqual(rows[0].split(",")[:3], ["id", "user_id", "channel_id"])
+        self.assertEqual(len(rows), 3)
+
+    async def test_async_export_streams_rows_from_an_async_iterator(self):
+        request = AsyncRequestFactory().get("/api/export/", {"user_id": "u1", "format": "csv"})
+        response = await async_views.export_expenses(request)
+        self.assertTrue(response.is_async)
+        rows = b"".join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual([row.split(",")[5] for row in rows], ["description", "rice", "water"])
+
+    def test_export_command_streams_to_stdout(self):
+        out = io.StringIO()
+        call_command("export_expenses", "--user", "u1", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+    def test_export_requires_a_scope(self):
+        self.assertEqual(self.client.get(reverse("export-expenses")).status_code, 400)
+
+
+class WindowSummaryTests(FinanceTestCase):
+    def test_huge_day_windows_are_capped(self):
+        post_message(self.client, "spent 100 on lunch")
+        response = self.client.get(reverse("get-summary", args=["u1"]), {"days": 999999999})
+        self.assertEqual(response.json()["total"], 100.0)
+        response = self.client.get(reverse("list-expenses"), {"user_id": "u1", "days": 999999999})
+        self.assertEqual(streamed_json(response)["count"], 1)
+
+    def test_multiple_windows_cost_one_query(self):
+        today = date.today()
+        for age, amount in [(0, 10), (20, 100), (60, 1000)]:
+            ExpenseRollup.objects.create(user_id="u1", date=today - timedelta(days=age),
+                                         category="food", total=amount, count=1)
+        # The data-version lookup, then one query for every window
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("get-summary", args=["u1"]), {"windows": "7,30,90"})
+        windows = response.json()["windows"]
+        self.assertEqual({w: windows[w]["total"] for w in windows}, {"7": 10.0, "30": 110.0, "90": 1110.0})
+        self.assertEqual(windows["90"]["expense_count"], 3)
+
+    def test_single_window_costs_one_query(self):
+        post_message(self.client, "spent 100 on lunch")
+        cache.clear()
+        summary_cache.clear()
+        with self.assertNumQueries(2):
+            payload = self.client.get(reverse("get-summary", args=["u1"]), {"days": 30}).json()
+        self.assertEqual(payload["total"], 100.0)
+        self.assertIn("Food: ₦100.00", payload["summary_text"])
+
+
+# No collectstatic in tests, so there is no manifest for hashed asset names
+UNHASHED_STATIC_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(STORAGES=UNHASHED_STATIC_STORAGES)
+class DashboardStatsTests(FinanceTestCase):
+    def test_counters_track_inserts_and_first_time_users(self):
+        post_message(self.client, "spent 100 on lunch", user_id="u1")
+        post_message(self.client, "spent 50 on taxi", user_id="u1")
+        batch = [{"channelId": "c1", "from": {"id": user}, "text": "₦10 food", "messageId": index}
+                 for index, user in enumerate(["u1", "u2", "u2"])]
+        self.client.post(reverse("telex-expense-batch"), json.dumps(batch), content_type="application/json")
+        self.assertEqual(get_dashboard_snapshot()[0], {"total_expenses": 5, "distinct_users": 2})
+
+    def test_index_reads_counters_without_scanning_expenses(self):
+        StatCounter.objects.filter(name="total_expenses").update(value=1234)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("index"))
+        self.assertContains(response, "<h3>1234</h3>")
+
+    def test_index_links_stylesheet_and_revalidates(self):
+        response = self.client.get(reverse("index"))
+        self.assertContains(response, 'href="/static/Finance/dashboard.css"')
+        self.assertNotContains(response, "<style>")
+        self.assertIn("no-cache", response["Cache-Control"])
+        etag = response["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("index"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        response = self.client.get(reverse("index"), HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+
+        post_message(self.client, "spent 100 on lunch", user_id="u1")
+        response = self.client.get(reverse("index"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertContains(response, "<h3>1</h3>")
+
+    def test_reconcile_fixes_drift(self):
+        post_message(self.client, "spent 100 on lunch", user_id="u1")
+        StatCounter.objects.update(value=99)
+        call_command("reconcile_stats", stdout=io.StringIO())
+        self.assertEqual(get_dashboard_snapshot()[0], {"total_expenses": 1, "distinct_users": 1})
+
+
+class AgentLogTests(SimpleTestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "agent-logs.txt")
+        self.enterContext(override_settings(AGENT_LOG_FILE=self.path))
+        handler = agent_logs.AgentLogHandler(self.path)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self.logger = logging.getLogger("Finance.tests.agent_logs")
+        self.logger.propagate = False
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+        for i in range(10):
+            self.logger.warning("line %d", i, extra={"channel_id": "even" if i % 2 == 0 else "odd"})
+
+    def get(self, channel_id, **kwargs):
+        return self.client.get(reverse("telex-logs", args=[channel_id]), **kwargs)
+
+    def test_tail_of_whole_log(self):
+        self.assertEqual(self.get("all", data={"tail": 3}).content, b"line 7\nline 8\nline 9\n")
+
+    def test_channel_filter_uses_offset_index(self):
+        self.assertEqual(self.get("odd", data={"tail": 2}).content, b"line 7\nline 9\n")
+        self.assertEqual(self.get("unknown").content, b"")
+
+    def test_byte_range(self):
+        response = self.get("all", headers={"Range": "bytes=0-6"})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, b"line 0\n")
+        self.assertEqual(response["Content-Range"], f"bytes 0-6/{os.path.getsize(self.path)}")
+
+
+class LoggingPipelineTests(SimpleTestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "agent-logs.txt")
+
+    def log_to(self, handler, count):
+        logger = logging.getLogger(f"Finance.tests.pipeline.{id(handler)}")
+        logger.propagate = False
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        for i in range(count):
+            logger.warning("expense %s", i, extra={"channel_id": "c1", "user_id": "u1"})
+
+    def test_queued_handler_writes_json_lines_in_background(self):
+        handler = agent_logs.QueuedAgentLogHandler(self.path)
+        self.addCleanup(handler.close)
+        self.log_to(handler, 3)
+        handler.flush()
+        with open(self.path, encoding="utf-8") as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([e["message"] for e in entries], ["expense 0", "expense 1", "expense 2"])
+        self.assertEqual(entries[0]["channel_id"], "c1")
+
+    def test_rotation_moves_log_and_index_together(self):
+        handler = agent_logs.AgentLogHandler(self.path, max_bytes=40, backup_count=2)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self.addCleanup(handler.close)
+        self.log_to(handler, 12)
+        self.assertTrue(os.path.exists(self.path + ".2"))
+        self.assertFalse(os.path.exists(self.path + ".3"))
+        self.assertLessEqual(os.path.getsize(self.path), 40)
+        tail = agent_logs.channel_tail(self.path, "c1", 100).decode().splitlines()
+        self.assertEqual(tail[-1], "expense 11")
+        with open(self.path) as f:
+            self.assertEqual(len(tail), len(f.read().splitlines()))
+
+
+class WriteBehindTests(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.enterContext(override_settings(
+            INGEST_WRITE_BEHIND=True, INGEST_JOURNAL_PATH=os.path.join(tmpdir.name, "journal.sqlite3")
+        ))
+        self.addCleanup(journal.close)
+
+    def test_webhook_enqueues_and_worker_drains_in_batches(self):
+        for text in ["spent 100 on lunch", "spent 40 on taxi", "spent 60 on uber"]:
+            response = post_message(self.client, text)
+            self.assertIn("update in a moment", response.json()["text"])
+        self.assertEqual((Expense.objects.count(), journal.depth()), (0, 3))
+
+        call_command("drain_ingest_journal", "--once", "--batch-size", "2", stdout=io.StringIO())
+        self.assertEqual((Expense.objects.count(), journal.depth()), (3, 0))
+        self.assertEqual(ExpenseRollup.objects.get(category="transport").total, Decimal("100.00"))
+
+    def test_multi_item_message_is_journaled_together(self):
+        response = post_message(self.client, "₦100 lunch, 40 taxi")
+        self.assertIn("Logged 2 expenses", response.json()["text"])
+        self.assertEqual(journal.depth(), 2)
+        drain_journal()
+        self.assertEqual(Expense.objects.count(), 2)
+
+    def test_replay_after_crash_is_idempotent(self):
+        post_message(self.client, "spent 100 on lunch")
+        entries = journal.peek(10)
+        drain_journal()
+        # Simulate a crash between the database commit and the journal ack
+        journal.enqueue(entries[0][3], ingest_key=entries[0][1], message_key=entries[0][2])
+        drain_journal()
+        self.assertEqual(Expense.objects.count(), 1)
+        self.assertEqual(ExpenseRollup.objects.get(category="food").count, 1)
+        self.assertEqual(journal.depth(), 0)
+
+
+    def test_entry_drained_on_a_later_day_keeps_its_journaled_date(self):
+        journaled_on = date.today() - timedelta(days=2)
+        journal.enqueue({"user_id": "u1", "channel_id": "c1", "amount": 100, "category": "food",
+                         "description": "lunch", "date": journaled_on})
+        journal.enqueue({"user_id": "u1", "channel_id": "c1", "amount": 50, "category": "food",
+                         "description": "snack", "date": date.today()})
+        drain_journal()
+        self.assertEqual(
+            sorted(Expense.objects.values_list("date", flat=True)), [journaled_on, date.today()]
+        )
+        self.assertEqual(ExpenseRollup.objects.get(date=journaled_on).total, Decimal("100.00"))
+        self.assertEqual(ExpenseRollup.objects.get(date=date.today()).total, Decimal("50.00"))
+
+    def test_retry_journaled_by_another_worker_is_not_stored_twice(self):
+        post_message(self.client, "₦100 lunch, 40 taxi", messageId="m1")
+        seen_messages.clear()
+        post_message(self.client, "₦100 lunch, 40 taxi", messageId="m1")
+        self.assertEqual(journal.depth(), 4)
+        drain_journal()
+        self.assertEqual(Expense.objects.count(), 2)
+        # ...nor when the retry is drained in a later batch
+        seen_messages.clear()
+        post_message(self.client, "₦100 lunch, 40 taxi", messageId="m1")
+        drain_journal()
+        self.assertEqual((Expense.objects.count(), journal.depth()), (2, 0))
+
+
+@override_settings(READ_REPLICA_ALIASES=["replica1", "replica2"])
+class ReadReplicaRouterTests(SimpleTestCase):
+    def test_reads_rotate_over_replicas_and_writes_go_to_primary(self):
+        router = ReadReplicaRouter()
+        with request_scope():
+            self.assertEqual(
+                [router.db_for_read(Expense) for _ in range(3)], ["replica1", "replica2", "replica1"]
+            )
+            self.assertEqual(router.db_for_write(Expense), "default")
+        self.assertFalse(router.allow_migrate("replica1", "Finance"))
+
+    def test_write_pins_reads_to_primary_until_request_ends(self):
+        router = ReadReplicaRouter()
+        with request_scope():
+            router.db_for_write(Expense)
+            self.assertEqual(router.db_for_read(Expense), "default")
+        with request_scope():
+            self.assertEqual(router.db_for_read(Expense), "replica1")
+            with use_primary():
+                self.assertEqual(router.db_for_read(Expense), "default")
+            self.assertEqual(router.db_for_read(Expense), "replica2")
+
+
+class LoadTestHarnessTests(SimpleTestCase):
+    def test_synthetic_messages_parse_and_percentiles_use_nearest_rank(self):
+        rng = random.Random(1)
+        for _ in range(200):
+            text = synthetic_message(rng)
+            self.assertEqual(parse_expense(text) is None, text in UNPARSEABLE_MESSAGES, text)
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, p) for p in (50, 95, 99)], [50, 95, 99])
+        self.assertIsNone(percentile([], 50))
+
+
+class RequestMetricsTests(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        registry.clear()
+
+    def test_server_timing_header_and_prometheus_histograms(self):
+        response = post_message(self.client, "spent 500 on lunch")
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn("parse;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+        metrics = self.client.get(reverse("metrics"))
+        self.assertEqual(metrics["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        body = metrics.content.decode()
+        self.assertIn("# TYPE finance_sql_queries histogram", body)
+        self.assertIn('finance_request_duration_seconds_count{view="telex-expense-agent"} 1', body)
+        self.assertIn('finance_parse_duration_seconds_count{view="telex-expense-agent"} 1', body)
+
+    def test_streamed_responses_are_recorded_once_closed(self):
+        post_message(self.client, "spent 500 on lunch")
+        response = self.client.get(reverse("list-expenses"), {"user_id": "u1"})
+        self.assertEqual(len(streamed_json(response)["expenses"]), 1)
+        response.close()
+        body = registry.render()
+        self.assertIn('finance_sql_queries_count{view="list-expenses"} 1', body)
+        self.assertNotIn('finance_parse_duration_seconds_count{view="list-expenses"}', body)
+
+
+class SyntheticDatasetTests(FinanceTestCase):
+    def test_generated_rows_are_skewed_towards_heavy_users(self):
+        users = [row[0] for row in generate_rows(2000, users=100, days=90)]
+        self.assertGreater(users.count("synthetic_user_0"), 10 * users.count("synthetic_user_99"))
+
+    def test_load_keeps_dates_rollups_and_counters_consistent(self):
+        self.assertEqual(load_expenses(300, users=20, days=60, batch_size=100), 300)
+        self.assertGreater(Expense.objects.filter(date__lt=date.today() - timedelta(days=7)).count(), 0)
+        rollup = ExpenseRollup.objects.aggregate(total=Sum("total"), count=Sum("count"))
+        self.assertEqual(rollup["count"], 300)
+        self.assertEqual(rollup["total"], Expense.objects.aggregate(total=Sum("amount"))["total"])
+        self.assertEqual(get_dashboard_snapshot()[0][StatCounter.TOTAL_EXPENSES], 300)
+        self.assertEqual(CategoryStats.objects.aggregate(count=Sum("count"))["count"], 300)
+        self.assertEqual(get_data_version("synthetic_user_0")[0], 1)
+
+    def test_rollup_rebuild_bumps_only_the_rebuilt_users(self):
+        post_message(self.client, "spent 100 on lunch", user_id="u1")
+        post_message(self.client, "spent 100 on lunch", user_id="u2")
+        rebuild_rollups(user_id="u1")
+        self.assertEqual((get_data_version("u1")[0], get_data_version("u2")[0]), (2, 1))
+
+
+@override_settings(ARCHIVE_AFTER_DAYS=365)
+class ArchiveTests(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        for i, age in enumerate([10, 20, 400, 500, 600]):
+            expense = Expense.objects.create(user_id="u1", channel_id="c1", amount=i + 1, category="food")
+            Expense.objects.filter(pk=expense.pk).update(date=date.today() - timedelta(days=age))
+        rebuild_rollups()
+        reconcile_stats()
+
+    def rollup_totals(self):
+        return ExpenseRollup.objects.aggregate(total=Sum("total"), count=Sum("count"))
+
+    def test_archival_moves_old_rows_and_keeps_totals(self):
+        before = self.rollup_totals()
+        self.assertEqual(archive_expenses(batch_size=2), 3)
+        self.assertEqual(Expense.objects.count(), 2)
+        self.assertEqual(ArchivedExpense.objects.count(), 3)
+        self.assertEqual(self.rollup_totals(), before)
+        self.assertEqual(get_dashboard_snapshot()[0][StatCounter.TOTAL_EXPENSES], 5)
+
+        rebuild_rollups()
+        self.assertEqual(self.rollup_totals(), before)
+        self.assertEqual(reconcile_stats()[StatCounter.TOTAL_EXPENSES], 5)
+
+    def test_reads_span_hot_and_cold_tiers(self):
+        archive_expenses()
+        recent = streamed_json(self.client.get(reverse("list-expenses"), {"user_id": "u1"}))
+        self.assertEqual([row["amount"] for row in recent["expenses"]], [1.0, 2.0])
+
+        seen, cursor = [], None
+        while True:
+            params = {"user_id": "u1", "days": 1000, "limit": 2, **({"cursor": cursor} if cursor else {})}
+            page = streamed_json(self.client.get(reverse("list-expenses"), params))
+            seen += [row["amount"] for row in page["expenses"]]
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(seen, [1.0, 2.0, 3.0, 4.0, 5.0])
+
+        response = self.client.get(reverse("export-expenses"), {"user_id": "u1"})
+        lines = b"".join(response).decode().splitlines()
+        self.assertEqual([json.loads(line)["amount"] for line in lines], [5.0, 4.0, 3.0, 2.0, 1.0])
+
+    def test_cannot_archive_younger_than_the_read_horizon(self):
+        with self.assertRaises(ValueError):
+            archive_expenses(older_than_days=30)
+
+
+class TrendsTests(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        today = date.today()
+        for age, category, total in [(0, "food", 70), (1, "transport", 30), (8, "food", 35)]:
+            ExpenseRollup.objects.create(user_id="u1", date=today - timedelta(days=age),
+                                         category=category, total=total, count=1)
+
+    def test_series_moving_averages_week_over_week_and_top(self):
+        trends = compute_trends("u1", days=14, top=1)
+        self.assertEqual(len(trends["daily"]), 14)
+        self.assertEqual(trends["daily"][-1], {"date": date.today().isoformat(), "total": 70.0,
+                                               "ma_7": round(100 / 7, 2), "ma_30": round(135 / 30, 2)})
+        self.assertEqual(trends["week_over_week"], [
+            {"category": "food", "this_week": 70.0, "last_week": 35.0, "change_pct": 100.0},
+            {"category": "transport", "this_week": 30.0, "last_week": 0.0, "change_pct": None},
+        ])
+        self.assertEqual(trends["top_categories"], [{"category": "food", "total": 105.0, "share": 0.7778}])
+
+    def test_cached_trends_roll_forward_with_the_date(self):
+        self.assertEqual(get_trends("u1", days=7)["end"], date.today().isoformat())
+        tomorrow = date.today() + timedelta(days=1)
+        with mock.patch("Finance.trends.date", wraps=date) as fake_date:
+            fake_date.today.return_value = tomorrow
+            trends = get_trends("u1", days=7)
+        self.assertEqual((trends["end"], trends["daily"][-1]["total"]), (tomorrow.isoformat(), 0.0))
+
+    def test_endpoint_and_empty_history(self):
+        response = self.client.get(reverse("get-trends", args=["u1"]), {"days": 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total"], 100.0)
+        empty = self.client.get(reverse("get-trends", args=["nobody"])).json()
+        self.assertEqual((empty["total"], empty["top_categories"], len(empty["daily"])), (0.0, [], 90))
+
+
+class AnomalyTests(FinanceTestCase):
+    def test_unusual_amount_is_flagged_in_the_reply(self):
+        for index, amount in enumerate([1000, 1200, 900, 1100, 1000]):
+            reply = post_message(self.client, f"spent {amount} on lunch", messageId=index).json()["text"]
+            self.assertNotIn("⚠️", reply)
+        reply = post_message(self.client, "spent 5000 on lunch").json()["text"]
+        self.assertIn("⚠️ That's 4.9x your usual food spend", reply)
+
+        stats = CategoryStats.objects.get(user_id="u1", category="food")
+        amounts = [1000, 1200, 900, 1100, 1000, 5000]
+        mean = sum(amounts) / 6
+        self.assertEqual(stats.count, 6)
+        self.assertAlmostEqual(stats.mean, mean)
+        self.assertAlmostEqual(stats.m2, sum((a - mean) ** 2 for a in amounts))
+
+    def test_rebuild_matches_incremental_stats(self):
+        for amount in [300, 500, 700]:
+            post_message(self.client, f"spent {amount} on lunch")
+        post_message(self.client, "spent 800 on uber")
+        before = {(s.user_id, s.category): (s.count, s.mean, s.m2, s.ema) for s in CategoryStats.objects.all()}
+        self.assertEqual(rebuild_category_stats(batch_size=1), 2)
+        after = {(s.user_id, s.category): (s.count, s.mean, s.m2, s.ema) for s in CategoryStats.objects.all()}
+        self.assertEqual(after.keys(), before.keys())
+        for key in before:
+            for b, a in zip(before[key], after[key]):
+                self.assertAlmostEqual(a, b)
+
+
+class IdempotencyTests(FinanceTestCase):
+    def test_retry_is_answered_from_memory_without_queries(self):
+        first = post_message(self.client, "spent 500 on lunch", messageId="m1")
+        with self.assertNumQueries(0):
+            retry = post_message(self.client, "spent 500 on lunch", messageId="m1")
+        self.assertEqual(retry.json()["text"], first.json()["text"])
+        self.assertEqual(Expense.objects.count(), 1)
+
+    def test_distinct_message_ids_with_the_same_text_both_count(self):
+        post_message(self.client, "spent 500 on lunch", messageId="m1")
+        post_message(self.client, "spent 500 on lunch", messageId="m2")
+        self.assertEqual(Expense.objects.count(), 2)
+
+    def test_retry_seen_by_another_process_is_rejected_by_the_database(self):
+        post_message(self.client, "spent 500 on lunch")
+        seen_messages.clear()
+        response = post_message(self.client, "spent 500 on lunch")
+        self.assertEqual(response.json()["text"], DUPLICATE_REPLY)
+        self.assertEqual(Expense.objects.count(), 1)
+        self.assertEqual(ProcessedMessage.objects.count(), 1)
+
+    def test_expired_claim_is_taken_over(self):
+        post_message(self.client, "spent 500 on lunch")
+        seen_messages.clear()
+        ProcessedMessage.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        post_message(self.client, "spent 500 on lunch")
+        self.assertEqual(Expense.objects.count(), 2)
+        call_command("purge_processed_messages", stdout=io.StringIO())
+        self.assertEqual(ProcessedMessage.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_CONTENT_TTL_SECONDS=0)
+    def test_repeat_without_message_id_counts_after_the_retry_window(self):
+        post_message(self.client, "₦500 for bus")
+        post_message(self.client, "₦500 for bus")
+        post_message(self.client, "₦500 for bus", messageId="m1")
+        post_message(self.client, "₦500 for bus", messageId="m1")
+        self.assertEqual(Expense.objects.count(), 3)
+
+    def test_content_keys_expire_sooner_than_id_keys(self):
+        before = timezone.now()
+        post_message(self.client, "spent 500 on lunch")
+        post_message(self.client, "spent 500 on lunch", messageId="m1")
+        lifetimes = sorted((row.expires_at - before).total_seconds() for row in ProcessedMessage.objects.all())
+        self.assertAlmostEqual(lifetimes[0], 30, delta=5)
+        self.assertAlmostEqual(lifetimes[1], 600, delta=5)
+
+    def test_batch_replay_of_webhook_message_is_not_stored_again(self):
+        post_message(self.client, "spent 500 on lunch", messageId="m1")
+        batch = [
+            {"channelId": "c1", "from": {"id": "u1"}, "text": "spent 500 on lunch", "messageId": "m1"},
+            {"channelId": "c1", "from": {"id": "u1"}, "text": "spent 80 on bus", "messageId": "m2"},
+            {"channelId": "c1", "from": {"id": "u1"}, "text": "spent 80 on bus", "messageId": "m2"},
+        ]
+        for _ in range(2):
+            seen_messages.clear()
+            body = self.client.post(reverse("telex-expense-batch"), json.dumps(batch),
+                                    content_type="application/json").json()
+        self.assertEqual([r["status"] for r in body["results"]], ["duplicate"] * 3)
+        self.assertEqual(Expense.objects.count(), 2)
+        # ...and the webhook treats batch-stored messages as retries too
+        seen_messages.clear()
+        response = post_message(self.client, "spent 80 on bus", messageId="m2")
+        self.assertEqual(response.json()["text"], DUPLICATE_REPLY)
+
+    def test_batched_claims_take_over_only_expired_keys(self):
+        self.assertEqual(claim_messages(["a", "b"]), set())
+        ProcessedMessage.objects.filter(key="a").update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim_messages(["a", "b", "c"]), {"b"})
+        self.assertEqual(ProcessedMessage.objects.count(), 3)
+
+    def test_key_prefers_upstream_id_over_content(self):
+        payload = {"update_id": 7}
+        self.assertEqual(message_key(payload, "c1", "u1", "a"), message_key(payload, "c1", "u2", "b"))
+        self.assertNotEqual(message_key({}, "c1", "u1", "a"), message_key({}, "c1", "u1", "b"))
+
+    def test_store_is_bounded_and_expires(self):
+        store = SeenMessages(max_entries=2, ttl=60)
+        for key in "abc":
+            store.remember(key, key)
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.get("a"))
+        store = SeenMessages(max_entries=2, ttl=0)
+        store.remember("a", "a")
+        self.assertIsNone(store.get("a"))
+
+
+class RateLimitTests(FinanceTestCase):
+    @override_settings(RATE_LIMIT_USER=(2, 0.01))
+    def test_flooding_user_is_rejected_before_parsing(self):
+        for index in range(2):
+            self.assertEqual(post_message(self.client, "spent 100 on bus", messageId=index).status_code, 200)
+        with self.assertNumQueries(0):
+            response = post_message(self.client, "spent 100 on bus", messageId=2)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "100")
+        self.assertEqual(Expense.objects.count(), 2)
+        # Other users keep their own budget
+        self.assertEqual(post_message(self.client, "spent 100 on bus", user_id="u2").status_code, 200)
+
+    @override_settings(RATE_LIMIT_CHANNEL=(1, 0.01))
+    def test_channel_budget_is_shared_by_its_users(self):
+        self.assertEqual(post_message(self.client, "spent 100 on bus", user_id="u1").status_code, 200)
+        self.assertEqual(post_message(self.client, "spent 100 on bus", user_id="u2").status_code, 429)
+
+    @override_settings(RATE_LIMIT_ENABLED=False, RATE_LIMIT_USER=(1, 0.01))
+    def test_can_be_disabled(self):
+        for index in range(3):
+            self.assertEqual(post_message(self.client, "spent 100 on bus", messageId=index).status_code, 200)
+
+    def test_bucket_refills_and_stays_bounded(self):
+        limiter = TokenBucketLimiter(capacity=1, rate=1e9, max_keys=2)
+        self.assertEqual(limiter.acquire("a"), 0.0)
+        self.assertEqual(limiter.acquire("a"), 0.0)
+        slow = TokenBucketLimiter(capacity=1, rate=0.5, max_keys=2)
+        slow.acquire("a")
+        self.assertAlmostEqual(slow.acquire("a"), 2.0, places=2)
+        for key in "bcd":
+            slow.acquire(key)
+        self.assertLessEqual(len(slow._buckets), 2)
+
+    @override_settings(RATE_LIMIT_CACHE="default")
+    async def test_async_webhook_counts_in_shared_cache_off_the_event_loop(self):
+        loop_thread = threading.get_ident()
+        threads = []
+
+        def counting_acquire(*args):
+            threads.append(threading.get_ident())
+            return 0.0
+
+        body = json.dumps({"channelId": "c1", "from": {"id": "u1"}, "text": "spent 100 on lunch"})
+        with mock.patch("Finance.ratelimit.shared_acquire", side_effect=counting_acquire):
+            response = await async_views.telex_expense_agent(
+                AsyncRequestFactory().post("/a2a/financeiq/", body, content_type="application/json")
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(loop_thread, threads)
+
+    def test_shared_backend_counts_across_processes(self):
+        self.assertEqual(shared_acquire("default", "user:u1", 2, 0.001), 0.0)
+        self.assertEqual(shared_acquire("default", "user:u1", 2, 0.001), 0.0)
+        self.assertGreater(shared_acquire("default", "user:u1", 2, 0.001), 0.0)
+
+
+class SearchTests(FinanceTestCase):
+    def setUp(self):
+        super().setUp()
+        rows = [
+            (1500, "transport", "Uber to work", 1),
+            (2500, "transport", "uber home, late", 400),
+            (700, "other", "tip for the Uber driver", 2),
+            (900, "food", "lunch", 1),
+        ]
+        create_expenses([
+            Expense(user_id="u1", channel_id="c1", amount=amount, category=category, description=description)
+            for amount, category, description, _ in rows
+        ] + [Expense(user_id="u2", channel_id="c2", amount=99, category="transport", description="uber")])
+        for _, _, description, age in rows:
+            Expense.objects.filter(description=description).update(date=date.today() - timedelta(days=age))
+
+    def test_huge_day_window_is_clamped(self):
+        response = self.client.get(reverse("search-expenses", args=["u1"]), {"q": "uber", "days": 999999999})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["days"], 3650)
+
+    def test_migrate_restores_triggers_dropped_by_a_table_rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER "Finance_expense_fts_ai"')
+        Expense.objects.create(user_id="u1", channel_id="c1", amount=300, category="transport", description="uber pool")
+        restore_search_triggers(using="default")
+        self.assertEqual(search_expenses("u1", "pool")["count"], 1)
+        Expense.objects.create(user_id="u1", channel_id="c1", amount=400, category="transport", description="uber pool")
+        self.assertEqual(search_expenses("u1", "pool")["count"], 2)
+
+    def test_totals_cover_both_tiers_and_only_the_user(self):
+        archive_expenses()
+        results = search_expenses("u1", "UBER")
+        self.assertEqual((results["total"], results["count"]), (4700.0, 3))
+        self.assertEqual(results["by_category"], [
+            {"category": "transport", "total": 4000.0, "count": 2},
+            {"category": "other", "total": 700.0, "count": 1},
+        ])
+        self.assertEqual([row["amount"] for row in results["expenses"]], [1500.0, 700.0, 2500.0])
+        self.assertEqual(search_expenses("u1", "uber", days=30)["total"], 2200.0)
+
+    def test_index_follows_inserts_and_deletes(self):
+        self.assertEqual(search_expenses("u1", "driver")["count"], 1)
+        self.assertEqual(search_expenses("u1", "driv")["count"], 0)
+        Expense.objects.filter(description__startswith="tip").delete()
+        self.assertEqual(search_expenses("u1", "driver")["count"], 0)
+        Expense.objects.create(user_id="u1", channel_id="c1", amount=10, category="other", description="driver tip")
+        self.assertEqual(search_expenses("u1", "tip driver")["count"], 1)
+
+    def test_endpoint_and_bot_command(self):
+        response = self.client.get(reverse("search-expenses", args=["u1"]), {"q": "uber", "days": 30})
+        self.assertEqual(response.json()["total"], 2200.0)
+        self.assertEqual(self.client.get(reverse("search-expenses", args=["u1"]), {"q": "?!"}).status_code, 400)
+
+        reply = post_message(self.client, "How much did I spend on uber?").json()["text"]
+        self.assertTrue(reply.startswith('🔎 "uber": ₦4,700.00 across 3 expenses'), reply)
+        self.assertIn("• Transport: ₦4,000.00 (2)", reply)
+        self.assertIn("No expenses match", post_message(self.client, "search netflix").json()["text"])
+        self.assertEqual(Expense.objects.count(), 5)
+
+    def test_command_detection(self):
+        self.assertEqual(parse_search_command("/search uber rides"), "uber rides")
+        self.assertIsNone(parse_search_command("spent 500 on uber"))
+        self.assertIsNone(parse_search_command("search ?!"))
+
+
+class MultiExpenseMessageTests(FinanceTestCase):
+    def test_line_items_are_stored_together_with_one_reply(self):
+        response = post_message(self.client, "₦5000 food, 2000 transport, 1500 airtime")
+        reply = response.json()["text"]
+        self.assertTrue(reply.startswith("✅ Logged 3 expenses totalling ₦8,500.00\n• ₦5,000.00 for Food"), reply)
+        self.assertIn("💰 Total spent this week: ₦8,500.00", reply)
+        self.assertEqual(
+            sorted(Expense.objects.values_list("category", "amount")),
+            [("bills", Decimal("1500.00")), ("food", Decimal("5000.00")), ("transport", Decimal("2000.00"))],
+        )
+        self.assertEqual(ExpenseRollup.objects.aggregate(total=Sum("total"))["total"], Decimal("8500.00"))
+        self.assertEqual(get_dashboard_snapshot()[0][StatCounter.TOTAL_EXPENSES], 3)
+
+        seen_messages.clear()
+        self.assertEqual(post_message(self.client, "₦5000 food, 2000 transport, 1500 airtime").json()["text"],
+                         DUPLICATE_REPLY)
+        self.assertEqual(Expense.objects.count(), 3)
+
+    def test_costs_the_same_queries_whatever_the_item_count(self):
+        post_message(self.client, "₦100 lunch, 200 bus, 300 rent, 400 party", messageId=1)
+        with CaptureQueriesContext(connection) as two:
+            post_message(self.client, "₦100 lunch, 200 bus", messageId=2)
+        with CaptureQueriesContext(connection) as four:
+            post_message(self.client, "₦100 lunch, 200 bus, 300 rent, 400 party", messageId=3)
+        self.assertEqual(len(four), len(two))
+        self.assertEqual(sum("INSERT INTO \"Finance_expense\"" in q["sql"] for q in four.captured_queries), 1)
+
+
+class DataVersionConditionalGetTests(FinanceTestCase):
+    def test_unchanged_summary_poll_is_one_lookup_and_a_304(self):
+        post_message(self.client, "spent 100 on lunch")
+        url = reverse("get-summary", args=["u1"])
+        response = self.client.get(url, {"windows": "7,30"})
+        etag = response["ETag"]
+        self.assertIn("private", response["Cache-Control"])
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"windows": "7,30"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.content), (304, b""))
+        self.assertEqual(response["ETag"], etag)
+        response = self.client.get(url, {"windows": "7,30"}, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+        # Another query string is another representation
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        post_message(self.client, "spent 50 on taxi", user_id="u2")
+        self.assertEqual(self.client.get(url, {"windows": "7,30"}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        post_message(self.client, "spent 50 on taxi")
+        response = self.client.get(url, {"windows": "7,30"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total"], 150.0)
+
+    def test_write_seen_by_another_worker_is_not_served_from_cache(self):
+        post_message(self.client, "spent 100 on lunch")
+        url = reverse("get-summary", args=["u1"])
+        self.assertEqual(self.client.get(url).json()["total"], 100.0)
+        # Another worker stores an expense: the database version moves, this
+        # worker's summary cache version does not
+        ExpenseRollup.objects.filter(user_id="u1").update(total=250)
+        bump_data_versions(["u1"])
+        response = self.client.get(url)
+        self.assertEqual(response.json()["total"], 250.0)
+        self.assertTrue(response["ETag"].startswith('"2-'))
+
+    def test_list_validators_only_for_single_user_pages(self):
+        post_message(self.client, "spent 100 on lunch")
+        response = self.client.get(reverse("list-expenses"), {"user_id": "u1"})
+        self.assertEqual(
+            self.client.get(reverse("list-expenses"), {"user_id": "u1"}, HTTP_IF_NONE_MATCH=response["ETag"]).status_code,
+            304,
+        )
+        self.assertFalse(self.client.get(reverse("list-expenses")).has_header("ETag"))
+        Expense.objects.filter(user_id="u1").delete()
+        response = self.client.get(reverse("list-expenses"), {"user_id": "u1"}, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(streamed_json(response)["count"], 0)
+
+    async def test_async_views_answer_304(self):
+        await sync_to_async(post_message)(self.client, "spent 100 on lunch")
+        factory = AsyncRequestFactory()
+        response = await async_views.get_summary(factory.get("/api/summary/u1/"), "u1")
+        response = await async_views.get_summary(
+            factory.get("/api/summary/u1/", headers={"If-None-Match": response["ETag"]}), "u1"
+        )
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(READ_REPLICA_ALIASES=["replica1"])
+    def test_no_validators_while_replicas_may_lag(self):
+        request = AsyncRequestFactory().get("/api/summary/u1/")
+        self.assertEqual(validators(request, 3, timezone.now()), (None, None))
+        self.assertIsNotNone(validators(request, 3, timezone.now() - timedelta(minutes=5))[0])
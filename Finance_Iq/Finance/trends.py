@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .cache import summary_cache
+from .models import ExpenseRollup
+
+MOVING_AVERAGE_WINDOWS = (7, 30)
+DEFAULT_TREND_DAYS = 90
+MAX_TREND_DAYS = 3650
+DEFAULT_TOP_CATEGORIES = 3
+
+
+def _load_columns(user_id, start: date, end: date):
+    """
+    The user's daily per-category totals between start and end as three
+    column arrays (day offset from start, category, total), in one query on
+    the rollup table. A user with 100k expenses still has at most
+    days x categories rollup rows.
+    """
+    rows = list(
+        ExpenseRollup.objects.filter(user_id=user_id, date__gte=start, date__lte=end)
+        .values_list("date", "category", "total")
+    )
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=object), np.empty(0)
+    days, categories, totals = zip(*rows)
+    offsets = np.fromiter(((day - start).days for day in days), dtype=np.int64, count=len(rows))
+    return offsets, np.array(categories, dtype=object), np.array(totals, dtype=np.float64)
+
+
+def moving_average(series: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` days via a cumulative sum; assumes `window - 1` days of lead-in"""
+    cumulative = np.concatenate(([0.0], np.cumsum(series)))
+    return (cumulative[window:] - cumulative[:-window]) / window
+
+
+def compute_trends(user_id, days: int = DEFAULT_TREND_DAYS, top: int = DEFAULT_TOP_CATEGORIES,
+                   today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Spending trends for a user's last `days` days: the daily series with
+    7- and 30-day moving averages, week-over-week change per category and
+    the top `top` categories by total.
+
+    History is loaded once as column arrays and pivoted into a
+    category x day matrix; every metric is a vectorised reduction of it.
+    """
+    today = today or date.today()
+    lead_in = max(MOVING_AVERAGE_WINDOWS) - 1
+    span = max(days + lead_in, 14)
+    start = today - timedelta(days=span - 1)
+
+    offsets, categories, totals = _load_columns(user_id, start, today)
+    names, category_index = np.unique(categories, return_inverse=True)
+    matrix = np.zeros((len(names), span))
+    np.add.at(matrix, (category_index, offsets), totals)
+    daily = matrix.sum(axis=0)
+
+    shown = slice(span - days, span)
+    columns = {"total": np.round(daily[shown], 2).tolist()}
+    for window in MOVING_AVERAGE_WINDOWS:
+        columns[f"ma_{window}"] = np.round(moving_average(daily, window)[span - days - window + 1:], 2).tolist()
+    dates = [start + timedelta(days=offset) for offset in range(span - days, span)]
+    series = [
+        {"date": day.isoformat(), **{name: values[i] for name, values in columns.items()}}
+        for i, day in enumerate(dates)
+    ]
+
+    this_week = matrix[:, -7:].sum(axis=1)
+    last_week = matrix[:, -14:-7].sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.where(last_week > 0, (this_week - last_week) / last_week * 100, np.nan)
+    week_over_week = [
+        {"category": str(name), "this_week": round(float(current), 2), "last_week": round(float(previous), 2),
+         "change_pct": None if np.isnan(pct) else round(float(pct), 1)}
+        for name, current, previous, pct in zip(names, this_week, last_week, change)
+        if current or previous
+    ]
+    week_over_week.sort(key=lambda c: c["this_week"], reverse=True)
+
+    window_totals = matrix[:, shown].sum(axis=1)
+    grand_total = float(window_totals.sum())
+    order = np.argsort(-window_totals, kind="stable")[:top]
+    top_categories = [
+        {"category": str(names[i]), "total": round(float(window_totals[i]), 2),
+         "share": round(float(window_totals[i]) / grand_total, 4) if grand_total else 0.0}
+        for i in order
+        if window_totals[i] > 0
+    ]
+
+    return {
+        "user_id": user_id,
+        "days": days,
+        "start": dates[0].isoformat(),
+        "end": today.isoformat(),
+        "total": round(grand_total, 2),
+        "daily": series,
+        "week_over_week": week_over_week,
+        "top_categories": top_categories,
+    }
+
+
+def get_trends(user_id, days: int = DEFAULT_TREND_DAYS, top: int = DEFAULT_TOP_CATEGORIES):
+    """
+    compute_trends, cached per user until their next expense or midnight.
+    The series ends on the date in the key, even when computed just after
+    midnight.
+    """
+    today = date.today()
+    return summary_cache.get_or_set(
+        user_id, f"trends:{today.isoformat()}:{days}:{top}", lambda: compute_trends(user_id, days, top, today)
+    )
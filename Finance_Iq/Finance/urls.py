@@ -1,18 +1,31 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.FINANCE_ASYNC_VIEWS:
+    from . import async_views as api_views
+else:
+    api_views = views
+
 urlpatterns = [
     # Root path - Dashboard/Index page
     path("", views.index, name="index"),
     
     # Telegram webhook endpoint (POST only)
-    path("a2a/financeiq/", views.telex_expense_agent, name="telex-expense-agent"),
+    path("a2a/financeiq/", api_views.telex_expense_agent, name="telex-expense-agent"),
+    
+    # Batch webhook endpoint for replaying many messages (POST only)
+    path("a2a/financeiq/batch/", views.telex_expense_batch, name="telex-expense-batch"),
     
     # Logs endpoint (GET only)
     path("agent-logs/<str:channel_id>.txt", views.telex_logs, name="telex-logs"),
     
     # Additional useful endpoints
     path("api/health/", views.health_check, name="health-check"),
-    path("api/expenses/", views.list_expenses, name="list-expenses"),
-    path("api/summary/<str:user_id>/", views.get_summary, name="get-summary"),
+    path("api/metrics/", views.metrics, name="metrics"),
+    path("api/expenses/", api_views.list_expenses, name="list-expenses"),
+    path("api/export/", api_views.export_expenses, name="export-expenses"),
+    path("api/summary/<str:user_id>/", api_views.get_summary, name="get-summary"),
+    path("api/trends/<str:user_id>/", views.get_trends, name="get-trends"),
+    path("api/search/<str:user_id>/", views.search_expenses, name="search-expenses"),
 ]
\ No newline at end of file
@@ -0,0 +1,159 @@
+import hashlib
+from datetime import date, datetime, time, timedelta
+from functools import wraps
+from inspect import iscoroutinefunction
+from typing import Iterable, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, connection, connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import UserDataVersion
+from .rollups import UPSERT_VENDORS
+from .routers import replica_aliases
+
+# With read replicas, the version and the rows it guards may be read from
+# replicas at different lag. A response tagged with a version newer than its
+# data would then be revalidated as current until the user's next change, so
+# no validators are issued until a change is this old.
+REPLICA_SETTLE = timedelta(seconds=60)
+
+
+def bump_data_versions(user_ids: Iterable[str]) -> None:
+    """
+    Increment the data version of each user. Call inside the transaction
+    that changed their expenses; one upsert round-trip on SQLite/Postgres.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    now = timezone.now()
+    if connection.vendor in UPSERT_VENDORS:
+        qn = connection.ops.quote_name
+        table = qn(UserDataVersion._meta.db_table)
+        version, updated_at = qn("version"), qn("updated_at")
+        sql = (
+            f"INSERT INTO {table} ({qn('user_id')}, {version}, {updated_at}) VALUES (%s, 1, %s) "
+            f"ON CONFLICT ({qn('user_id')}) DO UPDATE SET "
+            f"{version} = {table}.{version} + 1, {updated_at} = excluded.{updated_at}"
+        )
+        stamp = connection.ops.adapt_datetimefield_value(now)
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [(user_id, stamp) for user_id in user_ids])
+        return
+
+    for user_id in user_ids:
+        versions = UserDataVersion.objects.filter(user_id=user_id)
+        if versions.update(version=F("version") + 1, updated_at=now):
+            continue
+        try:
+            with transaction.atomic():
+                UserDataVersion.objects.create(user_id=user_id, version=1, updated_at=now)
+        except IntegrityError:
+            # A concurrent writer created the row first
+            versions.update(version=F("version") + 1, updated_at=now)
+
+
+def get_data_version(user_id: str) -> Tuple[int, Optional[datetime]]:
+    """
+    The user's data version and when it last changed; (0, None) for a user
+    who has not changed anything since versions were introduced.
+    Hand-written SQL for the same reason as stats.get_dashboard_snapshot.
+    """
+    db = connections[router.db_for_read(UserDataVersion)]
+    qn = db.ops.quote_name
+    updated_at = UserDataVersion._meta.get_field("updated_at").get_col(UserDataVersion._meta.db_table)
+    with db.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {qn('version')}, {qn('updated_at')} FROM {qn(UserDataVersion._meta.db_table)} "
+            f"WHERE {qn('user_id')} = %s",
+            [user_id],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return 0, None
+    version, changed = row
+    for converter in db.ops.get_db_converters(updated_at):
+        changed = converter(changed, updated_at, db)
+    return version, changed
+
+
+aget_data_version = sync_to_async(get_data_version)
+
+
+def validators(request, version: int, changed: Optional[datetime]) -> Tuple[Optional[str], Optional[int]]:
+    """
+    ETag and Last-Modified (a timestamp) for a response built from the
+    user's data at `version`, or (None, None) while replicas may disagree.
+
+    Responses also depend on the query string and, through their day
+    windows, on today's date, so both go into the ETag, and a response
+    counts as modified at midnight as well as on every change.
+    """
+    if changed is not None and replica_aliases() and timezone.now() - changed < REPLICA_SETTLE:
+        return None, None
+    today = date.today()
+    digest = hashlib.sha1(request.get_full_path().encode()).hexdigest()[:12]
+    etag = f'"{version}-{today:%Y%m%d}-{digest}"'
+    midnight = datetime.combine(today, time.min).astimezone()
+    last_modified = max(changed, midnight) if changed else midnight
+    return etag, int(last_modified.timestamp())
+
+
+def _set_validators(response, etag: str, last_modified: int) -> None:
+    if response.status_code not in (200, 304):
+        return
+    response.headers.setdefault("ETag", etag)
+    if not response.has_header("Last-Modified"):
+        response.headers["Last-Modified"] = http_date(last_modified)
+    # Per-user data: no shared caches, and clients revalidate every poll
+    patch_cache_control(response, private=True, no_cache=True)
+
+
+def conditional_on_data_version(user_id_func):
+    """
+    Conditional GET for a view whose response depends only on one user's
+    expenses: `user_id_func(request, *args, **kwargs)` names the user (None
+    skips the check). The user's data version is read before the view runs,
+    so an unchanged poll costs one indexed lookup and gets a bodiless 304.
+    The view finds it as request.data_version and must not serve a cached
+    body built from an older version under it. Works on sync and async views.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def inner(request, *args, **kwargs):
+                user_id = user_id_func(request, *args, **kwargs)
+                if not user_id:
+                    return await view(request, *args, **kwargs)
+                version, changed = await aget_data_version(user_id)
+                request.data_version = version
+                etag, last_modified = validators(request, version, changed)
+                if etag is None:
+                    return await view(request, *args, **kwargs)
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                _set_validators(response, etag, last_modified)
+                return response
+        else:
+            @wraps(view)
+            def inner(request, *args, **kwargs):
+                user_id = user_id_func(request, *args, **kwargs)
+                if not user_id:
+                    return view(request, *args, **kwargs)
+                version, changed = get_data_version(user_id)
+                request.data_version = version
+                etag, last_modified = validators(request, version, changed)
+                if etag is None:
+                    return view(request, *args, **kwargs)
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                _set_validators(response, etag, last_modified)
+                return response
+        return inner
+    return decorator
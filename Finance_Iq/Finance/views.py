@@ -1,18 +1,59 @@
+import hashlib
 import json
 import logging
+import math
+import os
 from datetime import date, timedelta
-from django.http import JsonResponse, HttpResponse
+from functools import lru_cache
+from typing import Optional
+from django.conf import settings
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.templatetags.static import static
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
 from django.core.exceptions import ValidationError
-from django.db.models import Sum
-from .models import Expense
-from .parser import parse_expense
-from .analytics import get_weekly_summary
+from .archive import with_archive
+from .models import ArchivedExpense, Expense, StatCounter
+from .parser import parse_line_items
+from .stats import get_dashboard_snapshot
+from .versions import conditional_on_data_version
+from . import agent_logs, journal, trends
+from .analytics import format_summary, get_weekly_summary, get_window_summaries
+from .cache import summary_cache
+from .export import EXPORT_FORMATS, buffered, iter_export_rows, render_export
+from .idempotency import DUPLICATE_REPLY, DuplicateMessage, message_key, seen_messages
+from .ingest import create_expense, create_expenses, create_message_expenses
+from .metrics import registry, track_parse
+from .pagination import (
+    KEYSET_ORDERING, LIST_FIELDS, InvalidCursor, decode_cursor, parse_limit, stream_page
+)
+from .ratelimit import check_rate_limit
+from .search import (
+    DEFAULT_SEARCH_RESULTS, MAX_SEARCH_DAYS, MAX_SEARCH_RESULTS, format_search_reply, get_search_results, parse_search_command
+)
 
 # Configure logging with rotation
 logger = logging.getLogger(__name__)
 
+# Largest number of messages accepted by the batch webhook in one request
+MAX_BATCH_SIZE = 1000
+
+# telex_logs channel_id that selects the unfiltered log
+ALL_CHANNELS = "all"
+
+# Bounds on get_summary's ?windows= parameter
+MAX_SUMMARY_WINDOWS = 8
+MAX_SUMMARY_DAYS = 3650
+
+RATE_LIMITED_REPLY = "⏳ You're logging expenses too fast. Please wait a moment and try again."
+
+UNPARSEABLE_REPLY = (
+    "❌ Could not parse your expense. Please try:\n"
+    "• 'I spent ₦5000 on food today'\n"
+    "• 'Paid 2500 for transport yesterday'"
+)
+
 
 def create_error_response(message: str, status: int = 400) -> JsonResponse:
     """Helper to create consistent error responses"""
@@ -32,6 +73,99 @@ def create_telegram_response(channel_id: str, text: str) -> JsonResponse:
     return JsonResponse(reply)
 
 
+def create_rate_limited_response(channel_id: str, retry_after: float) -> JsonResponse:
+    """429 bot reply; Retry-After tells the upstream when to redeliver"""
+    response = create_telegram_response(channel_id, RATE_LIMITED_REPLY)
+    response.status_code = 429
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+QUEUED_SUMMARY = "Your weekly summary will update in a moment."
+
+
+def logged_line(parsed) -> str:
+    return (
+        f"₦{parsed['amount']:,.2f} "
+        f"for {parsed['category'].capitalize()} "
+        f"on {parsed['date'].strftime('%b %d')}"
+    )
+
+
+def build_success_reply(parsed, summary: str, anomaly: Optional[str] = None) -> str:
+    """Reply text for a logged expense, any spending warning, then the weekly summary"""
+    logged = f"✅ Logged {logged_line(parsed)}"
+    if anomaly:
+        logged += f"\n{anomaly}"
+    return f"{logged}\n\n{summary}"
+
+
+def build_queued_reply(parsed) -> str:
+    """Reply for write-behind mode, where the summary is not yet up to date"""
+    return f"✅ Logged {logged_line(parsed)}\n\n{QUEUED_SUMMARY}"
+
+
+def build_items_reply(items, summary: Optional[str], anomalies=()) -> str:
+    """
+    One reply for every line item of a message: each item with its warning,
+    then the weekly summary (None in write-behind mode, where it is stale).
+    """
+    anomalies = list(anomalies) or [None] * len(items)
+    if len(items) == 1:
+        return build_success_reply(items[0], summary, anomalies[0]) if summary else build_queued_reply(items[0])
+    total = sum(item['amount'] for item in items)
+    lines = [f"✅ Logged {len(items)} expenses totalling ₦{total:,.2f}"]
+    for item, anomaly in zip(items, anomalies):
+        lines.append(f"• {logged_line(item)}")
+        if anomaly:
+            lines.append(f"  {anomaly}")
+    return "\n".join(lines) + f"\n\n{summary or QUEUED_SUMMARY}"
+
+
+def expense_fields(user_id, channel_id, parsed) -> dict:
+    """Expense constructor kwargs for a parsed message"""
+    return {
+        "user_id": user_id,
+        "channel_id": channel_id,
+        "amount": parsed["amount"],
+        "category": parsed["category"],
+        "description": parsed.get("description", ""),
+        "date": parsed.get("date"),
+    }
+
+
+def save_line_items(fields, message_key: Optional[str] = None):
+    """
+    Store a message's expenses: a single one through create_expense, several
+    with one bulk_create, in one transaction either way.
+    """
+    if len(fields) == 1:
+        return [create_expense(message_key=message_key, **fields[0])]
+    return create_expenses([Expense(**item) for item in fields], message_key=message_key)
+
+
+def parse_days(value, default: int) -> int:
+    """Parse a ?days= query parameter, falling back to the default"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_window_days(value, default: int) -> int:
+    """parse_days for a look-back window, capped so date arithmetic cannot overflow"""
+    return min(parse_days(value, default), MAX_SUMMARY_DAYS)
+
+
+def extract_message(payload):
+    """Pull (channel_id, user_id, text) out of a webhook payload"""
+    channel_id = payload.get("channelId")
+    user_data = payload.get("from", {})
+    user_id = user_data.get("id")
+    text = payload.get("text", "").strip()
+    return channel_id, user_id, text
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def telex_expense_agent(request):
@@ -53,63 +187,181 @@ def telex_expense_agent(request):
             return create_error_response("Invalid JSON payload")
         
         # Extract required fields
-        channel_id = payload.get("channelId")
-        user_data = payload.get("from", {})
-        user_id = user_data.get("id")
-        text = payload.get("text", "").strip()
+        channel_id, user_id, text = extract_message(payload)
         
         # Validate required fields
         if not all([channel_id, user_id, text]):
             return create_error_response("Missing required fields: channelId, from.id, or text")
         
-        # Log incoming request
-        logger.info(f"Processing expense from user {user_id}: {text[:50]}...")
+        # Log incoming request (debug only; the success line below is the per-request record)
+        logger.debug("Processing expense from user %s: %.50s...", user_id, text,
+                     extra={"channel_id": channel_id, "user_id": user_id})
         
-        # Parse the expense text
-        parsed = parse_expense(text)
+        # Shed floods from one user or channel before spending anything on them
+        retry_after = check_rate_limit(user_id, channel_id)
+        if retry_after:
+            return create_rate_limited_response(channel_id, retry_after)
         
-        if not parsed or "amount" not in parsed:
-            return create_telegram_response(
-                channel_id,
-                "❌ Could not parse your expense. Please try:\n"
-                "• 'I spent ₦5000 on food today'\n"
-                "• 'Paid 2500 for transport yesterday'"
-            )
+        # Search commands ("search uber", "how much did I spend on uber?") are answered, not logged
+        search_query = parse_search_command(text)
+        if search_query:
+            return create_telegram_response(channel_id, format_search_reply(get_search_results(user_id, search_query)))
+        
+        # Answer upstream retries with the original reply, before any parsing or queries
+        key = message_key(payload, channel_id, user_id, text)
+        seen_reply = seen_messages.get(key)
+        if seen_reply is not None:
+            logger.info("Duplicate message from user %s", user_id,
+                        extra={"channel_id": channel_id, "user_id": user_id})
+            return create_telegram_response(channel_id, seen_reply)
+        
+        # Parse the expense text; one message may hold several line items
+        with track_parse():
+            items = parse_line_items(text)
         
-        # Create expense record
+        if not items:
+            return create_telegram_response(channel_id, UNPARSEABLE_REPLY)
+        
+        fields = [expense_fields(user_id, channel_id, item) for item in items]
+        
+        # Write-behind mode: journal the expenses and reply without touching the database
+        if settings.INGEST_WRITE_BEHIND:
+            ingest_keys = journal.enqueue_many(fields, message_key=key)
+            logger.info("Queued expenses %s for user %s", ", ".join(ingest_keys), user_id,
+                        extra={"channel_id": channel_id, "user_id": user_id})
+            reply_text = build_items_reply(items, None)
+            seen_messages.remember(key, reply_text)
+            return create_telegram_response(channel_id, reply_text)
+        
+        # Create expense records, all in one transaction
         try:
-            expense = Expense.objects.create(
-                user_id=user_id,
-                channel_id=channel_id,
-                amount=parsed["amount"],
-                category=parsed["category"],
-                description=parsed.get("description", ""),
-                date=parsed.get("date")
-            )
+            try:
+                expenses = save_line_items(fields, message_key=key)
+            except DuplicateMessage:
+                # Claimed by another worker, whose reply this process never saw
+                logger.info("Duplicate message from user %s", user_id,
+                            extra={"channel_id": channel_id, "user_id": user_id})
+                return create_telegram_response(channel_id, DUPLICATE_REPLY)
             
             # Get weekly summary
             summary = get_weekly_summary(user_id)
             
-            # Build success message
-            reply_text = (
-                f"✅ Logged ₦{parsed['amount']:,.2f} "
-                f"for {parsed['category'].capitalize()} "
-                f"on {parsed['date'].strftime('%b %d')}\n\n"
-                f"{summary}"
-            )
+            # Build success message, with a warning for any amount unusual for the user
+            reply_text = build_items_reply(items, summary, [expense.anomaly for expense in expenses])
+            seen_messages.remember(key, reply_text)
             
-            logger.info(f"Successfully created expense {expense.id} for user {user_id}")
+            expense_ids = [expense.id for expense in expenses]
+            logger.info("Successfully created expense %s for user %s", ", ".join(map(str, expense_ids)), user_id,
+                        extra={"channel_id": channel_id, "user_id": user_id,
+                               "expense_id": expense_ids[0] if len(expense_ids) == 1 else expense_ids})
             return create_telegram_response(channel_id, reply_text)
             
         except ValidationError as ve:
-            logger.warning(f"Validation error for user {user_id}: {ve}")
+            logger.warning("Validation error for user %s: %s", user_id, ve,
+                           extra={"channel_id": channel_id, "user_id": user_id})
             return create_telegram_response(
                 channel_id,
                 f"❌ Invalid data: {str(ve)}"
             )
         
     except Exception as e:
-        logger.error(f"Unexpected error in telex_expense_agent: {e}", exc_info=True)
+        logger.error("Unexpected error in telex_expense_agent: %s", e, exc_info=True)
+        return create_error_response("Internal server error", status=500)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def telex_expense_batch(request):
+    """
+    Batch webhook endpoint for replaying many messages at once.
+    
+    Expected payload: a JSON array of telex_expense_agent payloads.
+    All messages are parsed first, each into its line items; every item of
+    every valid message is inserted with a single bulk_create in one
+    transaction. Results are returned per message, in input order, listing
+    the expenses stored for it or why it failed. "created" counts stored
+    expenses and "failed" counts messages. Messages are de-duplicated by
+    the same keys as the webhook, so replaying one it (or an earlier
+    batch) already stored is reported as "duplicate" and stores nothing.
+    """
+    try:
+        try:
+            payloads = json.loads(request.body)
+        except json.JSONDecodeError:
+            return create_error_response("Invalid JSON payload")
+        
+        if not isinstance(payloads, list):
+            return create_error_response("Expected a JSON array of messages")
+        if len(payloads) > MAX_BATCH_SIZE:
+            return create_error_response(f"Batch too large (max {MAX_BATCH_SIZE} messages)", status=413)
+        
+        results = [None] * len(payloads)
+        messages = []
+        for index, payload in enumerate(payloads):
+            try:
+                channel_id, user_id, text = extract_message(payload)
+            except AttributeError:
+                channel_id = user_id = text = None
+            if all([channel_id, user_id, text]):
+                key = message_key(payload, channel_id, user_id, text)
+                messages.append((index, key, channel_id, user_id, text))
+                continue
+            results[index] = {"index": index, "status": "error",
+                              "error": "Missing required fields: channelId, from.id, or text"}
+        
+        keyed = []
+        with track_parse():
+            parsed_batch = [parse_line_items(text) for *_, text in messages]
+        for (index, key, channel_id, user_id, text), items in zip(messages, parsed_batch):
+            if not items:
+                results[index] = {"index": index, "status": "error", "error": "Could not parse expense"}
+                continue
+            if seen_messages.get(key) is not None:
+                results[index] = {"index": index, "status": "duplicate"}
+                continue
+            keyed.append((index, key, [
+                Expense(
+                    user_id=user_id,
+                    channel_id=channel_id,
+                    amount=parsed["amount"],
+                    category=parsed["category"],
+                    description=parsed["description"],
+                    date=parsed["date"]
+                )
+                for parsed in items
+            ]))
+        
+        created, stored = create_message_expenses([(key, expenses) for _, key, expenses in keyed])
+        for (index, key, expenses), was_stored in zip(keyed, stored):
+            if not was_stored:
+                results[index] = {"index": index, "status": "duplicate"}
+                continue
+            results[index] = {
+                "index": index,
+                "status": "created",
+                "user_id": expenses[0].user_id,
+                # bulk_create fills in ids on the instances passed to it
+                "items": [{
+                    "id": expense.id,
+                    "amount": float(expense.amount),
+                    "category": expense.category,
+                    "date": expense.date.isoformat(),
+                    "anomaly": expense.anomaly,
+                } for expense in expenses],
+            }
+        
+        failed = sum(result["status"] == "error" for result in results)
+        logger.info("Batch ingested %d expenses from %d of %d messages",
+                    len(created), len(payloads) - failed, len(payloads))
+        return JsonResponse({
+            "created": len(created),
+            "failed": failed,
+            "duplicates": sum(result["status"] == "duplicate" for result in results),
+            "results": results
+        })
+    
+    except Exception as e:
+        logger.error("Unexpected error in telex_expense_batch: %s", e, exc_info=True)
         return create_error_response("Internal server error", status=500)
 
 
@@ -117,16 +369,46 @@ def telex_expense_agent(request):
 def telex_logs(request, channel_id):
     """
     Retrieve logs for debugging (should be protected in production).
+    
+    Returns the last ?tail=N lines (default 500) logged for the channel, or
+    for every channel when channel_id is "all". For "all", a
+    `Range: bytes=start-end` header returns that slice of the raw log.
+    Reads go through an mmap and the per-channel offset index, so memory
+    stays bounded however large the log grows.
     """
     # TODO: Add authentication
-    log_file = "agent-logs.txt"
-    
-    try:
-        with open(log_file, "r", encoding="utf-8") as f:
-            logs = f.read()
-        return HttpResponse(logs, content_type="text/plain")
-    except FileNotFoundError:
+    log_file = agent_logs.log_path()
+    if not os.path.exists(log_file):
         return HttpResponse("No logs available yet.", content_type="text/plain")
+    
+    byte_range = request.headers.get("Range", "")
+    if channel_id == ALL_CHANNELS and byte_range.startswith("bytes="):
+        try:
+            first, _, last = byte_range[len("bytes="):].partition("-")
+            if first:
+                start, end = int(first), int(last) if last else None
+            else:
+                start, end = -int(last), None
+        except ValueError:
+            return create_error_response("Invalid Range header")
+        data, start, end, size = agent_logs.read_range(log_file, start, end)
+        if not data:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        response = HttpResponse(data, status=206, content_type="text/plain; charset=utf-8")
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        return response
+    
+    tail = parse_days(request.GET.get('tail'), agent_logs.DEFAULT_TAIL)
+    tail = max(1, min(tail, agent_logs.MAX_TAIL))
+    if channel_id == ALL_CHANNELS:
+        logs = agent_logs.tail_lines(log_file, tail)
+    else:
+        logs = agent_logs.channel_tail(log_file, channel_id, tail)
+    response = HttpResponse(logs, content_type="text/plain; charset=utf-8")
+    response["Accept-Ranges"] = "bytes" if channel_id == ALL_CHANNELS else "none"
+    return response
 
 
 @require_http_methods(["GET"])
@@ -135,148 +417,29 @@ def health_check(request):
     return JsonResponse({
         "status": "healthy",
         "service": "Finance IQ",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "summary_cache": summary_cache.stats()
     })
 
 
 @require_http_methods(["GET"])
-def index(request):
-    """Main page view - Dashboard or API documentation"""
-    # Get some basic stats
-    total_expenses = Expense.objects.count()
-    total_users = Expense.objects.values('user_id').distinct().count()
-    
-    html = f"""
+def metrics(request):
+    """Per-view request, SQL and parse timing histograms in Prometheus text format"""
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+DASHBOARD_STYLESHEET = "Finance/dashboard.css"
+
+# Everything but the stylesheet link and the two counters is fixed, so the
+# stylesheet is a static asset and only the counters change between hits
+DASHBOARD_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
         <title>Finance IQ - Expense Tracker</title>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <style>
-            * {{
-                margin: 0;
-                padding: 0;
-                box-sizing: border-box;
-            }}
-            body {{
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                padding: 20px;
-            }}
-            .container {{
-                max-width: 1000px;
-                margin: 0 auto;
-            }}
-            .header {{
-                text-align: center;
-                color: white;
-                margin-bottom: 40px;
-                padding: 40px 20px;
-            }}
-            .header h1 {{
-                font-size: 3em;
-                margin-bottom: 10px;
-                text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-            }}
-            .header p {{
-                font-size: 1.2em;
-                opacity: 0.9;
-            }}
-            .stats {{
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                gap: 20px;
-                margin-bottom: 40px;
-            }}
-            .stat-card {{
-                background: white;
-                padding: 25px;
-                border-radius: 15px;
-                box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-                text-align: center;
-            }}
-            .stat-card h3 {{
-                color: #667eea;
-                font-size: 2.5em;
-                margin-bottom: 10px;
-            }}
-            .stat-card p {{
-                color: #666;
-                font-size: 1em;
-            }}
-            .endpoints {{
-                background: white;
-                border-radius: 15px;
-                padding: 30px;
-                box-shadow: 0 10px 30px rgba(0,0,0,0.2);
-            }}
-            .endpoints h2 {{
-                color: #333;
-                margin-bottom: 25px;
-                font-size: 1.8em;
-            }}
-            .endpoint {{
-                background: #f8f9fa;
-                padding: 20px;
-                margin: 15px 0;
-                border-radius: 10px;
-                border-left: 5px solid #667eea;
-                transition: transform 0.2s;
-            }}
-            .endpoint:hover {{
-                transform: translateX(5px);
-            }}
-            .endpoint h3 {{
-                color: #667eea;
-                margin-bottom: 10px;
-                font-family: 'Courier New', monospace;
-            }}
-            .endpoint p {{
-                color: #666;
-                margin: 5px 0;
-            }}
-            .method {{
-                display: inline-block;
-                padding: 4px 12px;
-                border-radius: 5px;
-                font-weight: bold;
-                font-size: 0.85em;
-                margin-right: 10px;
-            }}
-            .post {{ background: #28a745; color: white; }}
-            .get {{ background: #007bff; color: white; }}
-            code {{
-                background: #2d3748;
-                color: #68d391;
-                padding: 3px 8px;
-                border-radius: 4px;
-                font-size: 0.9em;
-                display: inline-block;
-                margin-top: 10px;
-            }}
-            .example {{
-                background: #2d3748;
-                color: #e2e8f0;
-                padding: 15px;
-                border-radius: 8px;
-                margin-top: 10px;
-                font-family: 'Courier New', monospace;
-                font-size: 0.9em;
-                overflow-x: auto;
-            }}
-            .status {{
-                text-align: center;
-                margin-top: 30px;
-                padding: 20px;
-                background: #d4edda;
-                border-radius: 10px;
-                color: #155724;
-                font-weight: bold;
-                font-size: 1.2em;
-            }}
-        </style>
+        <link rel="stylesheet" href="{stylesheet}">
     </head>
     <body>
         <div class="container">
@@ -315,18 +478,25 @@ def index(request):
                 <div class="endpoint">
                     <h3><span class="method get">GET</span> /api/expenses/</h3>
                     <p>List all expenses (with optional filters)</p>
-                    <code>?user_id=xxx&category=food&days=7</code>
+                    <code>?user_id=xxx&category=food&days=7&limit=100&cursor=...</code>
+                </div>
+                
+                <div class="endpoint">
+                    <h3><span class="method get">GET</span> /api/export/</h3>
+                    <p>Stream a user's or channel's full history as NDJSON or CSV</p>
+                    <code>?user_id=xxx&format=csv&start=2025-01-01&end=2025-12-31</code>
                 </div>
                 
                 <div class="endpoint">
                     <h3><span class="method get">GET</span> /api/summary/&lt;user_id&gt;/</h3>
                     <p>Get expense summary for a specific user</p>
-                    <code>Example: /api/summary/user_123456/</code>
+                    <code>Example: /api/summary/user_123456/?windows=7,30,90</code>
                 </div>
                 
                 <div class="endpoint">
                     <h3><span class="method get">GET</span> /agent-logs/&lt;channel_id&gt;.txt</h3>
-                    <p>View agent logs (admin only)</p>
+                    <p>View agent logs (admin only); use <code>all</code> as channel_id for every channel</p>
+                    <code>?tail=200</code>
                 </div>
             </div>
             
@@ -336,93 +506,283 @@ def index(request):
         </div>
     </body>
     </html>
+"""
+
+
+@lru_cache(maxsize=None)
+def dashboard_shell():
     """
+    The page with its stylesheet link filled in, and a version tag for its
+    ETag; built once per process as the hashed asset name only changes on deploy
+    """
+    html = DASHBOARD_HTML.replace("{stylesheet}", static(DASHBOARD_STYLESHEET))
+    return html, hashlib.sha1(html.encode()).hexdigest()[:12]
+
+
+def dashboard_snapshot(request):
+    """Counters and their last change, read once per request for both validators"""
+    if not hasattr(request, "_dashboard_snapshot"):
+        request._dashboard_snapshot = get_dashboard_snapshot()
+    return request._dashboard_snapshot
+
+
+def dashboard_etag(request):
+    stats, _ = dashboard_snapshot(request)
+    return f"{dashboard_shell()[1]}-{stats[StatCounter.TOTAL_EXPENSES]}-{stats[StatCounter.DISTINCT_USERS]}"
+
+
+def dashboard_last_modified(request):
+    return dashboard_snapshot(request)[1]
+
+
+@require_http_methods(["GET", "HEAD"])
+@cache_control(no_cache=True)
+@condition(etag_func=dashboard_etag, last_modified_func=dashboard_last_modified)
+def index(request):
+    """
+    Main page view - Dashboard or API documentation
+
+    The stylesheet is served by whitenoise under a hashed, precompressed name,
+    and the page carries ETag/Last-Modified validators over the counters, so
+    a repeat visit or monitor poll gets a bodiless 304 after one indexed lookup.
+    """
+    # Precomputed counters (see Finance/stats.py) instead of table scans
+    stats, _ = dashboard_snapshot(request)
+    html = dashboard_shell()[0].format(
+        total_expenses=stats[StatCounter.TOTAL_EXPENSES],
+        total_users=stats[StatCounter.DISTINCT_USERS],
+    )
     return HttpResponse(html)
 
 
+def listed_user(request, *args, **kwargs):
+    """The user whose data a list_expenses page depends on; None when it spans users"""
+    return request.GET.get('user_id') or None
+
+
+def summarized_user(request, user_id):
+    return user_id
+
+
 @require_http_methods(["GET"])
+@conditional_on_data_version(listed_user)
 def list_expenses(request):
     """
-    List expenses with optional filters.
-    Query params: user_id, category, days
-    """
-    user_id = request.GET.get('user_id')
-    category = request.GET.get('category')
-    days = request.GET.get('days', 30)
+    List expenses with optional filters, newest first.
+    Query params: user_id, category, days, limit, cursor
     
+    Pages are keyset-paginated on (date, created_at, id): pass the returned
+    next_cursor to fetch the following page. The body is streamed.
+    Pages filtered by user_id carry ETag/Last-Modified from the user's data
+    version, and an unchanged page is answered with a 304.
+    """
     try:
-        days = int(days)
-    except ValueError:
-        days = 30
+        rows, limit = expense_page_query(request)
+    except InvalidCursor as e:
+        return create_error_response(str(e))
     
-    # Build query
+    return StreamingHttpResponse(
+        stream_page(rows.iterator(chunk_size=limit + 1), limit),
+        content_type="application/json"
+    )
+
+
+def filter_expenses(user_id, category, days, model=Expense):
+    """Expenses from the last `days` days, newest first, with optional filters"""
     start_date = date.today() - timedelta(days=days)
-    expenses = Expense.objects.filter(date__gte=start_date)
+    expenses = model.objects.filter(date__gte=start_date)
     
     if user_id:
         expenses = expenses.filter(user_id=user_id)
     if category:
         expenses = expenses.filter(category=category)
     
-    # Serialize data
-    data = []
-    for exp in expenses.order_by('-date', '-created_at')[:100]:  # Limit to 100
-        data.append({
-            'id': exp.id,
-            'user_id': exp.user_id,
-            'amount': float(exp.amount),
-            'category': exp.category,
-            'description': exp.description,
-            'date': exp.date.isoformat(),
-            'created_at': exp.created_at.isoformat(),
-        })
+    return expenses.order_by(*KEYSET_ORDERING)
+
+
+def expense_page_query(request):
+    """
+    Rows for one list_expenses page as a values() queryset over the listed
+    columns only, plus the page size. Fetches one extra row to detect a next page.
+    Windows reaching past the archive horizon also read the cold tier.
+    """
+    limit = parse_limit(request.GET.get('limit'))
+    filters = (
+        request.GET.get('user_id'),
+        request.GET.get('category'),
+        parse_window_days(request.GET.get('days'), 30),
+    )
+    expenses = filter_expenses(*filters)
+    archived = filter_expenses(*filters, model=ArchivedExpense)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        after_cursor = decode_cursor(cursor)
+        expenses = expenses.filter(after_cursor)
+        archived = archived.filter(after_cursor)
+    start_date = date.today() - timedelta(days=filters[2])
+    rows = with_archive(expenses, archived, start_date, LIST_FIELDS, KEYSET_ORDERING)
+    return rows[:limit + 1], limit
+
+
+def export_params(request):
+    """
+    (filters, format) for an export request; raises ValueError with a
+    message for the client when they are invalid
+    """
+    user_id = request.GET.get('user_id')
+    channel_id = request.GET.get('channel_id')
+    fmt = request.GET.get('format', 'ndjson')
     
-    return JsonResponse({
-        'count': len(data),
-        'expenses': data
-    })
+    if not (user_id or channel_id):
+        raise ValueError("Provide user_id or channel_id")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else None
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else None
+    except ValueError:
+        raise ValueError("start and end must be YYYY-MM-DD dates")
+    
+    filters = dict(user_id=user_id, channel_id=channel_id, start=start, end=end,
+                   category=request.GET.get('category'))
+    return filters, fmt
+
+
+def export_response(content, filters, fmt):
+    content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response["Content-Disposition"] = (
+        f'attachment; filename="expenses-{filters["user_id"] or filters["channel_id"]}.{fmt}"'
+    )
+    return response
 
 
 @require_http_methods(["GET"])
-def get_summary(request, user_id):
-    """Get expense summary for a specific user"""
-    days = request.GET.get('days', 7)
+def export_expenses(request):
+    """
+    Stream a full expense history as NDJSON or CSV.
+    Query params: user_id and/or channel_id (one is required), format
+    (ndjson or csv), start and end (YYYY-MM-DD, inclusive), category
+
+    Memory stays flat under WSGI only: an ASGI server drains a sync stream
+    into a list first, so async deployments route async_views.export_expenses.
+    """
+    try:
+        filters, fmt = export_params(request)
+    except ValueError as e:
+        return create_error_response(str(e))
+    return export_response(buffered(render_export(iter_export_rows(**filters), fmt)), filters, fmt)
+
+
+@require_http_methods(["GET"])
+def get_trends(request, user_id):
+    """
+    Spending trends for a user.
+    Query params: days (default 90), top (default 3)
+    
+    Returns the daily series with 7- and 30-day moving averages,
+    week-over-week change per category and the top categories.
+    """
+    days = min(max(parse_days(request.GET.get('days'), trends.DEFAULT_TREND_DAYS), 1), trends.MAX_TREND_DAYS)
+    top = min(max(parse_days(request.GET.get('top'), trends.DEFAULT_TOP_CATEGORIES), 1),
+              len(Expense.CATEGORY_CHOICES))
+    return JsonResponse(trends.get_trends(user_id, days, top))
+
+
+@require_http_methods(["GET"])
+def search_expenses(request, user_id):
+    """
+    Full-text search over a user's expense descriptions.
+    Query params: q (required), days (default: all history), limit (default 10)
     
+    Every word of q must appear in the description. Returns totals per
+    category and the most recent matching expenses.
+    """
+    query = request.GET.get('q', '')
+    days = parse_days(request.GET.get('days'), None)
+    days = min(days, MAX_SEARCH_DAYS) if days and days > 0 else None
+    limit = min(max(parse_days(request.GET.get('limit'), DEFAULT_SEARCH_RESULTS), 1), MAX_SEARCH_RESULTS)
     try:
-        days = int(days)
-    except ValueError:
-        days = 7
+        results = get_search_results(user_id, query, days, limit)
+    except ValueError as e:
+        return create_error_response(str(e))
+    return JsonResponse(results)
+
+
+@require_http_methods(["GET"])
+@conditional_on_data_version(summarized_user)
+def get_summary(request, user_id):
+    """
+    Get expense summary for a specific user.
+    Query params: days (default 7), windows (e.g. 7,30,90)
     
-    start_date = date.today() - timedelta(days=days)
-    expenses = Expense.objects.filter(user_id=user_id, date__gte=start_date)
+    Every requested window is computed by a single query, and only when the
+    user's data version shows the client's copy is out of date.
+    """
+    days = parse_window_days(request.GET.get('days'), 7)
+    windows = parse_windows(request.GET.get('windows'))
     
-    if not expenses.exists():
-        return JsonResponse({
+    payload = summary_cache.get_or_set(
+        user_id, summary_cache_window(days, windows, request.data_version),
+        lambda: build_summary_payload(user_id, days, windows)
+    )
+    return JsonResponse(payload)
+
+
+def build_summary_payload(user_id, days, windows=()):
+    """Summary JSON for get_summary, computed without the cache"""
+    return summary_payload(user_id, days, windows, get_window_summaries(user_id, [days, 7, *windows]))
+
+
+def parse_windows(value):
+    """Parse ?windows=7,30,90 into a sorted tuple of distinct day counts"""
+    if not value:
+        return ()
+    windows = set()
+    for part in value.split(',')[:MAX_SUMMARY_WINDOWS]:
+        days = parse_days(part.strip(), 0)
+        if 0 < days <= MAX_SUMMARY_DAYS:
+            windows.add(days)
+    return tuple(sorted(windows))
+
+
+def summary_cache_window(days, windows, data_version):
+    """
+    Cache window for a summary served under `data_version`. The summary
+    cache's own version only moves in the process that saw the write (with
+    LocMemCache), while the ETag follows the database, so the data version is
+    part of the key: a body cached before another worker's write is never
+    sent with the ETag issued after it.
+    """
+    return f"summary:{days}:{','.join(map(str, windows))}:{data_version}"
+
+
+def window_payload(by_category):
+    return {
+        'total': float(sum(item['total'] for item in by_category)),
+        'expense_count': sum(item['count'] for item in by_category),
+        'by_category': {item['category']: float(item['total']) for item in by_category},
+    }
+
+
+def summary_payload(user_id, days, windows, summaries):
+    """Shape get_summary's JSON from get_window_summaries output"""
+    by_category = summaries[days]
+    if not by_category:
+        payload = {
             'user_id': user_id,
             'message': f'No expenses found in the last {days} days',
             'total': 0,
             'by_category': {}
-        })
-    
-    # Calculate totals
-    total = expenses.aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    by_category = (
-        expenses.values('category')
-        .annotate(total=Sum('amount'))
-        .order_by('-total')
-    )
-    
-    category_data = {
-        item['category']: float(item['total'])
-        for item in by_category
-    }
+        }
+    else:
+        payload = {
+            'user_id': user_id,
+            'period_days': days,
+            **window_payload(by_category),
+            'summary_text': format_summary(summaries[7])
+        }
     
-    return JsonResponse({
-        'user_id': user_id,
-        'period_days': days,
-        'total': float(total),
-        'by_category': category_data,
-        'expense_count': expenses.count(),
-        'summary_text': get_weekly_summary(user_id)
-    })
\ No newline at end of file
+    if windows:
+        payload['windows'] = {str(w): window_payload(summaries[w]) for w in windows}
+    return payload
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,13 +43,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'Finance.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'Finance.middleware.ReadYourWritesMiddleware',
 ]
 
 ROOT_URLCONF = 'Finance_Iq.urls'
@@ -81,6 +85,25 @@ DATABASES = {
     }
 }
 
+# Read replicas
+# Finance.routers.ReadReplicaRouter sends reads to READ_REPLICA_ALIASES and
+# writes to 'default'; a request that writes reads its own writes from the
+# primary. FINANCE_READ_REPLICAS is a comma-separated list of SQLite files,
+# which is enough to exercise the router locally (keep them fresh with
+# `manage.py sync_sqlite_replica`). For Postgres, add the replica entries to
+# DATABASES and list their aliases here instead.
+
+READ_REPLICA_ALIASES = []
+for _i, _name in enumerate(filter(None, os.environ.get('FINANCE_READ_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{_i}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': _name.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    READ_REPLICA_ALIASES.append(f'replica{_i}')
+
+DATABASE_ROUTERS = ['Finance.routers.ReadReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -117,8 +140,125 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# whitenoise serves `manage.py collectstatic` output under content-hashed
+# names with far-future caching, from gzip (and brotli, if installed) copies
+# made at collect time
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Caching
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Summaries are cached per user and day and invalidated through a version
+# counter kept in this cache. LocMemCache is per process: under several
+# workers a write only invalidates its own worker's entries, and the others
+# serve theirs for up to SUMMARY_CACHE_TTL seconds. Point 'default' at a
+# shared backend (Redis, Memcached) to invalidate everywhere at once.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'finance-iq',
+    }
+}
+
+SUMMARY_CACHE_MAX_ENTRIES = 1024
+SUMMARY_CACHE_TTL = 60
+
+
+# Async views
+# Route the webhook, read and export APIs to Finance.async_views. Finance_Iq/asgi.py
+# switches this on so ASGI servers get native async views.
+
+FINANCE_ASYNC_VIEWS = os.environ.get('FINANCE_ASYNC_VIEWS', '0') == '1'
+
+# Worker threads used by the async webhook to parse messages off the event loop
+PARSE_EXECUTOR_WORKERS = 4
+
+
+# Write-behind ingestion
+# When enabled the webhook appends parsed expenses to a local SQLite journal
+# and replies immediately; `manage.py drain_ingest_journal` inserts them in
+# batches. Delivery is at-least-once with idempotent replay.
+
+INGEST_WRITE_BEHIND = os.environ.get('INGEST_WRITE_BEHIND', '0') == '1'
+INGEST_JOURNAL_PATH = os.environ.get('INGEST_JOURNAL_PATH', str(BASE_DIR / 'ingest-journal.sqlite3'))
+
+
+# Webhook idempotency
+# Retried webhook messages (same upstream message ID, or same channel, user
+# and text when there is none) are answered from a bounded in-process store
+# without reparsing; across processes a unique ProcessedMessage row stops a
+# second insert. Both forget a message after IDEMPOTENCY_TTL_SECONDS, or
+# IDEMPOTENCY_CONTENT_TTL_SECONDS for messages without an upstream ID.
+# `manage.py purge_processed_messages` deletes expired rows.
+#
+# Content-hashed keys are a trade-off: "₦500 for bus" sent twice on purpose
+# looks exactly like a retry, so the window is kept just long enough to
+# cover transport retries. A retry arriving later than that is stored twice;
+# a genuine repeat sent sooner is dropped.
+
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '600'))
+IDEMPOTENCY_CONTENT_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_CONTENT_TTL_SECONDS', '30'))
+IDEMPOTENCY_MAX_ENTRIES = 10000
+
+
+# Webhook rate limiting
+# Token buckets per user and per channel, as (burst capacity, tokens per
+# second), checked before a message is parsed. Over-limit messages get a 429
+# with Retry-After so the upstream redelivers them later. Buckets live in
+# process; set RATE_LIMIT_CACHE to a CACHES alias shared by all workers
+# (e.g. Redis) to also enforce the limits across processes.
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+RATE_LIMIT_USER = (20, 1.0)
+RATE_LIMIT_CHANNEL = (120, 10.0)
+RATE_LIMIT_CACHE = os.environ.get('RATE_LIMIT_CACHE') or None
+
+
+# Archival
+# `manage.py archive_expenses` moves expenses older than this many days into
+# the ArchivedExpense cold tier; list_expenses and exports read it only for
+# windows that reach back past this age. Rollups keep archived totals.
+# Raising the value later leaves already-archived rows where they are, and
+# windows shorter than the new age will no longer see them.
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '365'))
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.2/topics/logging/
+# Finance app records are only enqueued on the request thread; a background
+# listener writes them as JSON lines to the size-rotated agent log served by
+# /agent-logs/<channel_id>.txt. Records logged with extra={"channel_id": ...}
+# are also indexed per channel.
+
+AGENT_LOG_FILE = os.environ.get('AGENT_LOG_FILE', str(BASE_DIR / 'agent-logs.txt'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'agent_log': {
+            'class': 'Finance.agent_logs.QueuedAgentLogHandler',
+            'filename': AGENT_LOG_FILE,
+            'max_bytes': 10 * 1024 * 1024,
+            'backup_count': 5,
+        },
+    },
+    'loggers': {
+        'Finance': {
+            'handlers': ['agent_log'],
+            'level': 'INFO',
+        },
+    },
+}